@@ -1,33 +1,288 @@
+import asyncio
 import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
 from openai import OpenAI
 
+from codehealer.utils.prompt_packer import DEFAULT_PROMPT_TOKEN_BUDGET, PackedPrompt, PromptPacker
+from codehealer.utils.llm_cache import LLMResponseCache
+from codehealer.utils.rate_limiter import RateLimiter, RetryPolicy
+from codehealer.utils import tracing
+
+
+@dataclass
+class LLMCallMetrics:
+    """Timing of one LLM call; ``ttft_seconds`` is only known for streamed calls."""
+
+    total_seconds: float
+    ttft_seconds: Optional[float] = None
+    streamed: bool = False
+    cached: bool = False
+
+
+@dataclass
+class LLMCall:
+    """What one call reported, filled in as it runs.
+
+    Each call gets its own record, so calls made concurrently on one agent
+    (e.g. parallel candidates) do not mix up their numbers.
+    """
+
+    usage: Any = None
+    metrics: Optional[LLMCallMetrics] = None
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
 class BaseAgent:
     """Abstract base class for all agents."""
 
-    def __init__(self, repo_path: str, system_prompt: str):
+    model = "gpt-5"
+    # Optional persistent response cache; the Healer shares one across agents.
+    response_cache: Optional[LLMResponseCache] = None
+    # Stream responses through the async client so callers can consume
+    # output (e.g. completed file blocks) before the whole response arrives.
+    stream = False
+    # Process-wide client-side quota; assign a RateLimiter to share it across agents.
+    rate_limiter: Optional[RateLimiter] = None
+    retry_policy = RetryPolicy()
+
+    def __init__(self, repo_path: str, system_prompt: str, prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET):
         self.repo_path = repo_path
         self.system_prompt = system_prompt
+        self.prompt_packer = PromptPacker(prompt_token_budget, self.model)
+        # Size accounting for the most recent call: the packer's estimate of
+        # the prompt and, when the API reports it, the actual usage.  With
+        # concurrent calls these are the last to finish; per-call numbers
+        # are on each call's trace span.
+        self.last_packed_prompt: Optional[PackedPrompt] = None
+        self.last_usage = None
+        self.last_metrics: Optional[LLMCallMetrics] = None
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        self.client = OpenAI(api_key=api_key)
+        self._api_key = api_key
+        # Retries are handled by ``retry_policy`` so they respect the shared rate limiter.
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        # Streamed calls each run in their own event loop (``asyncio.run``),
+        # so unless one is injected an async client is created per call.
+        self.async_client = None
+
+    def _request_params(self) -> dict:
+        return {
+            "reasoning_effort": "high",
+            "verbosity": "medium",
+            "max_tokens": 50000,
+            # "temperature": 0.1,
+        }
+
+    def _messages(self, user_prompt: str) -> list:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
 
-    def _query_llm(self, user_prompt: str) -> str:
-        """Sends a query to the LLM and returns the response."""
+    def _check_cache(self, user_prompt: str, params: dict, call: LLMCall) -> Tuple[Optional[str], Optional[str]]:
+        """Returns ``(cache key, response)``; a ``None`` response means the API must be called."""
+        if self.response_cache is None:
+            return None, None
+        cache_key = self.response_cache.make_key(self.model, self.system_prompt, user_prompt, params)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            print(f"[{type(self).__name__}] LLM cache hit.")
+            call.metrics = LLMCallMetrics(total_seconds=0.0, cached=True)
+            return cache_key, cached
+        if self.response_cache.mode == "replay":
+            print(f"[{type(self).__name__}] LLM cache miss in replay mode; not calling the API.")
+            return cache_key, ""
+        return cache_key, None
+
+    def _estimate_tokens(self, user_prompt: str) -> int:
+        if self.rate_limiter is None or not self.rate_limiter.limits_tokens:
+            return 0
+        return self.prompt_packer.count(self.system_prompt + user_prompt)
+
+    def _retry_delay(self, error: Exception, attempt: int, waited: float) -> Optional[float]:
+        delay = self.retry_policy.next_delay(error, attempt, waited)
+        if delay is not None:
+            print(
+                f"[{type(self).__name__}] API error ({error}); retrying in {delay:.1f}s "
+                f"(attempt {attempt + 2}/{self.retry_policy.max_attempts})."
+            )
+        return delay
+
+    def _create_with_retries(self, estimated_tokens: int, **kwargs):
+        waited = 0.0
+        for attempt in range(self.retry_policy.max_attempts):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimated_tokens)
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, waited)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                waited += delay
+        raise RuntimeError("Retry attempts exhausted.")
+
+    def _record_response(
+        self,
+        cache_key: Optional[str],
+        content: Optional[str],
+        call: LLMCall,
+        metrics: LLMCallMetrics,
+        estimated_tokens: int = 0,
+    ) -> None:
+        call.metrics = metrics
+        usage = call.usage
+        if usage is not None:
+            if self.rate_limiter is not None:
+                actual = usage.prompt_tokens + usage.completion_tokens
+                self.rate_limiter.record_usage(estimated_tokens, actual)
+            print(f"[{type(self).__name__}] Tokens: {usage.prompt_tokens} in, {usage.completion_tokens} out.")
+        first_token = f"first token {metrics.ttft_seconds:.2f}s, " if metrics.ttft_seconds is not None else ""
+        print(f"[{type(self).__name__}] Latency: {first_token}total {metrics.total_seconds:.2f}s.")
+        if cache_key is not None and content:
+            self.response_cache.put(cache_key, content)
+
+    def _query_llm(self, user_prompt: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Sends a query to the LLM and returns the response.
+
+        ``on_text`` receives the response as it arrives: each delta when
+        streaming, otherwise the whole response once.
+        """
+        call = LLMCall()
+        with tracing.span(type(self).__name__, "llm", model=self.model) as span:
+            content = self._call_llm(user_prompt, on_text, call)
+            span.set(bytes_written=len(user_prompt.encode("utf-8")), bytes_read=len((content or "").encode("utf-8")))
+            if call.metrics is not None:
+                span.set(cache_hit=call.metrics.cached, ttft_seconds=call.metrics.ttft_seconds)
+            if call.usage is not None:
+                span.set(tokens_in=call.usage.prompt_tokens, tokens_out=call.usage.completion_tokens)
+        self.last_usage, self.last_metrics = call.usage, call.metrics
+        return content
+
+    def _call_llm(self, user_prompt: str, on_text: Optional[Callable[[str], None]], call: LLMCall) -> str:
+        # ``asyncio.run`` cannot start a loop inside a running one (e.g. in a
+        # notebook), so there the sync client answers instead.
+        if self.stream and not _in_event_loop():
+            return asyncio.run(self._aquery_llm(user_prompt, on_text, call))
+        params = self._request_params()
+        cache_key, cached = self._check_cache(user_prompt, params, call)
+        if cached is not None:
+            if on_text and cached:
+                on_text(cached)
+            return cached
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-5",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                reasoning_effort="high",
-                verbosity="medium",
-                max_tokens=50000,
-                # streaming="true",
-                #temperature=0.1,
+            started = time.perf_counter()
+            estimated_tokens = self._estimate_tokens(user_prompt)
+            response = self._create_with_retries(
+                estimated_tokens,
+                model=self.model,
+                messages=self._messages(user_prompt),
+                **params,
             )
-            return response.choices[0].message.content
+            call.usage = getattr(response, "usage", None)
+            content = response.choices[0].message.content
+            metrics = LLMCallMetrics(time.perf_counter() - started)
+            self._record_response(cache_key, content, call, metrics, estimated_tokens)
+            if on_text and content:
+                on_text(content)
+            return content
         except Exception as e:
             print(f"Error communicating with OpenAI API: {e}")
             return ""
+
+    async def _aquery_llm(
+        self, user_prompt: str, on_text: Optional[Callable[[str], None]] = None, call: Optional[LLMCall] = None
+    ) -> str:
+        """Streams a query through the async client, passing each delta to ``on_text``."""
+        call = call if call is not None else LLMCall()
+        params = self._request_params()
+        cache_key, cached = self._check_cache(user_prompt, params, call)
+        if cached is not None:
+            if on_text and cached:
+                on_text(cached)
+            return cached
+        client = self.async_client
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(api_key=self._api_key, max_retries=0)
+        try:
+            return await self._stream_with_retries(client, user_prompt, params, cache_key, on_text, call)
+        finally:
+            if client is not self.async_client:
+                await client.close()
+
+    async def _stream_with_retries(
+        self,
+        client,
+        user_prompt: str,
+        params: dict,
+        cache_key: Optional[str],
+        on_text: Optional[Callable[[str], None]],
+        call: LLMCall,
+    ) -> str:
+        """Streams one response, retrying failures that happen before the first token."""
+        started = time.perf_counter()
+        estimated_tokens = self._estimate_tokens(user_prompt)
+        waited = 0.0
+        for attempt in range(self.retry_policy.max_attempts):
+            first_token = None
+            parts = []
+            call.usage = None
+            if self.rate_limiter is not None:
+                await asyncio.sleep(self.rate_limiter.reserve(estimated_tokens))
+            try:
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(user_prompt),
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **params,
+                )
+                async for chunk in stream:
+                    # With ``include_usage`` the final chunk has usage and no choices.
+                    if getattr(chunk, "usage", None) is not None:
+                        call.usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(delta)
+                    if on_text:
+                        on_text(delta)
+            except Exception as e:
+                # Once text has been handed to ``on_text`` a retry would
+                # replay it, so only failures before the first token retry.
+                delay = None if parts else self._retry_delay(e, attempt, waited)
+                if delay is None:
+                    print(f"Error communicating with OpenAI API: {e}")
+                    return ""
+                await asyncio.sleep(delay)
+                waited += delay
+                continue
+            content = "".join(parts)
+            metrics = LLMCallMetrics(time.perf_counter() - started, first_token, streamed=True)
+            self._record_response(cache_key, content, call, metrics, estimated_tokens)
+            return content
+        return ""
+
+    def _pack_prompt(self, sections: list, template: str) -> PackedPrompt:
+        """Fits ``sections`` into the budget left after the system prompt and ``template``."""
+        packed = self.prompt_packer.pack(sections, reserved=self.system_prompt + template)
+        self.last_packed_prompt = packed
+        print(f"[{type(self).__name__}] Prompt: {packed.summary()}")
+        return packed
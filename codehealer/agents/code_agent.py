@@ -1,18 +1,147 @@
 import re
 import os
-from typing import Optional, List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, List, Tuple
 
 from codehealer.agents.base_agent import BaseAgent
 from codehealer.utils.file_handler import FileHandler
+from codehealer.utils.context_selector import select_context
+from codehealer.utils.prompt_packer import DEFAULT_PROMPT_TOKEN_BUDGET, PromptSection
+from codehealer.utils import tracing
+
+FULL_FILE_FORMAT = """
+        You MUST respond in the following format, providing complete, corrected content for every file you change or create.
+
+        FILEPATH: path/to/the/first/file/to/fix.py
+        ```python
+        # The full, corrected content of the first python file goes here.
+        ```
+        ---
+        FILEPATH: path/to/the/second/file/to/fix.py
+        ```python
+        # The full, corrected content of the second python file goes here.
+        ```
+
+        The filepaths must be relative to the repository root. Do not include any other text or explanations.
+        """
+
+PATCH_FORMAT = """
+        To keep responses short, change existing files with search/replace edits instead of repeating their full content:
+
+        EDIT: path/to/existing/file.py
+        ```python
+        <<<<<<< SEARCH
+        the exact lines currently in the file, including a few unchanged lines of context
+        =======
+        the lines that replace them
+        >>>>>>> REPLACE
+        ```
+
+        An EDIT block may contain several SEARCH/REPLACE pairs; each SEARCH must match the current file exactly and uniquely.
+        A unified diff is also accepted in place of an EDIT block:
+
+        PATCH: path/to/existing/file.py
+        ```diff
+        @@ -12,3 +12,3 @@
+         unchanged line
+        -old line
+        +new line
+        ```
+
+        Only for new files, or when rewriting most of a file, provide its complete content:
+
+        FILEPATH: path/to/new/file.py
+        ```python
+        # The full content of the file goes here.
+        ```
+
+        Separate blocks with a line containing only `---`. The filepaths must be relative to the repository root. Do not include any other text or explanations.
+        """
+
+_BLOCK_HEADER_RE = re.compile(r"^(FILEPATH|EDIT|PATCH): (.+)$", re.MULTILINE)
+_FENCE_RE = re.compile(r"```[\w+-]*\n(.*?)\n```", re.DOTALL)
+
+# Steer parallel candidates apart.  Reasoning models ignore ``temperature``,
+# so diversity comes from the prompt; the first candidate gets the plain
+# prompt and therefore shares its cache entry with the sequential mode.
+CANDIDATE_STRATEGIES = [
+    "",
+    "Prefer the smallest change that fixes the immediate error.",
+    "Look for the root cause beyond the line where the error surfaces, e.g. in a caller or a shared helper.",
+    "Consider that the failing code may be right and a missing file, import or configuration is at fault.",
+    "Make the failing code path robust, handling the inputs and edge cases it currently ignores.",
+]
+
+
+def _candidate_hint(index: int) -> str:
+    strategy = CANDIDATE_STRATEGIES[index % len(CANDIDATE_STRATEGIES)]
+    if index >= len(CANDIDATE_STRATEGIES):
+        strategy += f" (Variant {index + 1}: choose an approach different from the most obvious one.)"
+    return f"\nApproach for this attempt: {strategy.strip()}\n" if strategy else ""
+
+
+class _ResponseParser:
+    """Splits a (possibly still streaming) response into header blocks.
+
+    ``on_block(kind, path, block)`` is called as soon as a block is final:
+    when its first fenced code block has closed or the next header has
+    started.  Feeding the whole response at once gives the same blocks as
+    feeding it delta by delta.
+    """
+
+    def __init__(self, on_block: Callable[[str, str, str], None]):
+        self.on_block = on_block
+        self.text = ""
+        self._scan_from = 0
+        self._header = None
+
+    def feed(self, delta: str) -> None:
+        self.text += delta
+        # Blocks can only complete on a closing fence or a new header line.
+        if "`" in delta or "\n" in delta:
+            self._drain(final=False)
+
+    def close(self) -> None:
+        self._drain(final=True)
+
+    def _next_header(self, final: bool):
+        match = _BLOCK_HEADER_RE.search(self.text, self._scan_from)
+        # A header at the very end may still be missing the rest of its path.
+        if match is None or (match.end() == len(self.text) and not final):
+            return None
+        return match
+
+    def _drain(self, final: bool) -> None:
+        while True:
+            if self._header is None:
+                self._header = self._next_header(final)
+                if self._header is None:
+                    return
+                self._scan_from = self._header.end()
+            following = self._next_header(final)
+            block_end = following.start() if following else len(self.text)
+            fence = _FENCE_RE.search(self.text, self._header.end(), block_end)
+            if fence is None and following is None and not final:
+                return
+            header, self._header = self._header, None
+            self._scan_from = fence.end() if fence else block_end
+            self.on_block(header.group(1), header.group(2).strip(), self.text[header.end():block_end])
+
 
 class CodeAgent(BaseAgent):
     """An agent that analyzes, fixes, and creates Python code holistically."""
 
-    def __init__(self, repo_path: str):
+    def __init__(
+        self,
+        repo_path: str,
+        prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+        patch_mode: bool = False,
+    ):
         system_prompt = """
         You are an expert Python programmer acting as a senior developer performing a code review. Your task is to fix a Python project that has failed or is incomplete.
 
-        You will be given the full traceback of an error (or a message indicating a missing file), and the complete source code for all Python files in the repository.
+        You will be given the full traceback of an error (or a message indicating a missing file), the complete source code of the Python files relevant to it, and the paths of the remaining files in the repository.
 
         Your goal is not just to fix a single error, but to **proactively identify and fix any other potential bugs** and to **create missing files** as needed. This includes:
         - **Creating an entry point:** If `main.py` or `app.py` is missing, analyze the project and create one that runs the primary functionality.
@@ -24,40 +153,121 @@ class CodeAgent(BaseAgent):
 
         If you are shown previous failed attempts, it means those solutions did not work. You must provide a DIFFERENT and more insightful solution.
 
-        You MUST respond in the following format, providing complete, corrected content for every file you change or create.
-
-        FILEPATH: path/to/the/first/file/to/fix.py
-        ```python
-        # The full, corrected content of the first python file goes here.
-        ```
-        ---
-        FILEPATH: path/to/the/second/file/to/fix.py
-        ```python
-        # The full, corrected content of the second python file goes here.
-        ```
-
-        The filepaths must be relative to the repository root. Do not include any other text or explanations.
-        """
-        super().__init__(repo_path, system_prompt)
+        """ + (PATCH_FORMAT if patch_mode else FULL_FILE_FORMAT)
+        super().__init__(repo_path, system_prompt, prompt_token_budget)
         self.file_handler = FileHandler(self.repo_path)
+        self.patch_mode = patch_mode
+        # Hunks from the previous response that could not be applied; they
+        # are shown to the model on the next call.
+        self.last_rejections: List[str] = []
 
     def get_suggestion(self, traceback_log: str, attempt_history: Optional[List[str]] = None) -> Optional[List[Tuple[str, str]]]:
         """Analyzes a Python traceback or project state and suggests proactive code fixes."""
+        user_prompt = self._prepare_prompt(traceback_log, attempt_history)
+        self.last_rejections = []
+        return self._request_fixes(user_prompt, self.last_rejections)
+
+    def get_suggestions(
+        self, traceback_log: str, attempt_history: Optional[List[str]] = None, count: int = 1
+    ) -> List[List[Tuple[str, str]]]:
+        """Requests ``count`` candidate fixes in parallel, each steered towards a different approach.
+
+        Candidates that produce no usable fix are left out, so fewer than
+        ``count`` may be returned.
+        """
+        user_prompt = self._prepare_prompt(traceback_log, attempt_history)
+        prompts = [user_prompt + _candidate_hint(i) for i in range(count)]
+        # Each candidate collects its own rejected hunks; they are merged in
+        # candidate order once all requests are done.
+        rejections: List[List[str]] = [[] for _ in prompts]
+        with ThreadPoolExecutor(max_workers=max(1, count)) as executor:
+            request = tracing.bind(lambda i: self._request_fixes(prompts[i], rejections[i]))
+            results = list(executor.map(request, range(count)))
+        self.last_rejections = [hunk for candidate in rejections for hunk in candidate]
+        return [fixes for fixes in results if fixes]
+
+    def _prepare_prompt(self, traceback_log: str, attempt_history: Optional[List[str]]) -> str:
+        history_items = [
+            f"\n--- FAILED ATTEMPT {i+1} ---\n```python\n{attempt}\n```\n--- END FAILED ATTEMPT {i+1} ---\n"
+            for i, attempt in enumerate(attempt_history or [])
+        ]
+
+        all_files = self.file_handler.list_all_python_files(self.repo_path)
+        # Only the files implicated by the traceback (plus their direct
+        # importers and importees) are sent in full; the rest by path only.
+        selected = select_context(all_files, traceback_log, self.repo_path, self.prompt_packer.token_budget)
+        file_items = [f"--- FILE: {path} ---\n{content}\n" for path, content in selected.items()]
+
+        # Tracebacks matter most, then the (ranked) files, then the oldest
+        # failed attempts, which are dropped first when the budget is tight.
+        packed = self._pack_prompt(
+            [
+                PromptSection("traceback", priority=3, text=traceback_log),
+                PromptSection("files", priority=2, items=file_items, separator="", drop_from="end"),
+                PromptSection("history", priority=1, items=history_items, separator="", drop_from="start"),
+                PromptSection("rejections", priority=2, text="\n".join(self.last_rejections)),
+            ],
+            template=self._build_prompt("", "", list(all_files), "", bool(history_items)),
+        )
+        shown = {path for path in selected if f"--- FILE: {path} ---\n" in packed.sections["files"]}
+        omitted = [path for path in all_files if path not in shown]
+        user_prompt = self._build_prompt(
+            packed.sections["traceback"], packed.sections["files"], omitted, packed.sections["history"], bool(history_items)
+        )
+        if packed.sections["rejections"]:
+            user_prompt += (
+                "\nThese edits from your previous response did not match the files exactly once and were NOT applied:\n"
+                f"{packed.sections['rejections']}\n"
+            )
+        return user_prompt
+
+    def _request_fixes(self, user_prompt: str, rejections: List[str]) -> Optional[List[Tuple[str, str]]]:
+        fixes: Dict[str, str] = {}
+        pending_rejections: List[str] = []
+        started = time.perf_counter()
+
+        def on_block(kind: str, path: str, block: str) -> None:
+            fix = self._parse_block(kind, path, block, pending_rejections, fixes)
+            if fix is None:
+                return
+            fixes[fix[0]] = fix[1]
+            if self.stream:
+                print(
+                    f"[CodeAgent] {os.path.relpath(fix[0], self.repo_path)} ready after "
+                    f"{time.perf_counter() - started:.1f}s ({self._check_syntax(*fix)})."
+                )
+
+        parser = _ResponseParser(on_block)
+        response = self._query_llm(user_prompt, on_text=parser.feed)
+        if not response:
+            # A stream that failed part-way must not yield partial fixes.
+            return None
+        parser.close()
+        rejections.extend(pending_rejections)
+        return list(fixes.items()) if fixes else None
+
+    @staticmethod
+    def _check_syntax(abs_filepath: str, content: str) -> str:
+        if not abs_filepath.endswith(".py"):
+            return "not Python"
+        try:
+            compile(content, abs_filepath, "exec")
+        except SyntaxError as e:
+            return f"syntax error on line {e.lineno}"
+        return "syntax OK"
+
+    def _build_prompt(self, traceback_log: str, files: str, omitted: List[str], history: str, has_history: bool) -> str:
+        source_code_prompt = "\n--- REPOSITORY SOURCE CODE ---\n" + files + "--- END REPOSITORY SOURCE CODE ---\n"
+        if omitted:
+            source_code_prompt += "\n--- OTHER FILES (not shown) ---\n" + "\n".join(omitted) + "\n"
+
         history_prompt = ""
-        if attempt_history:
+        if has_history:
             history_prompt = "\n\nWe have tried to fix this before. Here are the previous code changes that failed:\n"
-            for i, attempt in enumerate(attempt_history):
-                history_prompt += f"\n--- FAILED ATTEMPT {i+1} ---\n```python\n{attempt}\n```\n--- END FAILED ATTEMPT {i+1} ---\n"
+            history_prompt += history
             history_prompt += "\nThe previous fixes did not resolve the error. Please analyze the traceback and entire codebase again and provide a DIFFERENT and CORRECT fix."
 
-        all_files = self.file_handler.list_all_python_files(self.repo_path)
-        source_code_prompt = "\n--- REPOSITORY SOURCE CODE ---\n"
-        for path, content in all_files.items():
-            source_code_prompt += f"--- FILE: {path} ---\n"
-            source_code_prompt += f"{content}\n"
-        source_code_prompt += "--- END REPOSITORY SOURCE CODE ---\n"
-
-        user_prompt = f"""
+        return f"""
         The python project has an issue. The error traceback or status is:
 
         --- TRACEBACK / STATUS ---
@@ -69,36 +279,69 @@ class CodeAgent(BaseAgent):
 
         Please analyze the entire repository and the status. Provide complete, corrected content for any files that need to be fixed or created in the specified format.
         """
-        response = self._query_llm(user_prompt)
-        return self._parse_response(response)
 
     def _parse_response(self, response: str) -> Optional[List[Tuple[str, str]]]:
-        """Parses the LLM response to extract multiple filepaths and code blocks."""
-        fixes = []
-        # Split the response by the '---' separator for multiple files
-        file_blocks = response.strip().split('\n---\n')
-
-        for block in file_blocks:
-            if not block.strip():
-                continue
-            try:
-                filepath_match = re.search(r"FILEPATH: (.+)", block)
-                code_match = re.search(r"```python\n(.*?)\n```", block, re.DOTALL)
-                if filepath_match and code_match:
-                    relative_filepath = filepath_match.group(1).strip().lstrip('/')
-                    normalized_relative_path = os.path.normpath(relative_filepath)
-                    abs_filepath = os.path.join(self.repo_path, normalized_relative_path)
-
-                    if not os.path.abspath(abs_filepath).startswith(os.path.abspath(self.repo_path)):
-                        print(f"Error: Agent suggested a path outside the repository: {relative_filepath}")
-                        continue # Skip this block but process others
-
-                    code = code_match.group(1).strip()
-                    fixes.append((abs_filepath, code))
-                else:
-                    pass
-            except Exception as e:
-                print(f"Error parsing a block in the agent response: {e}")
-
-        return fixes if fixes else None
+        """Parses the LLM response into ``(absolute path, new full content)`` pairs.
+
+        ``FILEPATH`` blocks carry full content.  ``EDIT`` (search/replace) and
+        ``PATCH`` (unified diff) blocks are applied in memory to the current
+        file, or to its content after the response's earlier blocks, so each
+        file appears once; hunks that do not apply are collected in
+        ``last_rejections``.
+        """
+        fixes: Dict[str, str] = {}
+        self.last_rejections = []
+
+        def on_block(kind: str, path: str, block: str) -> None:
+            fix = self._parse_block(kind, path, block, working=fixes)
+            if fix is not None:
+                fixes[fix[0]] = fix[1]
+
+        parser = _ResponseParser(on_block)
+        parser.feed(response)
+        parser.close()
+        return list(fixes.items()) if fixes else None
+
+    def _parse_block(
+        self,
+        kind: str,
+        relative_filepath: str,
+        block: str,
+        rejections: Optional[List[str]] = None,
+        working: Optional[Dict[str, str]] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """Turns one header block into an ``(absolute path, new full content)`` pair.
+
+        Edits apply to ``working[path]`` when the response has already
+        changed that file, otherwise to the file on disk.  Hunks that do not
+        apply are added to ``rejections`` (by default ``last_rejections``).
+        """
+        if rejections is None:
+            rejections = self.last_rejections
+        try:
+            code_match = _FENCE_RE.search(block)
+            if not code_match:
+                return None
+            relative_filepath = relative_filepath.lstrip('/')
+            normalized_relative_path = os.path.normpath(relative_filepath)
+            abs_filepath = os.path.join(self.repo_path, normalized_relative_path)
+
+            if not os.path.abspath(abs_filepath).startswith(os.path.abspath(self.repo_path)):
+                print(f"Error: Agent suggested a path outside the repository: {relative_filepath}")
+                return None # Skip this block but process others
+
+            if kind == "FILEPATH":
+                return abs_filepath, code_match.group(1).strip()
 
+            current = working.get(abs_filepath) if working is not None else None
+            result = self.file_handler.apply_patch(
+                abs_filepath, code_match.group(1) + "\n", write=False, current=current
+            )
+            rejections.extend(
+                f"--- {normalized_relative_path} ---\n{hunk}" for hunk in result.rejected
+            )
+            if result.applied:
+                return abs_filepath, result.content
+        except Exception as e:
+            print(f"Error parsing a block in the agent response: {e}")
+        return None
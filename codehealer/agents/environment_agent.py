@@ -1,10 +1,11 @@
 from typing import Optional, List
 from codehealer.agents.base_agent import BaseAgent
+from codehealer.utils.prompt_packer import DEFAULT_PROMPT_TOKEN_BUDGET, PromptSection
 
 class EnvironmentAgent(BaseAgent):
     """An agent specializing in fixing and creating dependency files."""
 
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET):
         system_prompt = """
         You are an expert in Python dependency management. Your primary strategy is to simplify dependencies.
 
@@ -12,26 +13,70 @@ class EnvironmentAgent(BaseAgent):
 
         **If fixing an existing file:** You will be given a `pip install` error log and the file content. Your default strategy should be to remove version specifiers (e.g., change `scipy==1.8.0` to `scipy`) to allow pip to resolve the latest stable version. Only add a specific version if the error log explicitly requires it.
 
-        **If the `requirements.txt` file is missing:** You will be given all the Python source code from the repository. Your task is to generate a `requirements.txt` file from scratch by identifying all third-party libraries from the import statements. Do not include standard Python libraries.
+        **If the `requirements.txt` file is missing:** You will be given Python source code from the repository (possibly only the files whose imports could not be mapped automatically). Your task is to generate a `requirements.txt` file from scratch by identifying all third-party libraries from the import statements. Do not include standard Python libraries.
 
         If you are shown previous failed attempts, it means those solutions did not work. You must provide a DIFFERENT and CORRECT solution.
 
         You MUST respond with ONLY the content for the new `requirements.txt` file. Do not include explanations, apologies, or markdown formatting.
         """
-        super().__init__(repo_path, system_prompt)
+        super().__init__(repo_path, system_prompt, prompt_token_budget)
 
-    def get_suggestion(self, error_log: str, requirements_content: Optional[str] = None, attempt_history: Optional[List[str]] = None) -> str:
-        """Analyzes a pip error or source code to suggest a requirements.txt file."""
+    def get_suggestion(
+        self,
+        error_log: str,
+        requirements_content: Optional[str] = None,
+        attempt_history: Optional[List[str]] = None,
+        conflict: Optional[str] = None,
+    ) -> str:
+        """Analyzes a pip error or source code to suggest a requirements.txt file.
+
+        ``conflict`` is what pip blamed, extracted from the full log (see
+        ``Runner.last_conflict``), so it survives truncation of the log.
+        """
+        history_items = [
+            f"\n--- FAILED ATTEMPT {i+1} ---\n{attempt}\n--- END FAILED ATTEMPT {i+1} ---\n"
+            for i, attempt in enumerate(attempt_history or [])
+        ]
+        has_history = bool(history_items)
+
+        # The requirements file itself is never shrunk; the pip log (or the
+        # source code in generation mode) keeps its head and tail, and the
+        # oldest failed attempts are dropped first.
+        packed = self._pack_prompt(
+            [
+                PromptSection("requirements", priority=3, text=requirements_content or ""),
+                PromptSection("conflict", priority=3, text=conflict or ""),
+                PromptSection("log", priority=2, text=error_log),
+                PromptSection("history", priority=1, items=history_items, separator="", drop_from="start"),
+            ],
+            template=self._build_prompt("", bool(requirements_content), "", "", has_history, ""),
+        )
+        user_prompt = self._build_prompt(
+            packed.sections["log"],
+            bool(requirements_content),
+            packed.sections["requirements"],
+            packed.sections["history"],
+            has_history,
+            packed.sections["conflict"],
+        )
+        return self._query_llm(user_prompt).strip()
+
+    def _build_prompt(
+        self, error_log: str, fixing: bool, requirements_content: str, history: str, has_history: bool, conflict: str
+    ) -> str:
         history_prompt = ""
-        if attempt_history:
+        if has_history:
             history_prompt = "\n\nWe have tried to fix this before. Here are the previous `requirements.txt` contents that failed:\n"
-            for i, attempt in enumerate(attempt_history):
-                history_prompt += f"\n--- FAILED ATTEMPT {i+1} ---\n{attempt}\n--- END FAILED ATTEMPT {i+1} ---\n"
+            history_prompt += history
             history_prompt += "\nThe previous fixes did not resolve the error. Please analyze the situation again and provide a DIFFERENT and CORRECT fix."
 
-        if requirements_content:
+        conflict_prompt = ""
+        if conflict:
+            conflict_prompt = f"\n\nThe resolver blamed the following:\n\n--- RESOLVER CONFLICT ---\n{conflict}\n--- END RESOLVER CONFLICT ---\n"
+
+        if fixing:
             # Mode 1: Fix existing requirements.txt
-            user_prompt = f"""
+            return f"""
             The command `pip install -r requirements.txt` failed with the following error:
 
             --- PIP ERROR LOG ---
@@ -43,12 +88,11 @@ class EnvironmentAgent(BaseAgent):
             --- requirements.txt ---
             {requirements_content}
             --- END requirements.txt ---
-            {history_prompt}
+            {conflict_prompt}{history_prompt}
             Please provide the corrected content for the `requirements.txt` file.
             """
-        else:
-            # Mode 2: Generate requirements.txt from source code
-            user_prompt = f"""
+        # Mode 2: Generate requirements.txt from source code
+        return f"""
             The `requirements.txt` file is missing. Please generate it based on the repository's source code below. Identify all third-party imports.
 
             --- REPOSITORY SOURCE CODE ---
@@ -57,6 +101,3 @@ class EnvironmentAgent(BaseAgent):
             {history_prompt}
             Please provide the complete content for the new `requirements.txt` file.
             """
-
-        return self._query_llm(user_prompt).strip()
-
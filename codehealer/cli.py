@@ -0,0 +1,198 @@
+import argparse
+
+from codehealer.agents.base_agent import BaseAgent
+from codehealer.core.healer import Healer
+from codehealer.utils.limits import RunLimits
+from codehealer.utils.llm_cache import CACHE_MODES, LLMResponseCache
+from codehealer.utils.rate_limiter import RateLimiter
+from codehealer.utils.venv_cache import VenvTemplateCache, DEFAULT_MAX_SIZE_BYTES
+from codehealer.utils.wheelhouse import Wheelhouse
+
+
+def add_healer_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options that configure a :class:`Healer` (everything but the repository)."""
+    parser.add_argument(
+        "--venv-cache-dir",
+        default=None,
+        help="Directory of cached template virtual environments to clone instead of running ensurepip.",
+    )
+    parser.add_argument(
+        "--venv-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_SIZE_BYTES // (1024 * 1024),
+        help="Size cap for the venv template cache; least recently used templates are evicted first.",
+    )
+    parser.add_argument(
+        "--wheelhouse-dir",
+        default=None,
+        help="Persistent directory of built wheels that dependency installs prefer over the package index.",
+    )
+    parser.add_argument(
+        "--patch-mode",
+        action="store_true",
+        help="Let the CodeAgent answer with search/replace edits or unified diffs instead of full files.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        default=None,
+        help="SQLite file used to cache LLM responses keyed by model, prompts and parameters.",
+    )
+    parser.add_argument(
+        "--llm-cache-mode",
+        choices=CACHE_MODES,
+        default="readwrite",
+        help="'record' refreshes every entry, 'replay' never calls the API (for deterministic offline runs).",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds after which cached responses are ignored (default: never).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM responses; the CodeAgent parses each file block as soon as it is complete.",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=None,
+        help="Client-side cap on LLM requests per minute, shared by all agents in the process.",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        default=None,
+        help="Client-side cap on LLM tokens per minute, shared by all agents in the process.",
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=1,
+        help="Number of candidate runtime fixes to request and test in parallel sandbox clones (default: 1).",
+    )
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Before the first run, check for syntax errors, undefined names and missing imports statically.",
+    )
+    parser.add_argument(
+        "--run-tests",
+        action="store_true",
+        help="After the entry point runs, also heal until pytest passes: affected tests first, then the full suite.",
+    )
+    parser.add_argument(
+        "--test-workers",
+        type=int,
+        default=None,
+        help="Run tests in this many pytest-xdist workers when pytest-xdist is installed in the sandbox.",
+    )
+    parser.add_argument(
+        "--test-coverage-file",
+        default=None,
+        help="A .coverage file recorded with per-test contexts, used to narrow which tests a change affects.",
+    )
+    parser.add_argument(
+        "--run-timeout",
+        type=float,
+        default=600,
+        help="Wall-clock limit in seconds for each entry-point run (default: 600; 0 disables it).",
+    )
+    parser.add_argument(
+        "--healthy-after",
+        type=float,
+        default=None,
+        help="Treat an entry point still running after this many seconds as healthy (for servers).",
+    )
+    parser.add_argument(
+        "--cpu-limit",
+        type=int,
+        default=None,
+        help="CPU-time limit in seconds for each entry-point run.",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        default=None,
+        help="Address-space limit in MiB for each entry-point run.",
+    )
+    parser.add_argument(
+        "--command-timeout",
+        type=float,
+        default=None,
+        help="Wall-clock limit in seconds for every other command, such as pip installs.",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=None,
+        help="Directory for the full output of every command; agents only see a bounded excerpt.",
+    )
+    parser.add_argument(
+        "--warm-worker",
+        action="store_true",
+        help="Fork entry-point runs and import checks from a sandbox interpreter with dependencies pre-imported.",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write a Chrome-trace JSON of where the heal spent its time (open in chrome://tracing or Perfetto).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Checkpoint the run before every step so it can be resumed after a crash.",
+    )
+    parser.add_argument(
+        "--checkpoint-db",
+        default=None,
+        help="SQLite file for checkpoints (default: next to the sandbox venv). Implies --checkpoint.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its last checkpoint, reusing its sandbox. Implies --checkpoint.",
+    )
+
+
+def configure_rate_limiter(args: argparse.Namespace) -> None:
+    """Installs the process-wide LLM rate limiter the options ask for, if any."""
+    if args.requests_per_minute or args.tokens_per_minute:
+        BaseAgent.rate_limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+
+
+def build_healer(args: argparse.Namespace, repo_path: str, **overrides) -> Healer:
+    """Creates a Healer for ``repo_path`` from parsed options; ``overrides`` replace Healer kwargs."""
+    template_cache = None
+    if args.venv_cache_dir:
+        template_cache = VenvTemplateCache(args.venv_cache_dir, args.venv_cache_max_mb * 1024 * 1024)
+    wheelhouse = Wheelhouse(args.wheelhouse_dir) if args.wheelhouse_dir else None
+    response_cache = None
+    if args.llm_cache:
+        response_cache = LLMResponseCache(args.llm_cache, mode=args.llm_cache_mode, ttl_seconds=args.llm_cache_ttl)
+    kwargs = dict(
+        template_cache=template_cache,
+        wheelhouse=wheelhouse,
+        patch_mode=args.patch_mode,
+        response_cache=response_cache,
+        stream_responses=args.stream,
+        parallel_candidates=args.candidates,
+        preflight=args.preflight,
+        command_limits=RunLimits(timeout_seconds=args.command_timeout),
+        run_limits=RunLimits(
+            timeout_seconds=args.run_timeout or None,
+            cpu_seconds=args.cpu_limit,
+            memory_bytes=args.memory_limit_mb * 1024 * 1024 if args.memory_limit_mb else None,
+            healthy_after_seconds=args.healthy_after,
+        ),
+        log_dir=args.log_dir,
+        warm_worker=args.warm_worker,
+        checkpoints=args.checkpoint or args.resume,
+        checkpoint_path=args.checkpoint_db,
+        trace_path=args.trace,
+        run_tests=args.run_tests,
+        test_workers=args.test_workers,
+        test_coverage_file=args.test_coverage_file,
+    )
+    kwargs.update(overrides)
+    return Healer(repo_path=repo_path, **kwargs)
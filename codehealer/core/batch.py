@@ -0,0 +1,237 @@
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from dataclasses import asdict, dataclass
+from multiprocessing.managers import BaseManager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from codehealer.agents.base_agent import BaseAgent
+from codehealer.utils.rate_limiter import RateLimiter, SharedRateLimiter
+
+# ``healed``: the entry point (or package imports) ran cleanly; ``failed``:
+# the heal gave up; ``error``: the heal itself crashed.
+STATUSES = ("healed", "failed", "error")
+
+
+def discover_repos(path: str) -> List[str]:
+    """Lists the repositories to heal.
+
+    ``path`` is either a directory whose (non-hidden) subdirectories are the
+    repositories, or a manifest: a JSON list of paths or ``{"path": ...}``
+    objects, or a text file with one path per line (``#`` starts a comment).
+    Relative manifest entries are resolved against the manifest's directory.
+    """
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if not name.startswith(".") and os.path.isdir(os.path.join(path, name))
+        )
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        entries = [entry["path"] if isinstance(entry, dict) else entry for entry in json.loads(content)]
+    else:
+        entries = [line.split("#", 1)[0].strip() for line in content.splitlines()]
+    base = os.path.dirname(os.path.abspath(path))
+    return [os.path.normpath(os.path.join(base, entry)) for entry in entries if entry]
+
+
+@dataclass
+class RepoResult:
+    """The outcome of healing one repository in a batch."""
+
+    repo: str
+    status: str
+    iterations: int = 0
+    wall_seconds: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    llm_calls: int = 0
+    cache_hits: int = 0
+    log_path: Optional[str] = None
+    trace_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class RateLimiterManager(BaseManager):
+    """Serves one :class:`RateLimiter` to every worker process of a batch."""
+
+
+RateLimiterManager.register("RateLimiter", RateLimiter)
+
+
+@contextmanager
+def _redirect_output(log) -> Iterator[None]:
+    """Sends this process's output to ``log``, at the file-descriptor level too."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    try:
+        with redirect_stdout(log), redirect_stderr(log):
+            yield
+    finally:
+        log.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        os.close(saved[0])
+        os.close(saved[1])
+
+
+def heal_repo(
+    healer_factory: Callable,
+    repo_path: str,
+    output_dir: str,
+    rate_limiter=None,
+    limits_tokens: bool = False,
+    resume: bool = False,
+) -> RepoResult:
+    """Heals one repository; runs in a batch worker process.
+
+    ``healer_factory(repo_path, **overrides)`` creates the Healer.  Its
+    output goes to ``output_dir/heal.log``, command logs and the trace next
+    to it.  ``rate_limiter`` is the batch's shared limiter proxy, if any.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    result = RepoResult(repo_path, "error", log_path=os.path.join(output_dir, "heal.log"))
+    if rate_limiter is not None:
+        BaseAgent.rate_limiter = SharedRateLimiter(rate_limiter, limits_tokens)
+    healer = None
+    started = time.perf_counter()
+    with open(result.log_path, "w", encoding="utf-8", buffering=1) as log, _redirect_output(log):
+        try:
+            healer = healer_factory(
+                repo_path,
+                log_dir=os.path.join(output_dir, "commands"),
+                trace_path=os.path.join(output_dir, "trace.json"),
+            )
+            result.status = "healed" if healer.heal(resume=resume) else "failed"
+        except Exception as e:
+            traceback.print_exc()
+            result.error = f"{type(e).__name__}: {e}"
+    result.wall_seconds = time.perf_counter() - started
+    if healer is not None:
+        if healer.final_state:
+            result.iterations = healer.final_state.get("iteration", 0)
+        if healer.tracer is not None:
+            result.trace_path = healer.trace_path
+            for row in healer.tracer.summary_rows():
+                if row["category"] == "llm":
+                    result.tokens_in += row["tokens_in"]
+                    result.tokens_out += row["tokens_out"]
+                    result.llm_calls += row["count"]
+                    result.cache_hits += row["cache_hits"]
+    return result
+
+
+def _output_names(repos: List[str]) -> Dict[str, str]:
+    """Gives every repository a distinct output directory name."""
+    names: Dict[str, str] = {}
+    used = set()
+    for repo in repos:
+        base = os.path.basename(os.path.normpath(repo)) or "repo"
+        name, suffix = base, 2
+        while name in used:
+            name, suffix = f"{base}-{suffix}", suffix + 1
+        used.add(name)
+        names[repo] = name
+    return names
+
+
+def run_batch(
+    repos: List[str],
+    healer_factory: Callable,
+    output_dir: str,
+    max_workers: int = 4,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    resume: bool = False,
+) -> List[RepoResult]:
+    """Heals ``repos`` in a pool of at most ``max_workers`` processes.
+
+    Workers share one LLM rate limiter (served by a manager process) and
+    whatever file-based caches ``healer_factory`` configures; the venv
+    template cache, wheelhouse (wheels are built privately and renamed in)
+    and LLM response cache are safe to use from several processes.  Results are appended to ``results.jsonl`` as
+    repositories finish, and ``summary.json`` is written at the end.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    repos = list(dict.fromkeys(repos))
+    names = _output_names(repos)
+    manager = shared_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        manager = RateLimiterManager()
+        manager.start()
+        shared_limiter = manager.RateLimiter(requests_per_minute, tokens_per_minute)
+
+    print(f"[batch] Healing {len(repos)} repositories with {max_workers} worker(s); output in {output_dir}")
+    started = time.perf_counter()
+    results: Dict[str, RepoResult] = {}
+    try:
+        with open(os.path.join(output_dir, "results.jsonl"), "w", encoding="utf-8") as results_file, \
+                ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(
+                    heal_repo, healer_factory, repo, os.path.join(output_dir, names[repo]),
+                    shared_limiter, bool(tokens_per_minute), resume,
+                ): repo
+                for repo in repos
+            }
+            for future in as_completed(futures):
+                repo = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process died (e.g. killed for memory) or the result did not pickle.
+                    result = RepoResult(repo, "error", error=f"{type(e).__name__}: {e}")
+                results[repo] = result
+                results_file.write(json.dumps(asdict(result)) + "\n")
+                results_file.flush()
+                print(f"[batch] ({len(results)}/{len(repos)}) {result.status}: {repo} in {result.wall_seconds:.1f}s")
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+    ordered = [results[repo] for repo in repos]
+    counts = {status: sum(1 for result in ordered if result.status == status) for status in STATUSES}
+    summary = {
+        "repos": len(ordered),
+        **counts,
+        "wall_seconds": time.perf_counter() - started,
+        "tokens_in": sum(result.tokens_in for result in ordered),
+        "tokens_out": sum(result.tokens_out for result in ordered),
+        "results": [asdict(result) for result in ordered],
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print("\n[batch] Results:")
+    print(format_results(ordered))
+    print(f"[batch] {counts['healed']} healed, {counts['failed']} failed, {counts['error']} errors "
+          f"in {summary['wall_seconds']:.1f}s")
+    return ordered
+
+
+def format_results(results: List[RepoResult]) -> str:
+    """Formats batch results as a fixed-width table."""
+    header = ("repository", "status", "iterations", "wall s", "tokens in", "tokens out", "llm calls")
+    lines = [header]
+    for result in results:
+        lines.append((
+            result.repo[-48:],
+            result.status,
+            str(result.iterations),
+            f"{result.wall_seconds:.1f}",
+            str(result.tokens_in),
+            str(result.tokens_out),
+            str(result.llm_calls),
+        ))
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(widths[i]) if i < 2 else cell.rjust(widths[i]) for i, cell in enumerate(line))
+        for line in lines
+    )
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from codehealer.utils import tracing
+from codehealer.utils.runner import Runner
+from codehealer.utils.sandbox import SandboxManager
+
+
+@dataclass
+class CandidateResult:
+    """The outcome of running the entry point with one candidate fix applied."""
+
+    index: int
+    fixes: List[Tuple[str, str]]
+    exit_code: int
+    log: str
+
+    @property
+    def passed(self) -> bool:
+        return self.exit_code == 0
+
+
+class CandidateEvaluator:
+    """Runs candidate fixes concurrently, each in its own clone of the repository and venv.
+
+    Every candidate runs as a separate OS process inside its clone; the
+    threads here only set up clones and wait on those processes.  The first
+    candidate whose run exits cleanly wins and the rest are killed.
+    """
+
+    def __init__(
+        self,
+        sandbox: SandboxManager,
+        count: int = 4,
+        max_workers: Optional[int] = None,
+        runner: Optional[Runner] = None,
+    ):
+        if count < 1:
+            raise ValueError("count must be at least 1.")
+        self.sandbox = sandbox
+        # Candidate runs inherit this runner's limits and log directory.
+        self.runner = runner
+        self.count = count
+        self.max_workers = max_workers or count
+
+    def _evaluate_one(
+        self,
+        index: int,
+        fixes: List[Tuple[str, str]],
+        entry_point: str,
+        runners: Dict[int, Runner],
+        stop: threading.Event,
+    ) -> Optional[CandidateResult]:
+        work_dir = tempfile.mkdtemp(prefix=f"candidate-{index + 1}-", dir=self.sandbox.candidates_root)
+        try:
+            clone = self.sandbox.clone(os.path.join(work_dir, "repo"))
+            for abs_path, content in fixes:
+                target = os.path.join(clone.repo_path, os.path.relpath(abs_path, self.sandbox.repo_path))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "w", encoding="utf-8") as f:
+                    f.write(content)
+            runner = Runner(clone.repo_path, clone)
+            if self.runner is not None:
+                runner.command_limits = self.runner.command_limits
+                runner.entry_point_limits = self.runner.entry_point_limits
+                runner.log_dir = self.runner.log_dir
+            runners[index] = runner
+            if stop.is_set():
+                return None
+            exit_code, log = runner.run_entry_point(entry_point)
+            return CandidateResult(index, fixes, exit_code, log)
+        except Exception as e:
+            return CandidateResult(index, fixes, -1, f"Error: Could not evaluate candidate {index + 1}: {e}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def evaluate(
+        self, entry_point: str, candidates: List[List[Tuple[str, str]]]
+    ) -> Tuple[Optional[CandidateResult], List[CandidateResult]]:
+        """Runs ``entry_point`` once per candidate and returns ``(winner, finished results)``.
+
+        ``winner`` is ``None`` when no candidate passed.  Results are ordered
+        by candidate index; candidates stopped because another won are left out.
+        """
+        os.makedirs(self.sandbox.candidates_root, exist_ok=True)
+        runners: Dict[int, Runner] = {}
+        stop = threading.Event()
+        winner: Optional[CandidateResult] = None
+        results: List[CandidateResult] = []
+        print(f"[candidates] Evaluating {len(candidates)} candidate fix(es) in parallel...")
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(candidates))))
+        try:
+            futures = [
+                executor.submit(tracing.bind(self._evaluate_one), index, fixes, entry_point, runners, stop)
+                for index, fixes in enumerate(candidates)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                results.append(result)
+                print(f"[candidates] Candidate {result.index + 1} exited with code {result.exit_code}.")
+                if result.passed:
+                    winner = result
+                    break
+        finally:
+            stop.set()
+            for runner in list(runners.values()):
+                runner.terminate()
+            executor.shutdown(wait=True, cancel_futures=True)
+        return winner, sorted(results, key=lambda r: r.index)
@@ -0,0 +1,75 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# The parts of ``AgentState`` that are plain data; everything else (the
+# sandbox, runner, agents, ...) and the run's configuration come from the
+# Healer on resume.
+CHECKPOINT_KEYS = ("iteration", "log", "is_success", "phase", "attempt_history", "preflight_pending")
+
+
+@dataclass
+class Checkpoint:
+    """The serializable state of a run as a graph node was about to start."""
+
+    node: str
+    state: Dict[str, Any]
+    created: float
+
+
+class CheckpointStore:
+    """Durable per-node checkpoints of healing runs in a local SQLite file.
+
+    A checkpoint is written before every node runs, so after a crash the
+    latest one names the node to continue from and the state it starts
+    with.  Runs are keyed by ``run_id`` (the repository path) and only the
+    history of the current run is kept.
+    """
+
+    def __init__(self, path: str, run_id: str):
+        self.path = os.path.abspath(path)
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " run_id TEXT NOT NULL, seq INTEGER NOT NULL, node TEXT NOT NULL,"
+                " state TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (run_id, seq))"
+            )
+
+    def save(self, node: str, state: Dict[str, Any]) -> None:
+        payload = json.dumps(state)
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM checkpoints WHERE run_id = ?", (self.run_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO checkpoints (run_id, seq, node, state, created) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, seq, node, payload, time.time()),
+            )
+
+    def latest(self) -> Optional[Checkpoint]:
+        """Returns the most recent checkpoint of this run, or ``None``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT node, state, created FROM checkpoints WHERE run_id = ? ORDER BY seq DESC LIMIT 1",
+                (self.run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(row[0], json.loads(row[1]), row[2])
+
+    def clear(self) -> None:
+        """Forgets this run, e.g. once it has finished or when a fresh one starts."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (self.run_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,12 +1,19 @@
-from typing import TypedDict, Optional, List
+from typing import TypedDict, Optional, List, Tuple
 from langgraph.graph import StateGraph, END
 import os
 
 from codehealer.utils.sandbox import SandboxManager
 from codehealer.utils.runner import Runner
 from codehealer.utils.file_handler import FileHandler
+from codehealer.utils.import_scanner import generate_requirements
+from codehealer.utils.requirements import merge_requirements
+from codehealer.utils.preflight import format_report, run_preflight
+from codehealer.utils.import_probe import format_failures
+from codehealer.utils import tracing
 from codehealer.agents.environment_agent import EnvironmentAgent
 from codehealer.agents.code_agent import CodeAgent
+from codehealer.core.candidates import CandidateEvaluator
+from codehealer.core.checkpoint import CHECKPOINT_KEYS, CheckpointStore
 
 class AgentState(TypedDict):
     sandbox: SandboxManager
@@ -20,15 +27,23 @@ class AgentState(TypedDict):
     is_success: bool
     phase: str
     attempt_history: List[str]
+    candidate_evaluator: Optional[CandidateEvaluator]
+    preflight_pending: bool
+    checkpoints: Optional[CheckpointStore]
+    resume_node: Optional[str]
+    run_tests: bool
 
 def setup_sandbox_node(state: AgentState) -> dict:
     sandbox = state["sandbox"]
     print("\n--- Phase 1: Setting up Sandbox ---")
     sandbox.create()
+    sandbox.snapshot()
+    state["runner"].installed_requirements = {}
     print("✅ Sandbox created.")
     return {"iteration": 0, "phase": "environment", "attempt_history": []}
 
 def heal_environment_node(state: AgentState) -> dict:
+    sandbox = state["sandbox"]
     runner = state["runner"]
     file_handler = state["file_handler"]
     env_agent = state["env_agent"]
@@ -40,33 +55,48 @@ def heal_environment_node(state: AgentState) -> dict:
     
     requirements_path = runner.find_requirements()
     if not requirements_path:
-        print("`requirements.txt` not found. Asking EnvironmentAgent to generate one...")
+        print("`requirements.txt` not found. Generating one from the repository's imports...")
         all_files = file_handler.list_all_python_files(runner.repo_path)
-        source_code_str = "\n".join(f"--- FILE: {path} ---\n{content}" for path, content in all_files.items())
-        
-        suggestion = env_agent.get_suggestion(source_code_str, None, attempt_history)
-        
-        if suggestion:
-            new_req_path = os.path.join(runner.repo_path, 'requirements.txt')
-            print(f"Applying suggested fix to create {os.path.basename(new_req_path)}...")
-            file_handler.write_file(new_req_path, suggestion)
-            attempt_history.append(suggestion)
-            update["is_success"] = False # Loop back to try installing the new file
-        else:
-            print("❌ Agent provided no suggestion. Cannot create environment.")
-            update.update({"is_success": False, "phase": "fail"})
+        suggestion, unresolved = generate_requirements(all_files)
+
+        if unresolved:
+            # Only the files that use ambiguous imports go to the LLM.
+            print(f"Asking EnvironmentAgent to resolve ambiguous imports: {', '.join(sorted(unresolved))}")
+            involved = sorted(set().union(*unresolved.values()))
+            source_code_str = "\n".join(f"--- FILE: {path} ---\n{all_files[path]}" for path in involved)
+            agent_suggestion = env_agent.get_suggestion(source_code_str, None, attempt_history)
+            if agent_suggestion:
+                suggestion = merge_requirements(suggestion, agent_suggestion)
+
+        new_req_path = os.path.join(runner.repo_path, 'requirements.txt')
+        print(f"Applying generated {os.path.basename(new_req_path)}...")
+        file_handler.write_file(new_req_path, suggestion)
+        attempt_history.append(suggestion)
+        update["is_success"] = False # Loop back to try installing the new file
         return update
 
-    exit_code, log = runner.install_dependencies()
+    # Validate the candidate with a resolve-only pass first; only candidates
+    # that resolve pay for a real install.
+    exit_code, log = runner.resolve_dependencies()
+    if exit_code == 0:
+        print(f"[runner] {log.splitlines()[0] if log else 'Resolution check passed.'}")
+        exit_code, log = runner.install_dependencies()
     update["log"] = log
 
     if exit_code == 0:
         print("✅ Dependencies installed successfully.")
+        sandbox.snapshot()
         update.update({"is_success": True, "phase": "runtime", "attempt_history": []})
     else:
-        print("Dependency installation failed. Consulting EnvironmentAgent...")
+        print("Dependency installation failed. Rolling back sandbox and consulting EnvironmentAgent...")
+        # Discard any half-installed packages so the next attempt starts from
+        # the last known-good environment instead of a rebuilt one; the next
+        # install is then a delta against that environment's requirements.
+        if not sandbox.restore():
+            runner.installed_requirements = None
         original_reqs = file_handler.read_file(requirements_path)
-        suggestion = env_agent.get_suggestion(log, original_reqs, attempt_history)
+        conflict = runner.last_conflict.summary() if runner.last_conflict is not None else None
+        suggestion = env_agent.get_suggestion(log, original_reqs, attempt_history, conflict)
         
         if suggestion:
             print("Applying suggested fix to requirements.txt...")
@@ -79,6 +109,94 @@ def heal_environment_node(state: AgentState) -> dict:
             
     return update
 
+def _suggest_runtime_fix(
+    state: AgentState, entry_point: str, log: str, attempt_history: List[str]
+) -> Optional[List[Tuple[str, str]]]:
+    """Asks the CodeAgent for a fix, trying several candidates in parallel when configured."""
+    code_agent = state["code_agent"]
+    evaluator = state.get("candidate_evaluator")
+    if evaluator is None or evaluator.count < 2:
+        return code_agent.get_suggestion(log, attempt_history)
+
+    candidates = code_agent.get_suggestions(log, attempt_history, evaluator.count)
+    if not candidates:
+        return None
+    winner, results = evaluator.evaluate(entry_point, candidates)
+    if winner is not None:
+        print(f"✅ Candidate {winner.index + 1} of {len(candidates)} passed in its sandbox clone.")
+        return winner.fixes
+    # Nothing passed: apply the first candidate as the sequential mode would,
+    # and remember the others so the next round avoids all of them.
+    for result in results:
+        if result.index > 0:
+            attempt_history.append("\n---\n".join(content for _, content in result.fixes))
+    return candidates[0]
+
+def _apply_fixes(file_handler: FileHandler, fixes: List[Tuple[str, str]], attempt_history: List[str], message: str) -> None:
+    all_new_content = []
+    for file_to_patch, new_content in fixes:
+        print(f"{message} {os.path.basename(file_to_patch)}...")
+        file_handler.write_file(file_to_patch, new_content)
+        all_new_content.append(new_content)
+    attempt_history.append("\n---\n".join(all_new_content))
+
+def _preflight(state: AgentState, entry_point: str, attempt_history: List[str]) -> Optional[List[Tuple[str, str]]]:
+    """Statically checks the code reachable from the entry point and asks for one batched fix."""
+    runner = state["runner"]
+    all_files = state["file_handler"].list_all_python_files(runner.repo_path)
+    issues = run_preflight(all_files, entry_point, state["sandbox"].venv_path)
+    if not issues:
+        print("✅ Pre-flight checks found no problems.")
+        return None
+    report = format_report(issues)
+    print(report)
+    print("Consulting CodeAgent about the pre-flight findings...")
+    return state["code_agent"].get_suggestion(report, attempt_history)
+
+def _check_packages(state: AgentState, attempt_history: List[str]) -> dict:
+    """Imports every top-level package in one probe and asks for a fix for those that fail."""
+    results = state["runner"].probe_packages()
+    failed = [result for result in results if not result.ok]
+    if not failed:
+        print(f"✅ All {len(results)} package(s) imported successfully.")
+        return {"is_success": True}
+    report = format_failures(results)
+    print(report)
+    print("Consulting CodeAgent about the failing imports...")
+    fixes = state["code_agent"].get_suggestion(report, attempt_history)
+    if not fixes:
+        print("❌ Agent could not determine a fix for the failing imports.")
+        return {"log": report, "is_success": False, "phase": "fail"}
+    _apply_fixes(state["file_handler"], fixes, attempt_history, "Applying suggested fix to")
+    return {"log": report, "is_success": False}
+
+def _check_tests(state: AgentState, attempt_history: List[str]) -> dict:
+    """Runs the tests affected by the fixes so far, then the full suite, and asks for a fix if either fails."""
+    runner = state["runner"]
+    if not runner.is_pytest_installed():
+        print("pytest is not installed in the sandbox; skipping the test suite.")
+        return {"is_success": True}
+    # Other written files (e.g. requirements.txt) would force a second full
+    # run; the confirmation run below covers them.
+    changed = [path for path in state["file_handler"].take_written_paths() if path.endswith(".py")]
+    exit_code, log = runner.run_tests(changed)
+    if exit_code == 0:
+        print("Affected tests passed. Confirming with the full test suite...")
+        exit_code, log = runner.run_tests()
+        if exit_code == 5:
+            # pytest: the repository has no tests to collect.
+            exit_code = 0
+    if exit_code == 0:
+        print("✅ The test suite passed.")
+        return {"log": log, "is_success": True}
+    print("Test failures detected. Consulting CodeAgent...")
+    fixes = state["code_agent"].get_suggestion(log, attempt_history)
+    if not fixes:
+        print("❌ Agent could not determine a fix for the failing tests.")
+        return {"log": log, "is_success": False, "phase": "fail"}
+    _apply_fixes(state["file_handler"], fixes, attempt_history, "Applying suggested fix to")
+    return {"log": log, "is_success": False}
+
 def heal_runtime_node(state: AgentState) -> dict:
     runner = state["runner"]
     code_agent = state["code_agent"]
@@ -95,34 +213,37 @@ def heal_runtime_node(state: AgentState) -> dict:
         status_log = "No entry point found (e.g., main.py, app.py). Please analyze the repository and create one."
         fixes = code_agent.get_suggestion(status_log, attempt_history)
         if fixes:
-            all_new_content = []
-            for file_to_patch, new_content in fixes:
-                print(f"Applying suggested change to create/update {os.path.basename(file_to_patch)}...")
-                file_handler.write_file(file_to_patch, new_content)
-                all_new_content.append(new_content)
-            attempt_history.append("\n---\n".join(all_new_content))
+            _apply_fixes(file_handler, fixes, attempt_history, "Applying suggested change to create/update")
             update["is_success"] = False # Loop back to try running the new entry point
         else:
             print("Could not generate an entry point. Checking for importable packages.")
-            update["is_success"] = True # Move on to package import checks
+            update.update(_check_packages(state, attempt_history))
+            if update["is_success"] and state.get("run_tests"):
+                update.update(_check_tests(state, attempt_history))
         return update
 
+    if state.get("preflight_pending"):
+        # Only before the first run: afterwards the runs themselves report errors.
+        update["preflight_pending"] = False
+        fixes = _preflight(state, entry_point, attempt_history)
+        if fixes:
+            _apply_fixes(file_handler, fixes, attempt_history, "Applying pre-flight fix to")
+            update["is_success"] = False
+            return update
+
     exit_code, log = runner.run_entry_point(entry_point)
     update["log"] = log
 
     if exit_code == 0:
         print(f"✅ Entry point '{entry_point}' ran successfully.")
         update["is_success"] = True
+        if state.get("run_tests"):
+            update.update(_check_tests(state, attempt_history))
     else:
         print("Runtime error detected. Consulting CodeAgent...")
-        fixes = code_agent.get_suggestion(log, attempt_history)
+        fixes = _suggest_runtime_fix(state, entry_point, log, attempt_history)
         if fixes:
-            all_new_content = []
-            for file_to_patch, new_content in fixes:
-                print(f"Applying suggested fix to {os.path.basename(file_to_patch)}...")
-                file_handler.write_file(file_to_patch, new_content)
-                all_new_content.append(new_content)
-            attempt_history.append("\n---\n".join(all_new_content))
+            _apply_fixes(file_handler, fixes, attempt_history, "Applying suggested fix to")
             update["is_success"] = False
         else:
             print("❌ Agent could not determine a fix for the runtime error.")
@@ -142,15 +263,40 @@ def decide_next_step(state: AgentState) -> str:
         return "heal_runtime" if not state["is_success"] else "finish"
     return "fail"
 
+def checkpoint_state(state: AgentState) -> dict:
+    """Returns the serializable part of ``state``, plus the runner's view of installed requirements."""
+    data = {key: state[key] for key in CHECKPOINT_KEYS if key in state}
+    data["installed_requirements"] = state["runner"].installed_requirements
+    return data
+
+def _node(name: str, node):
+    """Wraps ``node`` so it is traced and checkpointed.
+
+    The checkpoint is saved before the node runs, so a resumed run starts it
+    again with the same state.
+    """
+    def run(state: AgentState):
+        store = state.get("checkpoints")
+        if store is not None:
+            store.save(name, checkpoint_state(state))
+        with tracing.span(name, "node", iteration=state.get("iteration")):
+            return node(state)
+    return run
+
+NODES = ("setup_sandbox", "heal_environment", "heal_runtime", "finish", "fail")
+
 def build_graph():
     workflow = StateGraph(AgentState)
-    workflow.add_node("setup_sandbox", setup_sandbox_node)
-    workflow.add_node("heal_environment", heal_environment_node)
-    workflow.add_node("heal_runtime", heal_runtime_node)
-    workflow.add_node("finish", lambda state: print("\n✨ Repository healed successfully!"))
-    workflow.add_node("fail", lambda state: print("\n❌ Healing process failed."))
+    workflow.add_node("setup_sandbox", _node("setup_sandbox", setup_sandbox_node))
+    workflow.add_node("heal_environment", _node("heal_environment", heal_environment_node))
+    workflow.add_node("heal_runtime", _node("heal_runtime", heal_runtime_node))
+    workflow.add_node("finish", _node("finish", lambda state: print("\n✨ Repository healed successfully!")))
+    workflow.add_node("fail", _node("fail", lambda state: print("\n❌ Healing process failed.")))
 
-    workflow.set_entry_point("setup_sandbox")
+    # A resumed run starts at the node its last checkpoint was taken before.
+    workflow.set_conditional_entry_point(
+        lambda s: s.get("resume_node") or "setup_sandbox", {name: name for name in NODES}
+    )
     workflow.add_edge("setup_sandbox", "heal_environment")
     
     workflow.add_conditional_edges(
@@ -1,33 +1,97 @@
 import os
+from typing import Optional
 from codehealer.agents.environment_agent import EnvironmentAgent
 from codehealer.agents.code_agent import CodeAgent
 from codehealer.utils.runner import Runner
 from codehealer.utils.file_handler import FileHandler
 from codehealer.utils.sandbox import SandboxManager
+from codehealer.utils.venv_cache import VenvTemplateCache
+from codehealer.utils.wheelhouse import Wheelhouse
+from codehealer.utils.llm_cache import LLMResponseCache
+from codehealer.utils.limits import RunLimits
+from codehealer.core.candidates import CandidateEvaluator
+from codehealer.core.checkpoint import CheckpointStore
+from codehealer.utils import tracing
+from codehealer.utils.tracing import Tracer
 from codehealer.core.graph import build_graph, AgentState
 
 class Healer:
     """Orchestrates the healing process using a LangGraph-defined workflow."""
 
-    def __init__(self, repo_path: str, max_iterations: int = 50):
+    def __init__(
+        self,
+        repo_path: str,
+        max_iterations: int = 50,
+        template_cache: Optional[VenvTemplateCache] = None,
+        wheelhouse: Optional[Wheelhouse] = None,
+        patch_mode: bool = False,
+        response_cache: Optional[LLMResponseCache] = None,
+        stream_responses: bool = False,
+        parallel_candidates: int = 1,
+        preflight: bool = False,
+        command_limits: Optional[RunLimits] = None,
+        run_limits: Optional[RunLimits] = None,
+        log_dir: Optional[str] = None,
+        warm_worker: bool = False,
+        checkpoints: bool = False,
+        checkpoint_path: Optional[str] = None,
+        trace_path: Optional[str] = None,
+        run_tests: bool = False,
+        test_workers: Optional[int] = None,
+        test_coverage_file: Optional[str] = None,
+    ):
         self.repo_path = repo_path
         self.max_iterations = max_iterations
+        self.preflight = preflight
+        # Once the entry point runs, also require the repository's tests to pass.
+        self.run_tests = run_tests
+        # Where to write the Chrome-trace JSON of each heal; the summary table is always printed.
+        self.trace_path = trace_path
+        self.tracer: Optional[Tracer] = None
+        self.final_state: Optional[AgentState] = None
         
         # Core components remain the same
-        self.sandbox = SandboxManager(repo_path)
-        self.runner = Runner(self.repo_path, self.sandbox)
-        self.file_handler = FileHandler()
+        self.sandbox = SandboxManager(repo_path, template_cache=template_cache)
+        self.runner = Runner(self.repo_path, self.sandbox, wheelhouse=wheelhouse)
+        if command_limits is not None:
+            self.runner.command_limits = command_limits
+        # Limits for entry-point runs (e.g. a timeout or a health-check window).
+        self.runner.entry_point_limits = run_limits
+        # Full command output goes here; agents only see a bounded excerpt.
+        self.runner.log_dir = log_dir
+        self.runner.use_warm_worker = warm_worker
+        self.runner.test_workers = test_workers
+        self.runner.test_coverage_file = test_coverage_file
+        self.file_handler = FileHandler(ignore_patterns=[f"/{self.sandbox.venv_name}/"])
         self.env_agent = EnvironmentAgent(self.repo_path)
-        self.code_agent = CodeAgent(self.repo_path)
+        self.code_agent = CodeAgent(self.repo_path, patch_mode=patch_mode)
+        self.env_agent.response_cache = response_cache
+        self.code_agent.response_cache = response_cache
+        self.env_agent.stream = stream_responses
+        self.code_agent.stream = stream_responses
+        self.candidate_evaluator = (
+            CandidateEvaluator(self.sandbox, parallel_candidates, runner=self.runner) if parallel_candidates > 1 else None
+        )
+        # Per-node checkpoints let an interrupted run be resumed with ``heal(resume=True)``.
+        self.checkpoints = None
+        if checkpoints or checkpoint_path:
+            self.checkpoints = CheckpointStore(
+                checkpoint_path or self.sandbox.checkpoint_path, os.path.abspath(self.repo_path)
+            )
         
         # Compile the agentic workflow from the graph definition
         self.app = build_graph()
 
-    def heal(self):
+    def heal(self, resume: bool = False):
         """
         Executes the healing process by invoking the compiled LangGraph agent.
         The graph handles setup, environment healing, runtime healing, and manages
         the iterative loop until success or failure.
+
+        With ``resume`` (and checkpoints enabled), the run continues from the
+        node the last checkpoint was taken before instead of starting over.
+        Returns whether the repository ended up healed; the final graph
+        state is kept as ``final_state``.
         """
         initial_state: AgentState = {
             "sandbox": self.sandbox,
@@ -39,12 +103,69 @@ class Healer:
             "max_iterations": self.max_iterations,
             "log": "",
             "is_success": False,
-            "phase": "setup"
+            "phase": "setup",
+            "candidate_evaluator": self.candidate_evaluator,
+            "preflight_pending": self.preflight,
+            "checkpoints": self.checkpoints,
+            "resume_node": None,
+            "run_tests": self.run_tests,
         }
-        
+        if self.checkpoints is not None:
+            if resume:
+                self._resume(initial_state)
+            else:
+                self.checkpoints.clear()
+
+        completed = False
+        self.tracer = Tracer()
+        tracing.activate(self.tracer)
         try:
             # Run the graph from the initial state
-            self.app.invoke(initial_state)
+            self.final_state = self.app.invoke(initial_state)
+            completed = True
         finally:
-            print("\nCleaning up venv sandbox...")
-            self.sandbox.cleanup()
+            tracing.activate(None)
+            self._report_trace()
+            self.runner.stop_warm_worker()
+            if self.checkpoints is not None and not completed:
+                # Leave the sandbox for ``--resume`` to pick up.
+                print(f"\nRun interrupted; checkpoints kept in {self.checkpoints.path}.")
+            else:
+                if self.checkpoints is not None:
+                    self.checkpoints.clear()
+                print("\nCleaning up venv sandbox...")
+                self.sandbox.cleanup()
+        return bool(self.final_state and self.final_state.get("is_success"))
+
+    def _report_trace(self) -> None:
+        """Prints where the heal spent its time and writes the trace file when configured."""
+        print("\n[trace] Time, tokens and I/O by operation:")
+        print(self.tracer.summary_table())
+        if self.trace_path:
+            try:
+                self.tracer.write(self.trace_path)
+                print(f"[trace] Wrote Chrome trace to {self.trace_path}")
+            except OSError as e:
+                print(f"[trace] Warning: Could not write trace: {e}")
+
+    def _resume(self, state: AgentState) -> None:
+        """Loads the latest checkpoint into ``state`` and reattaches the sandbox."""
+        checkpoint = self.checkpoints.latest()
+        if checkpoint is None:
+            print("[checkpoint] No checkpoint to resume from; starting from the beginning.")
+            return
+        saved = dict(checkpoint.state)
+        installed = saved.pop("installed_requirements", {})
+        state.update(saved)
+        node = checkpoint.node
+        if node != "setup_sandbox" and not os.path.exists(self.sandbox.get_python_executable()):
+            print("[checkpoint] The sandbox venv is gone; recreating it and reinstalling dependencies.")
+            self.sandbox.create()
+            self.sandbox.snapshot()
+            installed = {}
+            if node == "heal_runtime":
+                node = "heal_environment"
+                state.update({"phase": "environment", "attempt_history": []})
+        self.runner.installed_requirements = installed
+        state["resume_node"] = node
+        print(f"[checkpoint] Resuming at '{node}' after iteration {state['iteration']}.")
@@ -0,0 +1,101 @@
+import fnmatch
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set
+
+from codehealer.utils.import_graph import ImportGraph
+
+# pytest's default ``python_files`` patterns.
+TEST_FILE_PATTERNS = ("test_*.py", "*_test.py")
+
+
+def is_test_file(rel_path: str) -> bool:
+    name = os.path.basename(rel_path)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in TEST_FILE_PATTERNS)
+
+
+def load_coverage_map(coverage_path: str, repo_path: str) -> Dict[str, Set[str]]:
+    """Maps each test file to the repository files it executed, from coverage.py data.
+
+    Reads a ``.coverage`` SQLite file recorded with per-test contexts
+    (``pytest --cov --cov-context=test``).  Returns an empty map when the
+    file is missing, unreadable, or has no per-test contexts.
+    """
+    if not os.path.exists(coverage_path):
+        return {}
+    coverage_map: Dict[str, Set[str]] = {}
+    try:
+        conn = sqlite3.connect(f"file:{coverage_path}?mode=ro", uri=True)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            measured = "line_bits" if "line_bits" in tables else "arc"
+            rows = conn.execute(
+                f"SELECT DISTINCT context.context, file.path FROM {measured}"
+                f" JOIN context ON context.id = {measured}.context_id"
+                f" JOIN file ON file.id = {measured}.file_id"
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+    root = os.path.abspath(repo_path)
+    for context, path in rows:
+        # pytest-cov names contexts ``tests/test_x.py::test_name|run``.
+        test_file = context.split("::", 1)[0]
+        if not test_file or not is_test_file(test_file):
+            continue
+        path = os.path.abspath(path)
+        if os.path.commonpath([root, path]) != root:
+            continue
+        coverage_map.setdefault(os.path.normpath(test_file), set()).add(os.path.relpath(path, root))
+    return coverage_map
+
+
+class TestSelector:
+    """Picks the test files affected by a set of changed repository files.
+
+    A test is affected when it changed itself, imports a changed file
+    (directly or through other repository modules), or, according to
+    ``coverage_map``, executed a changed file in a previous run.  Changes
+    whose effect cannot be bounded statically (non-Python files, deleted or
+    new modules outside the graph) select the whole suite.
+    """
+
+    __test__ = False  # Not a pytest test class.
+
+    def __init__(self, files: Dict[str, str], coverage_map: Optional[Dict[str, Set[str]]] = None):
+        self.files = files
+        self.graph = ImportGraph(files)
+        self.coverage_map = coverage_map or {}
+
+    def _importers(self, rel_path: str) -> Set[str]:
+        seen = {rel_path}
+        pending = [rel_path]
+        while pending:
+            for importer in self.graph.importers.get(pending.pop(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    pending.append(importer)
+        return seen
+
+    def select(self, changed: Iterable[str]) -> Optional[List[str]]:
+        """Returns the affected test files or directories, or ``None`` to run the full suite.
+
+        ``changed`` holds repository-relative paths.  A changed
+        ``conftest.py`` selects the directory it applies to.
+        """
+        selected: Set[str] = set()
+        directories: Set[str] = set()
+        for rel_path in (os.path.normpath(path) for path in changed):
+            if not rel_path.endswith(".py") or rel_path not in self.files:
+                return None
+            if os.path.basename(rel_path) == "conftest.py":
+                directory = os.path.dirname(rel_path)
+                if not directory:
+                    return None
+                directories.add(directory)
+                continue
+            selected.update(path for path in self._importers(rel_path) if is_test_file(path))
+            selected.update(test for test, executed in self.coverage_map.items() if rel_path in executed)
+        # Tests recorded in old coverage data may have been deleted since.
+        return sorted(directories | {path for path in selected if path in self.files})
@@ -0,0 +1,80 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from codehealer.utils.import_graph import ImportGraph
+from codehealer.utils.prompt_packer import DEFAULT_PROMPT_TOKEN_BUDGET, count_tokens
+
+_FRAME_RE = re.compile(r'File "([^"]+)", line \d+')
+_MISSING_MODULE_RE = re.compile(r"No module named '([^']+)'")
+_CANNOT_IMPORT_RE = re.compile(r"cannot import name '[^']+' from '([^']+)'")
+
+
+def implicated_files(traceback_log: str, files: Dict[str, str], repo_path: str, graph: ImportGraph) -> List[str]:
+    """Returns repository files implicated by a traceback, most relevant first.
+
+    Frames are taken innermost first (the failing line is usually closest to
+    the bug), followed by modules named in import errors and the files that
+    tried to import a missing module.
+    """
+    repo_root = os.path.realpath(repo_path)
+    found: List[str] = []
+
+    def add(rel_path: Optional[str]) -> None:
+        if rel_path is not None and rel_path in files and rel_path not in found:
+            found.append(rel_path)
+
+    for frame_path in reversed(_FRAME_RE.findall(traceback_log)):
+        if os.path.isabs(frame_path):
+            real = os.path.realpath(frame_path)
+            if real.startswith(repo_root + os.sep):
+                add(os.path.relpath(real, repo_root))
+        else:
+            add(os.path.normpath(frame_path))
+
+    for module in _CANNOT_IMPORT_RE.findall(traceback_log):
+        add(graph.resolve(module))
+
+    for module in _MISSING_MODULE_RE.findall(traceback_log):
+        top_level = module.split(".")[0]
+        for rel_path, external in graph.external_imports.items():
+            if top_level in external:
+                add(rel_path)
+
+    return found
+
+
+def select_context(
+    files: Dict[str, str],
+    traceback_log: str,
+    repo_path: str,
+    token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+) -> Dict[str, str]:
+    """Selects the files to show an agent for ``traceback_log`` within ``token_budget``.
+
+    Implicated files come first, then their direct importers and importees.
+    When the log implicates nothing (e.g. a missing entry point) every file
+    is a candidate.  Files are added in priority order until the budget is
+    spent; a file that does not fit is skipped so smaller ones can still be
+    included.
+    """
+    graph = ImportGraph(files)
+    seeds = implicated_files(traceback_log, files, repo_path, graph)
+
+    if seeds:
+        ranked = list(seeds)
+        for seed in seeds:
+            for neighbour in sorted(graph.neighbours(seed)):
+                if neighbour not in ranked:
+                    ranked.append(neighbour)
+    else:
+        ranked = list(files)
+
+    selected: Dict[str, str] = {}
+    remaining = token_budget
+    for rel_path in ranked:
+        cost = count_tokens(files[rel_path])
+        if cost <= remaining:
+            selected[rel_path] = files[rel_path]
+            remaining -= cost
+    return selected
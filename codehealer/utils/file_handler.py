@@ -1,13 +1,104 @@
 import os
 import difflib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Sequence, Union
+
+from codehealer.utils import tracing
+from codehealer.utils.ignore import IgnoreRules
+from codehealer.utils.patching import PatchResult, apply_patch_text
+
+# Below this many files a thread pool costs more than it saves.
+PARALLEL_READ_THRESHOLD = 256
+# Content (in characters) a handler's FileIndex keeps before evicting.
+DEFAULT_INDEX_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FileIndex:
+    """An in-memory cache of file contents keyed by ``(path, mtime, size)``.
+
+    A file is only re-read when its modification time or size changed since
+    it was last cached.  At most ``max_bytes`` of content is kept; the least
+    recently used files are dropped first.  ``hits`` and ``misses`` count
+    cache lookups.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_INDEX_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, reader) -> Optional[str]:
+        """Returns the contents of ``path``, calling ``reader`` only when it changed."""
+        return self.lookup(path, reader)[0]
+
+    def lookup(self, path: Path, reader) -> tuple[Optional[str], bool]:
+        """Like :meth:`get`, but also says whether the contents came from the cache."""
+        key = str(path)
+        try:
+            st = path.stat()
+        except OSError:
+            with self._lock:
+                self._discard(key)
+            return reader(path), False
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[2], True
+        content = reader(path)
+        with self._lock:
+            self.misses += 1
+            if content is not None:
+                self._store(key, (st.st_mtime_ns, st.st_size, content))
+        return content, False
+
+    def update(self, path: Path, content: str) -> None:
+        """Records ``content`` as the current contents of ``path`` right after a write."""
+        try:
+            st = path.stat()
+        except OSError:
+            with self._lock:
+                self._discard(str(path))
+            return
+        with self._lock:
+            self._store(str(path), (st.st_mtime_ns, st.st_size, content))
+
+    def discard_missing(self, root: Path, seen: set[str]) -> None:
+        """Drops entries under ``root`` that were not ``seen`` during the last scan."""
+        prefix = str(root) + os.sep
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix) and k not in seen]:
+                self._discard(key)
+
+    def _store(self, key: str, entry: tuple[int, int, str]) -> None:
+        self._discard(key)
+        self._entries[key] = entry
+        self._size += len(entry[2])
+        while self._size > self.max_bytes and self._entries:
+            _, (_, _, content) = self._entries.popitem(last=False)
+            self._size -= len(content)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[2])
 
 
 class FileHandler:
     """Handles reading from, writing to, and discovering files."""
 
-    def __init__(self, base_path: Optional[Union[str, os.PathLike]] = None) -> None:
+    def __init__(
+        self,
+        base_path: Optional[Union[str, os.PathLike]] = None,
+        ignore_patterns: Sequence[str] = (),
+    ) -> None:
         """Create a handler optionally tied to a repository root.
 
         Historically the class was instantiated without any arguments.  Recent
@@ -15,9 +106,19 @@ class FileHandler:
         to be able to provide a repository path.  To remain backward compatible
         we accept an optional ``base_path`` while keeping the zero-argument
         constructor working for existing tests and code.
+
+        ``ignore_patterns`` are ``.gitignore``-style patterns applied on top
+        of the repository's own ``.gitignore`` and the built-in deny-list when
+        scanning for files.
         """
 
         self.base_path = Path(base_path).resolve() if base_path is not None else None
+        self.ignore_patterns = list(ignore_patterns)
+        # Per handler, so nothing outlives the repository it was read from;
+        # writes through other handlers show up as a changed mtime or size.
+        self.index = FileIndex()
+        # Absolute paths written since the last ``take_written_paths``.
+        self.written_paths: set[str] = set()
 
     def _normalize_path(self, file_path: Union[str, os.PathLike]) -> Path:
         """Return a ``Path`` instance for ``file_path``."""
@@ -61,19 +162,65 @@ class FileHandler:
         print("[container] --- END DIFF ---")
         
         try:
-            with path.open('w', encoding='utf-8') as f:
-                f.write(content)
+            with tracing.span("write_file", "file", bytes_written=len(content.encode("utf-8"))):
+                with path.open('w', encoding='utf-8') as f:
+                    f.write(content)
+            self.index.update(path.resolve(), content)
+            self.written_paths.add(str(path.resolve()))
         except IOError as e:
             print(f"Error writing to file {file_path}: {e}")
 
-    def list_all_python_files(self, root_path: Optional[Union[str, os.PathLike]] = None) -> dict[str, str]:
+    def take_written_paths(self) -> set[str]:
+        """Returns the paths written since the previous call and starts a new set."""
+        written, self.written_paths = self.written_paths, set()
+        return written
+
+    def apply_patch(
+        self, file_path: Union[str, os.PathLike], patch: str, write: bool = True, current: Optional[str] = None
+    ) -> PatchResult:
+        """Applies a unified diff or search/replace blocks to ``file_path``.
+
+        Hunks are placed with fuzzy context matching (nearest position to the
+        hunk header, whitespace-tolerant comparison, then up to two dropped
+        context lines).  Hunks that still do not fit are reported in
+        ``PatchResult.rejected`` and the rest are applied.  A missing file is
+        patched as empty, which lets a patch create it.  ``current`` is
+        patched instead of the file's content when given, e.g. a copy that
+        earlier edits have already changed in memory.
+        """
+        path = self._normalize_path(file_path)
+        if current is not None:
+            original = current
+        else:
+            original = self.read_file(path) if path.exists() else ""
+        result = apply_patch_text(original or "", patch)
+        for rejected in result.rejected:
+            print(f"[container] Rejected hunk for {path}:\n{rejected}")
+        if write and result.applied:
+            self.write_file(path, result.content)
+        return result
+
+    def list_all_python_files(
+        self,
+        root_path: Optional[Union[str, os.PathLike]] = None,
+        max_workers: Optional[int] = None,
+    ) -> dict[str, str]:
         """Lists all python files in a directory.
 
+        File contents come from the handler's :class:`FileIndex`, so repeated
+        scans only re-read files that changed since the previous scan.
+        Ignored directories (sandbox venvs, VCS metadata, build output,
+        ``.gitignore`` matches) are pruned during the walk, not filtered after.
+
         Parameters
         ----------
         root_path:
             Optional path to search.  When omitted we fall back to the
             ``base_path`` provided at construction time.
+        max_workers:
+            Number of threads used to read files.  ``1`` reads serially; the
+            default reads serially for small trees and uses a bounded thread
+            pool once there are more than ``PARALLEL_READ_THRESHOLD`` files.
         """
 
         search_root: Optional[Path]
@@ -86,14 +233,43 @@ class FileHandler:
             raise ValueError("No root path provided for listing python files.")
 
         search_root = search_root.resolve()
-        py_files = {}
-        for root, _, files in os.walk(search_root):
+        rules = IgnoreRules.for_root(str(search_root), self.ignore_patterns)
+        paths: list[Path] = []
+        for root, dirs, files in os.walk(search_root):
+            rel_root = os.path.relpath(root, search_root)
+            rel_root = "" if rel_root == os.curdir else rel_root
+            dirs[:] = [
+                d for d in dirs
+                if not rules.is_ignored(os.path.join(rel_root, d), True, os.path.join(root, d))
+            ]
             for file in files:
-                if file.endswith(".py"):
-                    full_path = Path(root) / file
-                    relative_path = os.path.relpath(full_path, search_root)
-                    content = self.read_file(full_path)
-                    if content:
-                        py_files[relative_path] = content
+                if file.endswith(".py") and not rules.is_ignored(os.path.join(rel_root, file), False):
+                    paths.append(Path(root) / file)
+
+        if max_workers is None:
+            max_workers = 1 if len(paths) <= PARALLEL_READ_THRESHOLD else min(8, (os.cpu_count() or 1) + 4)
+        with tracing.span("list_python_files", "file", files=len(paths)) as span:
+            if max_workers > 1:
+                # Hand each thread a contiguous batch rather than one future per
+                # file; per-task overhead otherwise dominates small reads.
+                batch_size = max(1, -(-len(paths) // (max_workers * 4)))
+                batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    results = pool.map(lambda batch: [self.index.lookup(p, self.read_file) for p in batch], batches)
+                    lookups = [lookup for batch in results for lookup in batch]
+            else:
+                lookups = [self.index.lookup(path, self.read_file) for path in paths]
+            contents = [content for content, _ in lookups]
+            # Only cache misses touch the disk; hits are reported separately.
+            span.set(
+                bytes_read=sum(len(content) for content, hit in lookups if content and not hit),
+                cache_hits=sum(1 for _, hit in lookups if hit),
+            )
+
+        py_files = {}
+        for full_path, content in zip(paths, contents):
+            if content:
+                py_files[os.path.relpath(full_path, search_root)] = content
+        self.index.discard_missing(search_root, {str(path) for path in paths})
         return py_files
 
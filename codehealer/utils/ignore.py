@@ -0,0 +1,128 @@
+import os
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from codehealer.utils.sandbox import DEFAULT_VENV_NAME
+
+# Directories that never contain code worth scanning or sending to an agent.
+DEFAULT_EXCLUDED_DIRS = frozenset({
+    DEFAULT_VENV_NAME,
+    f"{DEFAULT_VENV_NAME}.snapshots",
+    f"{DEFAULT_VENV_NAME}.candidates",
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    ".ipynb_checkpoints",
+    "node_modules",
+    "build",
+    "dist",
+    ".eggs",
+    ".tox",
+    ".nox",
+    ".venv",
+    "venv",
+    "site-packages",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+})
+
+
+def _pattern_to_regex(pattern: str) -> str:
+    """Translates the glob part of a ``.gitignore`` pattern into a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+class IgnoreRules:
+    """Decides which paths a repository walk should skip.
+
+    Combines a built-in deny-list of directory names, any directory that is a
+    virtual environment (contains ``pyvenv.cfg``), and ``.gitignore``-style
+    patterns: ``#`` comments, ``!`` negation, trailing ``/`` for
+    directories, anchoring with a leading or inner ``/``, and ``*``, ``?``,
+    ``[...]`` and ``**`` globs.  The last matching pattern wins.
+    """
+
+    def __init__(self, patterns: Iterable[str] = (), excluded_dirs: Iterable[str] = DEFAULT_EXCLUDED_DIRS):
+        self.excluded_dirs = frozenset(excluded_dirs)
+        self._rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for pattern in patterns:
+            self.add_pattern(pattern)
+
+    @classmethod
+    def for_root(cls, root: str, patterns: Iterable[str] = ()) -> "IgnoreRules":
+        """Builds rules from ``root/.gitignore`` (if present) followed by ``patterns``."""
+        gitignore: List[str] = []
+        try:
+            with open(os.path.join(root, ".gitignore"), "r", encoding="utf-8") as f:
+                gitignore = f.read().splitlines()
+        except OSError:
+            pass
+        return cls([*gitignore, *patterns])
+
+    def add_pattern(self, pattern: str) -> None:
+        pattern = pattern.rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        regex = re.compile(f"^{prefix}{_pattern_to_regex(pattern)}$")
+        self._rules.append((regex, negate, dir_only))
+
+    def _match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        result = None
+        for regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+    def is_ignored(self, rel_path: str, is_dir: bool, abs_path: Optional[str] = None) -> bool:
+        """Returns ``True`` when ``rel_path`` (relative to the walk root) should be skipped."""
+        rel_path = rel_path.replace(os.sep, "/")
+        name = rel_path.rsplit("/", 1)[-1]
+        if is_dir:
+            if name in self.excluded_dirs or name.endswith(".egg-info"):
+                return True
+            if abs_path is not None and os.path.exists(os.path.join(abs_path, "pyvenv.cfg")):
+                return True
+        return bool(self._match(rel_path, is_dir))
@@ -0,0 +1,84 @@
+import ast
+import os
+from typing import Dict, List, Optional, Set
+
+from codehealer.utils.import_scanner import is_stdlib_module
+
+
+def module_name_for(rel_path: str) -> str:
+    """Returns the dotted module name of a repository-relative ``.py`` path."""
+    parts = os.path.normpath(rel_path).split(os.sep)
+    parts[-1] = os.path.splitext(parts[-1])[0]
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+class ImportGraph:
+    """A static graph of which repository files import which other repository files.
+
+    Module names are registered for the full repository-relative path and for
+    every suffix of it, so ``src/pkg/mod.py`` resolves as ``pkg.mod`` and a
+    script importing a sibling (``import helpers``) resolves to the sibling.
+    Imports that do not resolve to a repository file are kept in
+    ``external_imports`` by their top-level name.
+    """
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files
+        self.modules: Dict[str, str] = {}
+        for rel_path in files:
+            self.modules.setdefault(module_name_for(rel_path), rel_path)
+        for rel_path in files:
+            parts = module_name_for(rel_path).split(".")
+            for start in range(1, len(parts)):
+                # A suffix must never shadow the standard library: ``tools/json.py``
+                # is not what ``import json`` refers to.
+                if not is_stdlib_module(parts[start]):
+                    self.modules.setdefault(".".join(parts[start:]), rel_path)
+
+        self.imports: Dict[str, Set[str]] = {path: set() for path in files}
+        self.importers: Dict[str, Set[str]] = {path: set() for path in files}
+        self.external_imports: Dict[str, Set[str]] = {path: set() for path in files}
+        for rel_path, content in files.items():
+            try:
+                tree = ast.parse(content)
+            except (SyntaxError, ValueError):
+                continue
+            for node in ast.walk(tree):
+                for name in self._imported_names(rel_path, node):
+                    target = self.resolve(name)
+                    if target is None:
+                        self.external_imports[rel_path].add(name.split(".")[0])
+                    elif target != rel_path:
+                        self.imports[rel_path].add(target)
+                        self.importers[target].add(rel_path)
+
+    def _imported_names(self, rel_path: str, node: ast.AST) -> List[str]:
+        if isinstance(node, ast.Import):
+            return [alias.name for alias in node.names]
+        if not isinstance(node, ast.ImportFrom):
+            return []
+        module = node.module or ""
+        if node.level:
+            package = module_name_for(rel_path).split(".")
+            if not rel_path.endswith("__init__.py"):
+                package = package[:-1]
+            package = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+            module = ".".join(p for p in [*package, module] if p)
+        # ``from pkg import name`` may import the submodule ``pkg.name``.
+        names = [f"{module}.{alias.name}" if module else alias.name for alias in node.names if alias.name != "*"]
+        return [*names, module] if module else names
+
+    def resolve(self, dotted_name: str) -> Optional[str]:
+        """Returns the repository file that ``dotted_name`` (or its nearest parent) maps to."""
+        parts = dotted_name.split(".")
+        for end in range(len(parts), 0, -1):
+            target = self.modules.get(".".join(parts[:end]))
+            if target is not None:
+                return target
+        return None
+
+    def neighbours(self, rel_path: str) -> Set[str]:
+        """Returns the files that ``rel_path`` imports or is imported by."""
+        return self.imports.get(rel_path, set()) | self.importers.get(rel_path, set())
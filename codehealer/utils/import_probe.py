@@ -0,0 +1,73 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+RESULT_MARKER = "\0codehealer-probe "
+
+# Runs inside the sandbox as ``python -c PROBE_SCRIPT pkg [pkg ...]``.  Each
+# package is imported with its output captured; modules a failed import left
+# behind are dropped so the next package starts from a clean slate.  A result
+# line is written per package, so the results survive a crash in a later one.
+PROBE_SCRIPT = r'''
+import contextlib, importlib, io, json, sys, traceback
+failed = False
+for name in sys.argv[1:]:
+    before = set(sys.modules)
+    output = io.StringIO()
+    entry = {"package": name, "ok": True, "error_type": None}
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            importlib.import_module(name)
+        except BaseException as e:
+            entry.update(ok=False, error_type=type(e).__name__)
+            traceback.print_exc()
+    if not entry["ok"]:
+        for module in set(sys.modules) - before:
+            sys.modules.pop(module, None)
+        failed = True
+    entry["log"] = output.getvalue()
+    sys.stdout.write("\n%s%s\n" % (MARKER, json.dumps(entry)))
+    sys.stdout.flush()
+sys.exit(1 if failed else 0)
+'''.replace("MARKER", repr(RESULT_MARKER))
+
+
+@dataclass
+class ImportProbeResult:
+    """Whether one top-level package imports; ``log`` is its output and traceback."""
+
+    package: str
+    ok: bool
+    error_type: Optional[str] = None
+    log: str = ""
+
+    @property
+    def exit_code(self) -> int:
+        return 0 if self.ok else 1
+
+
+def parse_probe_output(output: str) -> Dict[str, ImportProbeResult]:
+    """Returns the per-package results found in the probe's output."""
+    results: Dict[str, ImportProbeResult] = {}
+    for line in output.splitlines():
+        if not line.startswith(RESULT_MARKER):
+            continue
+        try:
+            entry = json.loads(line[len(RESULT_MARKER):])
+        except ValueError:
+            continue
+        results[entry["package"]] = ImportProbeResult(
+            entry["package"], entry["ok"], entry.get("error_type"), entry.get("log", "")
+        )
+    return results
+
+
+def format_failures(results: List[ImportProbeResult]) -> str:
+    """Formats the failed imports as one status for the CodeAgent."""
+    failed = [result for result in results if not result.ok]
+    lines = [f"{len(failed)} of {len(results)} package(s) failed to import:"]
+    for result in failed:
+        kind = f" ({result.error_type})" if result.error_type else ""
+        lines.append(f"--- import {result.package}{kind} ---")
+        lines.append(result.log.rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+import ast
+import os
+import sys
+import sysconfig
+import importlib.util
+from typing import Dict, List, Optional, Set, Tuple
+
+# Import names whose distribution on PyPI has a different name.  A value of
+# ``None`` marks names that are ambiguous (namespace packages shared by many
+# distributions) and have to be resolved by the EnvironmentAgent.
+IMPORT_TO_DISTRIBUTION: Dict[str, Optional[str]] = {
+    "attr": "attrs",
+    "bs4": "beautifulsoup4",
+    "Crypto": "pycryptodome",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "engineio": "python-engineio",
+    "fitz": "PyMuPDF",
+    "gi": "PyGObject",
+    "jose": "python-jose",
+    "jwt": "PyJWT",
+    "Levenshtein": "python-Levenshtein",
+    "magic": "python-magic",
+    "multipart": "python-multipart",
+    "MySQLdb": "mysqlclient",
+    "OpenSSL": "pyOpenSSL",
+    "PIL": "Pillow",
+    "pptx": "python-pptx",
+    "psycopg2": "psycopg2-binary",
+    "pkg_resources": "setuptools",
+    "RPi": "RPi.GPIO",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "socketio": "python-socketio",
+    "telegram": "python-telegram-bot",
+    "usb": "pyusb",
+    "win32api": "pywin32",
+    "win32con": "pywin32",
+    "yaml": "PyYAML",
+    "zmq": "pyzmq",
+    "azure": None,
+    "google": None,
+}
+
+_IMPORT_ERRORS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+
+def is_stdlib_module(name: str) -> bool:
+    """Returns ``True`` when ``name`` is a top-level standard library module."""
+    stdlib_names = getattr(sys, "stdlib_module_names", None)
+    if stdlib_names is not None:
+        return name in stdlib_names
+    # Python 3.9 has no ``sys.stdlib_module_names``; fall back to locating the
+    # module and checking whether it lives in the interpreter's stdlib.
+    if name in sys.builtin_module_names:
+        return True
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return False
+    if spec is None or spec.origin is None:
+        return False
+    stdlib_dir = os.path.normcase(sysconfig.get_paths()["stdlib"])
+    origin = os.path.normcase(spec.origin)
+    return origin.startswith(stdlib_dir) and "site-packages" not in origin
+
+
+def first_party_modules(files: Dict[str, str]) -> Set[str]:
+    """Returns every module or package name that could resolve to a file in the repository."""
+    names: Set[str] = set()
+    for rel_path in files:
+        parts = os.path.normpath(rel_path).split(os.sep)
+        names.update(parts[:-1])
+        names.add(os.path.splitext(parts[-1])[0])
+    return names
+
+
+def _is_optional(handlers: List[ast.ExceptHandler]) -> bool:
+    for handler in handlers:
+        if handler.type is None:
+            return True
+        types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+        if any(isinstance(t, ast.Name) and t.id in _IMPORT_ERRORS for t in types):
+            return True
+    return False
+
+
+def _collect(node: ast.AST, found: Set[str], optional: bool) -> None:
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.Try):
+            child_optional = optional or _is_optional(child.handlers)
+            for stmt in child.body:
+                _collect_stmt(stmt, found, child_optional)
+            for part in (child.handlers, child.orelse, child.finalbody):
+                for stmt in part:
+                    _collect_stmt(stmt, found, optional)
+        else:
+            _collect_stmt(child, found, optional)
+
+
+def _collect_stmt(node: ast.AST, found: Set[str], optional: bool) -> None:
+    if not optional:
+        if isinstance(node, ast.Import):
+            found.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            found.add(node.module.split(".")[0])
+    _collect(node, found, optional)
+
+
+def scan_imports(files: Dict[str, str]) -> Dict[str, Set[str]]:
+    """Maps every absolute, non-optional top-level import name to the files that use it.
+
+    Imports guarded by ``try``/``except ImportError`` are treated as optional
+    and skipped.  Files that do not parse are ignored; the runtime phase is
+    responsible for fixing them.
+    """
+    imports: Dict[str, Set[str]] = {}
+    for rel_path, content in files.items():
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            continue
+        found: Set[str] = set()
+        _collect(tree, found, optional=False)
+        for name in found:
+            imports.setdefault(name, set()).add(rel_path)
+    return imports
+
+
+def generate_requirements(files: Dict[str, str]) -> Tuple[str, Dict[str, Set[str]]]:
+    """Builds requirements.txt content from the third-party imports in ``files``.
+
+    Returns the generated content and the unresolved import names (mapped to
+    the files that import them) that need the EnvironmentAgent's help.
+    """
+    local = first_party_modules(files)
+    distributions: Set[str] = set()
+    unresolved: Dict[str, Set[str]] = {}
+    for name, users in sorted(scan_imports(files).items()):
+        if name == "__future__" or name in local or is_stdlib_module(name):
+            continue
+        if name in IMPORT_TO_DISTRIBUTION:
+            distribution = IMPORT_TO_DISTRIBUTION[name]
+            if distribution is None:
+                unresolved[name] = users
+                continue
+        else:
+            distribution = name
+        distributions.add(distribution)
+    content = "".join(f"{distribution}\n" for distribution in sorted(distributions, key=str.lower))
+    return content, unresolved
@@ -0,0 +1,192 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Exit code reported for commands stopped by the wall-clock timeout, as timeout(1) does.
+TIMEOUT_EXIT_CODE = 124
+# How long a process group gets to exit after SIGTERM before it is killed.
+TERMINATE_GRACE_SECONDS = 3.0
+
+
+@dataclass
+class RunLimits:
+    """Limits applied to one command; ``None`` leaves a limit unset.
+
+    ``healthy_after_seconds`` is for long-running services: a process that
+    is still alive after that long is considered healthy, stopped, and
+    reported as a success.
+    """
+
+    timeout_seconds: Optional[float] = None
+    cpu_seconds: Optional[int] = None
+    memory_bytes: Optional[int] = None
+    healthy_after_seconds: Optional[float] = None
+
+
+@dataclass
+class RunUsage:
+    """Resources used by one command (CPU and RSS are only known on POSIX)."""
+
+    wall_seconds: float
+    cpu_seconds: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    timed_out: bool = False
+    healthy_alive: bool = False
+
+    def summary(self) -> str:
+        parts = [f"wall {self.wall_seconds:.2f}s"]
+        if self.cpu_seconds is not None:
+            parts.append(f"cpu {self.cpu_seconds:.2f}s")
+        if self.max_rss_bytes is not None:
+            parts.append(f"max rss {self.max_rss_bytes / 1024 ** 2:.1f} MiB")
+        if self.timed_out:
+            parts.append("timed out")
+        if self.healthy_alive:
+            parts.append("alive at health check")
+        return ", ".join(parts)
+
+
+# Sets ``NAME=value`` resource limits (clamped to the hard limit) and execs
+# the command after ``--``.  Limits are applied this way, not in a
+# ``preexec_fn``: Runner commands are started from worker threads (e.g. by
+# the CandidateEvaluator), and running Python in a child forked from a
+# threaded process can deadlock.
+_RLIMIT_WRAPPER = """\
+import os, resource, sys
+args = sys.argv[1:]
+split = args.index("--")
+for spec in args[:split]:
+    name, value = spec.split("=")
+    which = getattr(resource, "RLIMIT_" + name)
+    value = int(value)
+    hard = resource.getrlimit(which)[1]
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(which, (value, value))
+command = args[split + 1:]
+try:
+    os.execvp(command[0], command)
+except OSError as e:
+    sys.stderr.write(f"{command[0]}: {e}\\n")
+    sys.exit(127)
+"""
+
+
+def popen_kwargs(limits: Optional[RunLimits] = None) -> dict:
+    """Starts commands in their own process group so the whole tree can be stopped."""
+    if os.name != "posix":
+        if limits is not None and (limits.cpu_seconds is not None or limits.memory_bytes is not None):
+            print("[runner] Warning: resource limits are not supported on this platform.")
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32" else {}
+    return {"start_new_session": True}
+
+
+def limited_command(command: List[str], limits: Optional[RunLimits] = None) -> List[str]:
+    """Returns ``command`` wrapped so ``limits``' CPU and address-space caps are set before it execs.
+
+    The command never runs unlimited, and nothing but ``exec`` happens in
+    the forked child.  Without limits (or outside POSIX) ``command`` is
+    returned unchanged.
+    """
+    rlimits = _rlimits(limits)
+    if not rlimits:
+        return command
+    specs = [f"{name}={value}" for name, value in rlimits]
+    return [sys.executable, "-I", "-S", "-c", _RLIMIT_WRAPPER, *specs, "--", *command]
+
+
+def _rlimits(limits: Optional[RunLimits]) -> List[Tuple[str, int]]:
+    if resource is None or limits is None or os.name != "posix":
+        return []
+    rlimits = []
+    if limits.cpu_seconds is not None:
+        rlimits.append(("CPU", limits.cpu_seconds))
+    if limits.memory_bytes is not None:
+        rlimits.append(("AS", limits.memory_bytes))
+    return rlimits
+
+
+def wait_with_usage(proc: subprocess.Popen, timeout: Optional[float]) -> Optional[RunUsage]:
+    """Waits up to ``timeout`` seconds for ``proc``; returns its usage, or ``None`` if still running.
+
+    On POSIX the process is reaped with ``wait4`` so its own CPU time and
+    peak RSS are known; ``proc.returncode`` is set accordingly.  Runs
+    forked by the warm worker are not our children and report their own usage.
+    """
+    if not isinstance(proc, subprocess.Popen):
+        return proc.wait_with_usage(timeout)
+    started = time.monotonic()
+    if not hasattr(os, "wait4"):
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        return RunUsage(wall_seconds=time.monotonic() - started)
+
+    delay = 0.005
+    while True:
+        try:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        except ChildProcessError:
+            # Already reaped elsewhere (e.g. by ``Popen.poll``).
+            proc.wait()
+            return RunUsage(wall_seconds=time.monotonic() - started)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            # ``ru_maxrss`` is in kilobytes on Linux and bytes on macOS.
+            scale = 1 if sys.platform == "darwin" else 1024
+            return RunUsage(
+                wall_seconds=time.monotonic() - started,
+                cpu_seconds=rusage.ru_utime + rusage.ru_stime,
+                max_rss_bytes=rusage.ru_maxrss * scale,
+            )
+        if timeout is not None and time.monotonic() - started >= timeout:
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+def signal_process_group(proc: subprocess.Popen, sig: int) -> None:
+    """Sends ``sig`` to every process in ``proc``'s group, ignoring groups that are already gone.
+
+    Without process groups (not POSIX) only ``proc`` itself is killed.
+    """
+    if os.name != "posix":
+        proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_process_group(proc: subprocess.Popen) -> None:
+    """Kills ``proc``'s whole process group (just ``proc`` where there are no groups)."""
+    if os.name != "posix":
+        proc.kill()
+        return
+    signal_process_group(proc, signal.SIGKILL)
+
+
+def stop_process_group(proc: subprocess.Popen, grace_seconds: float = TERMINATE_GRACE_SECONDS) -> RunUsage:
+    """Stops ``proc`` and everything in its process group and reaps it.
+
+    The group gets SIGTERM and ``grace_seconds`` to exit before SIGKILL.
+    Descendants that outlive the leader are killed as well.
+    """
+    signal_process_group(proc, signal.SIGTERM)
+    usage = wait_with_usage(proc, grace_seconds)
+    if usage is None:
+        kill_process_group(proc)
+        usage = wait_with_usage(proc, None)
+    kill_process_group(proc)
+    return usage
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+DEFAULT_LLM_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "codehealer", "llm_cache.sqlite3")
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 ** 2
+
+# ``readwrite`` serves hits and stores misses, ``record`` always calls the API
+# and overwrites entries, ``replay`` never calls the API (misses are errors).
+CACHE_MODES = ("readwrite", "record", "replay")
+
+
+class LLMResponseCache:
+    """A persistent SQLite cache of LLM responses keyed by the full request.
+
+    Keys hash the model, system prompt, user prompt and request parameters.
+    Entries older than ``ttl_seconds`` are treated as misses (except in
+    ``replay`` mode, where reproducibility matters more than freshness), and
+    the least recently used entries are evicted once the stored responses
+    exceed ``max_bytes``.  The connection is shared between threads and
+    SQLite's own locking makes the file safe to share between processes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        mode: str = "readwrite",
+        ttl_seconds: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'; expected one of {', '.join(CACHE_MODES)}.")
+        self.path = os.path.abspath(path or DEFAULT_LLM_CACHE_PATH)
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, params: dict) -> str:
+        payload = json.dumps(
+            {"model": model, "system": system_prompt, "user": user_prompt, "params": params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for ``key``, or ``None`` on a miss."""
+        if self.mode == "record":
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            expired = (
+                row is not None
+                and self.mode != "replay"
+                and self.ttl_seconds is not None
+                and time.time() - row[1] > self.ttl_seconds
+            )
+            if row is None or expired:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Stores ``response`` under ``key`` and evicts old entries beyond the size cap."""
+        if self.mode == "replay":
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
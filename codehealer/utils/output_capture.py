@@ -0,0 +1,141 @@
+import threading
+from collections import deque
+from typing import List, Optional, TextIO
+
+DEFAULT_HEAD_LINES = 200
+DEFAULT_TAIL_LINES = 2000
+# Longer lines (progress bars redrawn with ``\r``, minified data) are cut in memory.
+DEFAULT_MAX_LINE_CHARS = 4000
+# Traceback blocks kept even when they scroll out of the tail.
+DEFAULT_MAX_TRACEBACKS = 2
+MAX_TRACEBACK_LINES = 400
+
+_TRACEBACK_HEADER = "Traceback (most recent call last):"
+_CHAIN_MARKERS = (
+    "During handling of the above exception, another exception occurred:",
+    "The above exception was the direct cause of the following exception:",
+)
+
+
+class _Traceback:
+    def __init__(self, start: int):
+        self.start = start
+        self.lines: List[str] = []
+        self.dropped = 0
+
+    def add(self, line: str) -> None:
+        if len(self.lines) < MAX_TRACEBACK_LINES:
+            self.lines.append(line)
+        else:
+            # Deep recursion: keep the outermost frames and the innermost ones.
+            self.dropped += 1
+            self.lines.pop(MAX_TRACEBACK_LINES // 4)
+            self.lines.append(line)
+
+    def render(self) -> str:
+        if not self.dropped:
+            return "".join(self.lines)
+        cut = MAX_TRACEBACK_LINES // 4
+        return "".join(self.lines[:cut]) + f"  [... {self.dropped} traceback lines omitted ...]\n" + "".join(self.lines[cut:])
+
+
+class OutputCapture:
+    """Captures a command's output in bounded memory.
+
+    The first ``head_lines`` and last ``tail_lines`` lines are kept, plus
+    the last ``max_tracebacks`` Python traceback blocks (chained exceptions
+    stay together) wherever they occurred.  Every line is also written to
+    ``log_file`` when one is given, so nothing is lost.  Output that fits
+    the buffers renders exactly as it was printed.
+    """
+
+    def __init__(
+        self,
+        head_lines: int = DEFAULT_HEAD_LINES,
+        tail_lines: int = DEFAULT_TAIL_LINES,
+        log_file: Optional[TextIO] = None,
+        log_path: Optional[str] = None,
+        max_line_chars: int = DEFAULT_MAX_LINE_CHARS,
+        max_tracebacks: int = DEFAULT_MAX_TRACEBACKS,
+    ):
+        self.head_lines = head_lines
+        self.log_file = log_file
+        self.log_path = log_path
+        self.max_line_chars = max_line_chars
+        self.head: List[str] = []
+        self.tail: deque = deque(maxlen=tail_lines)
+        self.tracebacks: deque = deque(maxlen=max_tracebacks)
+        self.total_lines = 0
+        self.total_chars = 0
+        self._current: Optional[_Traceback] = None
+        self._since_traceback: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, line: str) -> None:
+        with self._lock:
+            if self.log_file is not None:
+                self.log_file.write(line)
+            self.total_chars += len(line)
+            if len(line) > self.max_line_chars:
+                line = f"{line[:self.max_line_chars]} [... {len(line) - self.max_line_chars} characters cut]\n"
+            self._track_traceback(line)
+            if len(self.head) < self.head_lines:
+                self.head.append(line)
+            else:
+                self.tail.append(line)
+            self.total_lines += 1
+
+    def close(self) -> None:
+        """Closes the log file; lines added afterwards are only kept in memory."""
+        with self._lock:
+            if self.log_file is not None:
+                self.log_file.close()
+                self.log_file = None
+
+    def _track_traceback(self, line: str) -> None:
+        stripped = line.strip()
+        if stripped == _TRACEBACK_HEADER:
+            chained = (
+                self.tracebacks
+                and self._current is None
+                and all(not text.strip() or text.strip() in _CHAIN_MARKERS for text in self._since_traceback)
+                and any(text.strip() in _CHAIN_MARKERS for text in self._since_traceback)
+            )
+            if chained:
+                self._current = self.tracebacks[-1]
+                for text in self._since_traceback:
+                    self._current.add(text)
+            else:
+                self._current = _Traceback(self.total_lines)
+                self.tracebacks.append(self._current)
+            self._current.add(line)
+            self._since_traceback = []
+            return
+        if self._current is not None:
+            self._current.add(line)
+            # The exception line is the first unindented line after the frames.
+            if line[:1] not in (" ", "\t") and stripped:
+                self._current = None
+            return
+        if self.tracebacks and len(self._since_traceback) < 4:
+            self._since_traceback.append(line)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_lines > len(self.head) + len(self.tail)
+
+    def render(self) -> str:
+        """Returns the captured output, with a marker and the tracebacks in place of omitted lines."""
+        with self._lock:
+            if not self.truncated:
+                return "".join(self.head) + "".join(self.tail)
+            omitted = self.total_lines - len(self.head) - len(self.tail)
+            tail_start = self.total_lines - len(self.tail)
+            where = f"; full log: {self.log_path}" if self.log_path else ""
+            parts = ["".join(self.head), f"[... {omitted} lines omitted{where} ...]\n"]
+            for block in self.tracebacks:
+                # Blocks that are entirely in the head or tail are already shown.
+                if block.start >= len(self.head) and block.start < tail_start:
+                    parts.append(f"[last traceback from the omitted output]\n{block.render()}")
+            parts.append("".join(self.tail))
+            return "".join(parts)
@@ -0,0 +1,174 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_SEARCH_REPLACE_RE = re.compile(
+    r"^<{5,9} SEARCH[ \t]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+# How many context lines may be dropped from each end of a hunk before it is rejected.
+MAX_FUZZ = 2
+
+
+@dataclass
+class Hunk:
+    """A block of lines to find (``old``) and what to put in its place (``new``)."""
+
+    old: List[str]
+    new: List[str]
+    hint: Optional[int] = None
+    leading_context: int = 0
+    trailing_context: int = 0
+    source: str = ""
+
+
+@dataclass
+class PatchResult:
+    """The outcome of applying a patch: new content plus per-hunk bookkeeping."""
+
+    content: str
+    applied: int = 0
+    rejected: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.rejected
+
+
+def parse_unified_diff(patch: str) -> List[Hunk]:
+    """Parses the hunks of a single-file unified diff; file headers are ignored."""
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    source: List[str] = []
+    for line in patch.splitlines():
+        header = _HUNK_HEADER_RE.match(line)
+        if header:
+            if current is not None:
+                current.source = "\n".join(source)
+                hunks.append(current)
+            current = Hunk(old=[], new=[], hint=int(header.group(1)) - 1)
+            source = [line]
+            continue
+        if current is None or line.startswith(("--- ", "+++ ", "\\")):
+            continue
+        source.append(line)
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current.old.append(text)
+            current.new.append(text)
+        elif tag == "-":
+            current.old.append(text)
+        elif tag == "+":
+            current.new.append(text)
+    if current is not None:
+        current.source = "\n".join(source)
+        hunks.append(current)
+
+    for hunk in hunks:
+        hunk.leading_context = _common_prefix(hunk.old, hunk.new)
+        hunk.trailing_context = min(
+            _common_prefix(hunk.old[::-1], hunk.new[::-1]),
+            min(len(hunk.old), len(hunk.new)) - hunk.leading_context,
+        )
+    return hunks
+
+
+def parse_search_replace(patch: str) -> List[Hunk]:
+    """Parses ``<<<<<<< SEARCH`` / ``=======`` / ``>>>>>>> REPLACE`` blocks."""
+    return [
+        Hunk(old=search.splitlines(), new=replace.splitlines(), source=match.group(0))
+        for match in _SEARCH_REPLACE_RE.finditer(patch)
+        for search, replace in [match.groups()]
+    ]
+
+
+def _common_prefix(a: List[str], b: List[str]) -> int:
+    count = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        count += 1
+    return count
+
+
+def _matches(lines: List[str], start: int, block: List[str], normalize) -> bool:
+    if start < 0 or start + len(block) > len(lines):
+        return False
+    return all(normalize(lines[start + i]) == normalize(line) for i, line in enumerate(block))
+
+
+def _locate(lines: List[str], block: List[str], hint: Optional[int]) -> List[int]:
+    """Finds ``block`` in ``lines``: exactly, then ignoring trailing, then all surrounding whitespace.
+
+    With a ``hint`` only the nearest match to it is returned; otherwise every
+    match at the strictest comparison that finds one, so callers can tell
+    an ambiguous block from a unique one.
+    """
+    if not block:
+        return [hint if hint is not None else len(lines)]
+    candidates = range(len(lines) - len(block) + 1)
+    if hint is not None:
+        candidates = sorted(candidates, key=lambda start: abs(start - hint))
+    for normalize in (lambda s: s, str.rstrip, str.strip):
+        starts = [start for start in candidates if _matches(lines, start, block, normalize)]
+        if starts:
+            return starts[:1] if hint is not None else starts
+    return []
+
+
+def _apply_hunk(lines: List[str], hunk: Hunk, offset: int) -> Optional[Tuple[int, int]]:
+    """Applies ``hunk`` in place, returning ``(start, new_length)`` or ``None`` if it does not fit."""
+    hint = hunk.hint + offset if hunk.hint is not None else None
+    # Fuzz: progressively ignore outer context lines, as patch(1) does.
+    for fuzz in range(MAX_FUZZ + 1):
+        lead = min(fuzz, hunk.leading_context)
+        trail = min(fuzz, hunk.trailing_context)
+        if fuzz and lead == 0 and trail == 0:
+            break
+        old = hunk.old[lead:len(hunk.old) - trail]
+        new = hunk.new[lead:len(hunk.new) - trail]
+        starts = _locate(lines, old, hint + lead if hint is not None else None)
+        if starts:
+            start = starts[0]
+            lines[start:start + len(old)] = new
+            return start, len(new)
+    return None
+
+
+def apply_hunks(original: str, hunks: List[Hunk]) -> PatchResult:
+    """Applies ``hunks`` to ``original`` in order, rejecting the ones that cannot be placed."""
+    lines = original.splitlines()
+    result = PatchResult(content=original)
+    offset = 0
+    for hunk in hunks:
+        if hunk.hint is None and hunk.old:
+            # Without a line number there is no way to tell which copy was meant.
+            matches = len(_locate(lines, hunk.old, None))
+            if matches > 1:
+                result.rejected.append(
+                    f"(ambiguous: matches {matches} places; include more surrounding lines)\n"
+                    + (hunk.source or "\n".join(hunk.old))
+                )
+                continue
+        placed = _apply_hunk(lines, hunk, offset)
+        if placed is None:
+            result.rejected.append(hunk.source or "\n".join(hunk.old))
+            continue
+        result.applied += 1
+        if hunk.hint is not None:
+            offset += len(hunk.new) - len(hunk.old)
+    trailing_newline = "\n" if original.endswith("\n") or not original else ""
+    result.content = "\n".join(lines) + (trailing_newline if lines else "")
+    return result
+
+
+def apply_patch_text(original: str, patch: str) -> PatchResult:
+    """Applies a unified diff or search/replace blocks, whichever ``patch`` contains."""
+    hunks = parse_search_replace(patch)
+    if not hunks:
+        hunks = parse_unified_diff(patch)
+    if not hunks:
+        return PatchResult(content=original, rejected=[patch])
+    return apply_hunks(original, hunks)
@@ -0,0 +1,209 @@
+import ast
+import builtins
+import glob
+import os
+import re
+import symtable
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from codehealer.utils.import_graph import ImportGraph, module_name_for
+from codehealer.utils.import_scanner import first_party_modules, is_stdlib_module, scan_imports
+
+# Names every module (or class body) has without defining them.
+_IMPLICIT_NAMES = frozenset({
+    "__file__", "__name__", "__doc__", "__spec__", "__loader__", "__package__", "__builtins__",
+    "__path__", "__cached__", "__annotations__", "__module__", "__qualname__", "__class__", "__debug__",
+})
+_EDITABLE_MAPPING_RE = re.compile(r"^MAPPING\s*(?::[^=]*)?=\s*(\{.*?\})\s*$", re.MULTILINE | re.DOTALL)
+
+
+@dataclass
+class PreflightIssue:
+    """A problem found without running the program, located like a traceback frame."""
+
+    path: str
+    line: int
+    kind: str
+    message: str
+
+    def format(self) -> str:
+        return f'  File "{self.path}", line {self.line}\n    {self.kind}: {self.message}'
+
+
+def check_syntax(rel_path: str, content: str) -> Optional[PreflightIssue]:
+    try:
+        compile(content, rel_path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return PreflightIssue(rel_path, e.lineno or 1, type(e).__name__, e.msg)
+    except ValueError as e:  # e.g. null bytes in the source
+        return PreflightIssue(rel_path, 1, "SyntaxError", str(e))
+    return None
+
+
+def _tables(table: symtable.SymbolTable) -> Iterable[symtable.SymbolTable]:
+    yield table
+    for child in table.get_children():
+        yield from _tables(child)
+
+
+def undefined_names(rel_path: str, content: str) -> List[PreflightIssue]:
+    """Reports global names that are read somewhere but bound nowhere in the module.
+
+    Modules whose globals cannot be known statically (star imports, a module
+    ``__getattr__``, or direct use of ``globals()``) are skipped.
+    """
+    try:
+        tree = ast.parse(content)
+        top = symtable.symtable(content, rel_path, "exec")
+    except (SyntaxError, ValueError):
+        return []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            return []
+    if "__getattr__" in top.get_identifiers() or "globals()" in content:
+        return []
+
+    defined = set(_IMPLICIT_NAMES) | set(dir(builtins))
+    tables = list(_tables(top))
+    for table in tables:
+        for symbol in table.get_symbols():
+            binds = symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace()
+            if binds and (table is top or symbol.is_declared_global()):
+                defined.add(symbol.get_name())
+
+    missing: Set[str] = set()
+    for table in tables:
+        for symbol in table.get_symbols():
+            if symbol.is_referenced() and symbol.is_global() and symbol.get_name() not in defined:
+                missing.add(symbol.get_name())
+    if not missing:
+        return []
+
+    issues: Dict[str, PreflightIssue] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in missing and isinstance(node.ctx, ast.Load):
+            issue = issues.get(node.id)
+            if issue is None or node.lineno < issue.line:
+                issues[node.id] = PreflightIssue(rel_path, node.lineno, "NameError", f"name '{node.id}' is not defined")
+    return sorted(issues.values(), key=lambda issue: issue.line)
+
+
+def site_packages_dirs(venv_path: str) -> List[str]:
+    """Returns the ``site-packages`` directories of the venv at ``venv_path``."""
+    candidates = glob.glob(os.path.join(venv_path, "lib", "python*", "site-packages"))
+    candidates += glob.glob(os.path.join(venv_path, "Lib", "site-packages"))
+    return [path for path in candidates if os.path.isdir(path)]
+
+
+def _top_level_names(directory: str) -> Set[str]:
+    names: Set[str] = set()
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return names
+    for entry in entries:
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            if "." not in entry and entry != "__pycache__":
+                names.add(entry)
+        elif entry.endswith((".py", ".so", ".pyd")):
+            # ``mod.py``, ``mod.cpython-311-x86_64-linux-gnu.so``, ``mod.pyd``
+            names.add(entry.split(".")[0])
+    return names
+
+
+def installed_modules(site_packages: Iterable[str]) -> Set[str]:
+    """Returns the top-level module names importable from ``site_packages``.
+
+    Directories added by ``.pth`` files (classic editable installs) and the
+    mappings of setuptools' ``__editable__`` finders are included.
+    """
+    names: Set[str] = set()
+    for directory in site_packages:
+        names |= _top_level_names(directory)
+        for pth in glob.glob(os.path.join(directory, "*.pth")):
+            try:
+                with open(pth, "r", encoding="utf-8", errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith(("#", "import ")):
+                    names |= _top_level_names(os.path.join(directory, line))
+        for finder in glob.glob(os.path.join(directory, "__editable___*_finder.py")):
+            try:
+                with open(finder, "r", encoding="utf-8", errors="replace") as f:
+                    match = _EDITABLE_MAPPING_RE.search(f.read())
+                names |= set(ast.literal_eval(match.group(1))) if match else set()
+            except (OSError, ValueError, SyntaxError):
+                continue
+    return names
+
+
+def _import_line(content: str, module: str) -> int:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return 1
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import) and any(alias.name.split(".")[0] == module for alias in node.names):
+            return node.lineno
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and (node.module or "").split(".")[0] == module:
+            return node.lineno
+    return 1
+
+
+def reachable_files(files: Dict[str, str], entry_point: str) -> List[str]:
+    """Returns ``entry_point`` and every repository file it imports, directly or not."""
+    graph = ImportGraph(files)
+    entry = os.path.normpath(entry_point)
+    if entry not in files:
+        return []
+    seen = [entry]
+    for rel_path in seen:
+        targets = set(graph.imports.get(rel_path, ()))
+        # Importing ``pkg.mod`` also runs ``pkg/__init__.py``.
+        parts = module_name_for(rel_path).split(".")
+        targets.update(graph.modules.get(".".join(parts[:end])) for end in range(1, len(parts)))
+        for target in sorted(t for t in targets if t is not None):
+            if target not in seen:
+                seen.append(target)
+    return seen
+
+
+def run_preflight(files: Dict[str, str], entry_point: str, venv_path: str) -> List[PreflightIssue]:
+    """Checks the files reachable from ``entry_point`` without running them.
+
+    Reports syntax errors, undefined global names, and third-party imports
+    that are not installed in the venv.  The import check is skipped when
+    the venv has no ``site-packages`` to check against.
+    """
+    issues: List[PreflightIssue] = []
+    checked = reachable_files(files, entry_point)
+    for rel_path in checked:
+        syntax_error = check_syntax(rel_path, files[rel_path])
+        if syntax_error is not None:
+            issues.append(syntax_error)
+        else:
+            issues.extend(undefined_names(rel_path, files[rel_path]))
+
+    site_packages = site_packages_dirs(venv_path)
+    if site_packages:
+        installed = installed_modules(site_packages)
+        first_party = first_party_modules(files)
+        for module, users in sorted(scan_imports({path: files[path] for path in checked}).items()):
+            if module in installed or module in first_party or is_stdlib_module(module):
+                continue
+            for rel_path in sorted(users):
+                line = _import_line(files[rel_path], module)
+                issues.append(PreflightIssue(rel_path, line, "ModuleNotFoundError", f"No module named '{module}'"))
+    return issues
+
+
+def format_report(issues: List[PreflightIssue]) -> str:
+    """Formats ``issues`` as one traceback-like status for the CodeAgent."""
+    lines = [f"Pre-flight static checks found {len(issues)} problem(s) before the program was run:"]
+    lines += [issue.format() for issue in issues]
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 120000
+
+_encoders: Dict[str, object] = {}
+
+
+def count_tokens(text: str, model: str = "gpt-5") -> int:
+    """Counts the tokens in ``text`` for ``model``.
+
+    Uses ``tiktoken`` when it is installed.  Otherwise falls back to a
+    deliberately conservative estimate of one token per 3.5 characters, which
+    over-counts typical source code slightly so budgets are not overrun.
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        encoder = _encoders.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding("o200k_base")
+            _encoders[model] = encoder
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 3.5)
+
+
+@dataclass
+class PromptSection:
+    """One part of a prompt that the packer may shrink.
+
+    ``priority`` orders which sections are shrunk first (lowest first).
+    Sections built from ``items`` shrink by dropping whole items from
+    ``drop_from`` (``"start"`` for oldest-first histories, ``"end"`` for
+    ranked lists) and noting how many were omitted.  Plain ``text``
+    sections are cut down to their head and tail.
+    """
+
+    name: str
+    priority: int
+    text: str = ""
+    items: Optional[List[str]] = None
+    separator: str = "\n"
+    drop_from: str = "start"
+
+    def render(self) -> str:
+        return self.separator.join(self.items) if self.items is not None else self.text
+
+
+@dataclass
+class PackedPrompt:
+    """The outcome of packing: final text and token count per section."""
+
+    sections: Dict[str, str] = field(default_factory=dict)
+    tokens: Dict[str, int] = field(default_factory=dict)
+    reserved_tokens: int = 0
+    truncated: List[str] = field(default_factory=list)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.reserved_tokens + sum(self.tokens.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name} {tokens}" for name, tokens in self.tokens.items())
+        note = f"; shrunk: {', '.join(self.truncated)}" if self.truncated else ""
+        return f"{self.total_tokens} tokens ({parts}, fixed {self.reserved_tokens}{note})"
+
+
+class PromptPacker:
+    """Fits prompt sections into a token budget, shrinking the least relevant first."""
+
+    def __init__(self, token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET, model: str = "gpt-5"):
+        self.token_budget = token_budget
+        self.model = model
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def pack(self, sections: List[PromptSection], reserved: str = "") -> PackedPrompt:
+        """Packs ``sections`` so that they and the ``reserved`` text fit the budget."""
+        packed = PackedPrompt(reserved_tokens=self.count(reserved))
+        texts = {section.name: section.render() for section in sections}
+        tokens = {name: self.count(text) for name, text in texts.items()}
+        overflow = packed.reserved_tokens + sum(tokens.values()) - self.token_budget
+
+        for section in sorted(sections, key=lambda s: s.priority):
+            if overflow <= 0:
+                break
+            allowed = max(0, tokens[section.name] - overflow)
+            if section.items is not None:
+                text = self._shrink_items(section, allowed)
+            else:
+                text = self._shrink_text(section.text, allowed)
+            new_tokens = self.count(text)
+            overflow -= tokens[section.name] - new_tokens
+            texts[section.name], tokens[section.name] = text, new_tokens
+            packed.truncated.append(section.name)
+
+        for section in sections:
+            packed.sections[section.name] = texts[section.name]
+            packed.tokens[section.name] = tokens[section.name]
+        return packed
+
+    def _shrink_items(self, section: PromptSection, allowed: int) -> str:
+        items = list(section.items or [])
+        # Per-item counts make the common case a single pass; the rendered
+        # text is re-counted to account for separators and the omission note.
+        sizes = [self.count(item) + 1 for item in items]
+        index = 0 if section.drop_from == "start" else -1
+        omitted = 0
+        while True:
+            while items and sum(sizes) > allowed:
+                items.pop(index)
+                sizes.pop(index)
+                omitted += 1
+            note = f"[{omitted} {section.name} item(s) omitted to fit the prompt budget]\n" if omitted else ""
+            parts = [note, *items] if section.drop_from == "start" else [*items, note]
+            text = section.separator.join(part for part in parts if part)
+            if self.count(text) <= allowed:
+                return text
+            if not items:
+                return ""
+            items.pop(index)
+            sizes.pop(index)
+            omitted += 1
+
+    def _shrink_text(self, text: str, allowed: int) -> str:
+        if allowed <= 0:
+            return ""
+        total = self.count(text)
+        if total <= allowed:
+            return text
+        # Keep the head and the tail (where tracebacks put the actual error),
+        # shrinking proportionally until the result fits.
+        keep_chars = int(len(text) * allowed / total)
+        while keep_chars > 0:
+            head = text[: keep_chars // 3]
+            tail = text[len(text) - (keep_chars - keep_chars // 3):]
+            candidate = f"{head}\n[... {total - allowed} tokens truncated ...]\n{tail}"
+            if self.count(candidate) <= allowed:
+                return candidate
+            keep_chars = int(keep_chars * 0.9)
+        return ""
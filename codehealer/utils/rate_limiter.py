@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# openai's network-level errors carry no status code; matched by name so this
+# module does not need the client library.
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at ``rate_per_minute``, holding at most one minute's worth.
+
+    ``reserve`` always succeeds and may drive the bucket negative; the
+    caller then waits until the deficit has been refilled, so concurrent
+    callers queue up in reservation order.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive.")
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.available = self.capacity
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._last) * self.rate_per_second)
+        self._last = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes ``amount`` from the bucket and returns how long to wait before using it."""
+        self._refill()
+        self.available -= amount
+        return max(0.0, -self.available / self.rate_per_second)
+
+    def adjust(self, amount: float) -> None:
+        """Charges (or refunds, if negative) ``amount`` without waiting."""
+        self._refill()
+        self.available = min(self.capacity, self.available - amount)
+
+
+class RateLimiter:
+    """Client-side limits on requests and tokens per minute, shared by every agent in a process.
+
+    Assign one instance to ``BaseAgent.rate_limiter`` so all agents (and
+    threads) draw from the same buckets.  Token use is charged up front from
+    an estimate and corrected once the API reports the actual usage.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether token use is limited (and so worth estimating before each call)."""
+        return self.tokens is not None
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserves one request and ``estimated_tokens``; returns the seconds to wait first."""
+        with self._lock:
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(estimated_tokens))
+            return wait
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """Blocks until a request of ``estimated_tokens`` may be sent."""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            print(f"[rate-limit] Waiting {wait:.1f}s for API quota.")
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is not None:
+            with self._lock:
+                self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+class SharedRateLimiter(RateLimiter):
+    """A :class:`RateLimiter` whose buckets live in another process.
+
+    ``remote`` is a ``multiprocessing`` manager proxy of a RateLimiter, so
+    worker processes draw from one budget.  Waiting happens locally; only
+    the bookkeeping crosses the process boundary.
+    """
+
+    def __init__(self, remote, limits_tokens: bool):
+        super().__init__()
+        self.remote = remote
+        self._limits_tokens = limits_tokens
+
+    @property
+    def limits_tokens(self) -> bool:
+        return self._limits_tokens
+
+    def reserve(self, estimated_tokens: int) -> float:
+        return self.remote.reserve(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        self.remote.record_usage(estimated_tokens, actual_tokens)
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff with a bounded number of attempts and total wait."""
+
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    # Upper bound on the total time spent sleeping between attempts of one call.
+    retry_budget_seconds: float = 300.0
+
+    def is_retryable(self, error: Exception) -> bool:
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status in RETRYABLE_STATUS_CODES
+        return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+    def next_delay(self, error: Exception, attempt: int, waited: float) -> Optional[float]:
+        """Returns how long to sleep before retrying after ``attempt`` (0-based), or ``None`` to give up."""
+        if attempt + 1 >= self.max_attempts or not self.is_retryable(error):
+            return None
+        # "Full jitter": a uniform draw up to the exponential cap spreads out
+        # clients that were throttled at the same moment.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        if waited + delay > self.retry_budget_seconds:
+            return None
+        return delay
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
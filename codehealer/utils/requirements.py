@@ -0,0 +1,155 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+_REQUIREMENT_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$")
+
+_FAILURE_PATTERNS = [
+    re.compile(r"Could not find a version that satisfies the requirement ([^\s(;]+)"),
+    re.compile(r"No matching distribution found for ([^\s(;]+)"),
+    re.compile(r"Failed to build installable wheels for some pyproject\.toml based projects \(([^)]+)\)"),
+    re.compile(r"Failed building wheel for ([^\s]+)"),
+    re.compile(r"Failed to build ([A-Za-z0-9._\- ]+)$", re.MULTILINE),
+    re.compile(r"Cannot install (.+?) because these package versions have conflicting dependencies"),
+]
+
+# Errors that mean the requirements cannot be satisfied from the index at
+# all, as opposed to a package that fails to build.
+_RESOLUTION_ERRORS = (
+    "ResolutionImpossible",
+    "No matching distribution found",
+    "Could not find a version that satisfies",
+    "conflicting dependencies",
+)
+
+
+def normalize_name(name: str) -> str:
+    """Normalizes a distribution name as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirements(content: str) -> Optional[Dict[str, str]]:
+    """Parses simple ``requirements.txt`` content into ``{normalized name: requirement}``.
+
+    Only plain ``name[extras] specifier ; marker`` lines are understood.  Any
+    pip option (``-r``, ``-e``, ``--index-url``...), URL or path requirement
+    makes the file too dynamic to diff, in which case ``None`` is returned and
+    callers should fall back to a full install.
+    """
+    requirements: Dict[str, str] = {}
+    for raw_line in content.splitlines():
+        line = raw_line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-") or "://" in line or " @ " in line or line.startswith((".", "/")):
+            return None
+        match = _REQUIREMENT_RE.match(line)
+        if not match:
+            return None
+        name, extras, rest = match.groups()
+        specifier, _, marker = rest.partition(";")
+        requirement = name + (extras or "") + re.sub(r"\s+", "", specifier)
+        if marker.strip():
+            requirement += "; " + marker.strip()
+        requirements[normalize_name(name)] = requirement
+    return requirements
+
+
+@dataclass
+class RequirementsDelta:
+    """The difference between two parsed requirement sets."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+def diff_requirements(old: Dict[str, str], new: Dict[str, str]) -> RequirementsDelta:
+    """Computes which requirements were added, removed or re-specified.
+
+    ``added`` and ``changed`` hold requirement strings ready to hand to
+    ``pip install``; ``removed`` holds distribution names for ``pip uninstall``.
+    """
+    delta = RequirementsDelta()
+    for name, requirement in sorted(new.items()):
+        if name not in old:
+            delta.added.append(requirement)
+        elif old[name] != requirement:
+            delta.changed.append(requirement)
+    for name in sorted(old):
+        if name not in new:
+            delta.removed.append(name)
+    return delta
+
+
+def is_resolution_failure(log: str) -> bool:
+    """Whether a pip log failed in dependency resolution rather than in a build."""
+    return any(error in log for error in _RESOLUTION_ERRORS)
+
+
+def failing_requirements(log: str, requirements: Dict[str, str]) -> Set[str]:
+    """Returns the names in ``requirements`` that a pip error log blames for the failure."""
+    blamed: Set[str] = set()
+    for pattern in _FAILURE_PATTERNS:
+        for match in pattern.finditer(log):
+            for candidate in re.split(r"[\s,]+", match.group(1)):
+                name_match = _REQUIREMENT_RE.match(candidate.strip())
+                if name_match:
+                    name = normalize_name(name_match.group(1))
+                    if name in requirements:
+                        blamed.add(name)
+    return blamed
+
+
+@dataclass
+class ResolutionConflict:
+    """What a failed pip resolution or install blamed, pulled out of its log."""
+
+    # The requirements.txt entries pip named.
+    requirements: List[str] = field(default_factory=list)
+    # pip's "The conflict is caused by:" explanation, one dependency per line.
+    causes: List[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.requirements or self.causes)
+
+    def summary(self) -> str:
+        lines = [f"Blamed requirement: {requirement}" for requirement in self.requirements]
+        lines += [f"Conflict cause: {cause}" for cause in self.causes]
+        return "\n".join(lines)
+
+
+def find_conflict(log: str, requirements: Dict[str, str]) -> ResolutionConflict:
+    """Extracts the blamed requirements and the resolver's conflict causes from a pip log."""
+    conflict = ResolutionConflict(
+        requirements=[requirements[name] for name in sorted(failing_requirements(log, requirements))]
+    )
+    in_causes = False
+    for line in log.splitlines():
+        if line.strip() == "The conflict is caused by:":
+            in_causes = True
+        elif in_causes:
+            if not line.strip():
+                break
+            conflict.causes.append(line.strip())
+    return conflict
+
+
+def merge_requirements(base: str, extra: str) -> str:
+    """Appends the lines of ``extra`` whose distributions are not already in ``base``."""
+    known = set((parse_requirements(base) or {}).keys())
+    lines = [line for line in base.splitlines() if line.strip()]
+    for line in extra.splitlines():
+        parsed = parse_requirements(line)
+        if parsed is None:
+            if line.strip() and line.strip() not in lines:
+                lines.append(line.strip())
+            continue
+        for name, requirement in parsed.items():
+            if name not in known:
+                known.add(name)
+                lines.append(requirement)
+    return "".join(f"{line}\n" for line in lines)
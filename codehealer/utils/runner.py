@@ -1,39 +1,180 @@
 import subprocess
 import os
-from typing import List, Optional
+import json
+import tempfile
+import threading
+import time
+from typing import Iterable, List, Optional
+from codehealer.utils import tracing
+from codehealer.utils.file_handler import FileHandler
+from codehealer.utils.affected_tests import TestSelector, load_coverage_map
+from codehealer.utils.import_probe import PROBE_SCRIPT, ImportProbeResult, parse_probe_output
 from codehealer.utils.sandbox import SandboxManager
+from codehealer.utils import warm_worker
+from codehealer.utils.warm_worker import WarmWorker
+from codehealer.utils.wheelhouse import Wheelhouse
+from codehealer.utils.output_capture import DEFAULT_HEAD_LINES, DEFAULT_TAIL_LINES, OutputCapture
+from codehealer.utils.limits import (
+    TIMEOUT_EXIT_CODE,
+    RunLimits,
+    RunUsage,
+    kill_process_group,
+    limited_command,
+    popen_kwargs,
+    stop_process_group,
+    wait_with_usage,
+)
+from codehealer.utils.requirements import (
+    RequirementsDelta,
+    ResolutionConflict,
+    diff_requirements,
+    find_conflict,
+    is_resolution_failure,
+    parse_requirements,
+)
+
+def command_label(command: List[str]) -> str:
+    """A short name for ``command`` in traces, e.g. ``pip install`` or ``python -m pytest``."""
+    label = [os.path.basename(command[0])] if command else []
+    for arg in command[1:3]:
+        if "\n" in arg or (label[1:] and label[1] != "-m"):
+            break
+        label.append(os.path.basename(arg) if arg.endswith(".py") else arg)
+    return " ".join(label)
 
 class Runner:
     """Handles running external commands within a specified sandbox."""
 
-    def __init__(self, repo_path: str, sandbox: SandboxManager):
+    def __init__(self, repo_path: str, sandbox: SandboxManager, wheelhouse: Optional[Wheelhouse] = None):
         self.repo_path = repo_path
         self.sandbox = sandbox
+        self.wheelhouse = wheelhouse
+        # Requirements installed in the sandbox's last-good state (the one
+        # ``sandbox.restore()`` returns to), keyed by normalized name; ``{}``
+        # is the fresh venv.  ``None`` means the state is unknown and the
+        # next install has to be a full ``pip install -r``.
+        self.installed_requirements: Optional[dict[str, str]] = {}
+        # What pip blamed when the last resolution or install failed, for
+        # the EnvironmentAgent to see next to the raw log.
+        self.last_conflict: Optional[ResolutionConflict] = None
+        # The command currently running, so another thread can stop it.
+        self.active_process: Optional[subprocess.Popen] = None
+        self.cancelled = False
+        # Limits for every command, and (when set) stricter or different
+        # ones for entry-point runs, e.g. a health-check window for servers.
+        self.command_limits = RunLimits()
+        self.entry_point_limits: Optional[RunLimits] = None
+        self._current_limits: Optional[RunLimits] = None
+        # Resource usage of the last command.
+        self.last_usage: Optional[RunUsage] = None
+        # Output is kept as a bounded head and tail (plus the last
+        # tracebacks); with ``log_dir`` set the full output of every command
+        # is also written to a file there.
+        self.output_head_lines = DEFAULT_HEAD_LINES
+        self.output_tail_lines = DEFAULT_TAIL_LINES
+        self.log_dir: Optional[str] = None
+        self.last_log_path: Optional[str] = None
+        # With ``use_warm_worker`` set, entry-point runs and import checks are
+        # forked from a sandbox interpreter that has the repository's
+        # third-party dependencies already imported.
+        self.use_warm_worker = False
+        self._warm_worker: Optional[WarmWorker] = None
+        # ``run_tests`` options: parallel pytest-xdist workers, and a
+        # ``.coverage`` file recorded with per-test contexts that refines
+        # which tests a change affects.
+        self.test_workers: Optional[int] = None
+        self.test_coverage_file: Optional[str] = None
+        self._xdist_available: Optional[bool] = None
+
+    def _run_command(self, command: List[str], worker: Optional[WarmWorker] = None) -> tuple[int, str]:
+        """A generic method to run a command, stream its output, and capture it.
+
+        The command runs in its own process group under the active
+        :class:`RunLimits`; the whole group is stopped on timeout, after a
+        successful health check, or when the command exits and leaves
+        children behind.  With a ``worker``, the Python command in
+        ``command`` is forked from it instead of started from scratch.
+        """
+        with tracing.span(command_label(command), "command", warm=worker is not None) as span:
+            exit_code, log = self._execute_command(command, worker)
+            usage = self.last_usage
+            span.set(exit_code=exit_code, bytes_read=len(log.encode("utf-8")))
+            if usage is not None:
+                span.set(child_cpu_seconds=usage.cpu_seconds, max_rss_bytes=usage.max_rss_bytes)
+        return exit_code, log
 
-    def _run_command(self, command: List[str]) -> tuple[int, str]:
-        """A generic method to run a command, stream its output, and capture it."""
-        print(f"[runner] $ {' '.join(command)}")
+    def _execute_command(self, command: List[str], worker: Optional[WarmWorker]) -> tuple[int, str]:
+        self.last_usage = None
+        limits = self._current_limits or self.command_limits
+        # Multi-line ``-c`` scripts are shown by their size only.
+        shown = [f"<{arg.count(chr(10)) + 1}-line script>" if "\n" in arg else arg for arg in command]
+        print(f"[runner] $ {' '.join(shown)}" + (" (warm)" if worker is not None else ""))
+        started = time.monotonic()
+        capture = None
         try:
-            # Use Popen to stream output in real-time.
-            proc = subprocess.Popen(
-                command,
-                cwd=self.repo_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            output_lines = []
-            # Read and print output line by line.
-            for line in proc.stdout:
-                print(line, end="")
-                output_lines.append(line)
-            
-            # Wait for process to finish and get return code.
-            return_code = proc.wait()
-            return return_code, "".join(output_lines)
+            capture = self._open_capture(command)
+            proc = None
+            if worker is not None:
+                try:
+                    proc = worker.spawn(command[1:], self.repo_path, limits)
+                except OSError as e:
+                    print(f"[warm-worker] Run failed to start ({e}); falling back to a fresh interpreter.")
+                    self.stop_warm_worker()
+            if proc is None:
+                # Use Popen to stream output in real-time.
+                proc = subprocess.Popen(
+                    limited_command(command, limits),
+                    cwd=self.repo_path,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    **popen_kwargs(limits),
+                )
+            self.active_process = proc
+            if self.cancelled:
+                kill_process_group(proc)
+
+            # Read and print output line by line on a separate thread so the
+            # time limits can be enforced while the process is quiet.
+            reader = threading.Thread(target=self._pump_output, args=(proc.stdout, capture), daemon=True)
+            reader.start()
+
+            healthy_after = limits.healthy_after_seconds
+            timeout = limits.timeout_seconds
+            if healthy_after is not None and (timeout is None or healthy_after < timeout):
+                usage = wait_with_usage(proc, healthy_after)
+                healthy = usage is None
+            else:
+                usage = wait_with_usage(proc, timeout)
+                healthy = False
+            timed_out = usage is None and not healthy
+            if usage is None:
+                usage = stop_process_group(proc)
+            else:
+                # Reap anything the command left running in its group.
+                kill_process_group(proc)
+            reader.join(timeout=5)
+
+            usage.wall_seconds = time.monotonic() - started
+            usage.timed_out, usage.healthy_alive = timed_out, healthy
+            self.last_usage = usage
+            return_code = proc.returncode
+            note = ""
+            if healthy:
+                return_code = 0
+                note = f"[runner] Process still running after {healthy_after:g}s; treating it as healthy and stopping it.\n"
+            elif timed_out:
+                return_code = TIMEOUT_EXIT_CODE
+                note = f"[runner] Command timed out after {timeout:g}s and was stopped.\n"
+            print(note, end="")
+            print(f"[runner] Resources: {usage.summary()}")
+            if capture.truncated:
+                print(f"[runner] Captured {capture.total_lines} output lines; the log passed on is truncated.")
+            if note:
+                capture.add(note)
+            return return_code, capture.render()
 
         except FileNotFoundError:
             error_msg = f"Error: Command not found: {command[0]}"
@@ -43,18 +184,182 @@ class Runner:
             error_msg = f"Error: Failed to execute command '{' '.join(command)}': {e}"
             print(error_msg)
             return -1, error_msg
+        finally:
+            if capture is not None:
+                capture.close()
+
+    def _open_capture(self, command: List[str]) -> OutputCapture:
+        """Creates the capture for ``command`` and, with ``log_dir`` set, its full-log file."""
+        log_file = None
+        self.last_log_path = None
+        if self.log_dir:
+            os.makedirs(self.log_dir, exist_ok=True)
+            name = os.path.basename(command[1] if len(command) > 1 and not command[1].startswith("-") else command[0])
+            fd, self.last_log_path = tempfile.mkstemp(
+                prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-", suffix=".log", dir=self.log_dir
+            )
+            log_file = os.fdopen(fd, "w", encoding="utf-8")
+        return OutputCapture(self.output_head_lines, self.output_tail_lines, log_file, self.last_log_path)
+
+    @staticmethod
+    def _pump_output(stream, capture: OutputCapture) -> None:
+        for line in stream:
+            print(line, end="")
+            capture.add(line)
+
+    def terminate(self) -> None:
+        """Kills the running command and makes any later command exit immediately."""
+        self.cancelled = True
+        proc = self.active_process
+        if proc is not None and proc.returncode is None:
+            kill_process_group(proc)
 
     def find_requirements(self) -> Optional[str]:
         path = os.path.join(self.repo_path, 'requirements.txt')
         return path if os.path.exists(path) else None
 
+    def _read_requirements(self, requirements_path: str) -> Optional[dict[str, str]]:
+        try:
+            with open(requirements_path, "r", encoding="utf-8") as f:
+                return parse_requirements(f.read())
+        except OSError:
+            return None
+
     def install_dependencies(self) -> tuple[int, str]:
+        """Installs requirements.txt, applying only the delta from the last-good requirements.
+
+        A failed install leaves ``installed_requirements`` alone, so after
+        the sandbox is restored the next rewrite is diffed against the same
+        known state.
+        """
         requirements_path = self.find_requirements()
         if not requirements_path:
             return 0, "No requirements.txt found."
         
         pip_exe = self.sandbox.get_pip_executable()
-        return self._run_command([pip_exe, "install", "-r", requirements_path])
+        self.last_conflict = None
+        wanted = self._read_requirements(requirements_path)
+        if wanted is None or self.installed_requirements is None:
+            exit_code, log = self._pip_install(pip_exe, ["-r", requirements_path])
+        else:
+            delta = diff_requirements(self.installed_requirements, wanted)
+            if delta.is_empty():
+                return 0, "requirements.txt is unchanged since the last successful install."
+            exit_code, log = self._apply_delta(pip_exe, requirements_path, delta)
+
+        if exit_code == 0:
+            self.installed_requirements = wanted
+        else:
+            self._record_conflict(log, wanted)
+        return exit_code, log
+
+    def _record_conflict(self, log: str, wanted: Optional[dict[str, str]]) -> None:
+        conflict = find_conflict(log, wanted or {})
+        self.last_conflict = None if conflict.is_empty() else conflict
+
+    def resolve_dependencies(self) -> tuple[int, str]:
+        """Checks that requirements.txt resolves without installing anything.
+
+        Runs ``pip install --dry-run --report`` so unresolvable candidates fail
+        before any distribution is downloaded in full.  On success the log is a
+        summary of what a real install would add; on failure what pip blamed
+        is kept on ``last_conflict``.
+        """
+        self.last_conflict = None
+        requirements_path = self.find_requirements()
+        if not requirements_path:
+            return 0, "No requirements.txt found."
+        wanted = self._read_requirements(requirements_path)
+        if wanted is not None and wanted == self.installed_requirements:
+            return 0, "requirements.txt is unchanged since the last successful install."
+
+        pip_exe = self.sandbox.get_pip_executable()
+        fd, report_path = tempfile.mkstemp(prefix="codehealer-resolve-", suffix=".json")
+        os.close(fd)
+        try:
+            command = [pip_exe, "install", "--dry-run", "--quiet", "--report", report_path]
+            if self.wheelhouse is not None:
+                command += self.wheelhouse.online_install_args()
+            exit_code, log = self._run_command(command + ["-r", requirements_path])
+            if exit_code != 0:
+                if "no such option" in log:
+                    # pip < 22.2 has no resolve-only mode; let the real install decide.
+                    return 0, "pip does not support --dry-run; skipping the resolution check."
+                self._record_conflict(log, wanted)
+                return exit_code, f"Dependency resolution (pip --dry-run) failed:\n{log}"
+            try:
+                with open(report_path, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                return 0, log
+        finally:
+            if os.path.exists(report_path):
+                os.remove(report_path)
+
+        resolved = [
+            f"{item['metadata']['name']}=={item['metadata']['version']}"
+            for item in report.get("install", [])
+        ]
+        summary = f"Resolved {len(resolved)} package(s) to install"
+        return 0, summary + (":\n" + "\n".join(resolved) if resolved else ".")
+
+    def _apply_delta(self, pip_exe: str, requirements_path: str, delta: RequirementsDelta) -> tuple[int, str]:
+        """Installs added or re-pinned requirements with the rest of the file as constraints.
+
+        The constraints keep pip from moving the pins of unchanged
+        requirements, so conflicts surface just as with a full ``-r``
+        install.  Removed requirements are left installed, as a full install
+        would leave them; other packages may still depend on them.
+        """
+        print(
+            f"[runner] Requirements delta: {len(delta.added)} added, "
+            f"{len(delta.changed)} changed, {len(delta.removed)} removed."
+        )
+        if not (delta.added or delta.changed):
+            return 0, "Only removals in requirements.txt; nothing to install."
+        return self._pip_install(pip_exe, ["-c", requirements_path, *delta.added, *delta.changed])
+
+    def _pip_install(self, pip_exe: str, targets: List[str]) -> tuple[int, str]:
+        if self.wheelhouse is None:
+            return self._run_command([pip_exe, "install", *targets])
+        return self._install_via_wheelhouse(pip_exe, targets)
+
+    def _install_via_wheelhouse(self, pip_exe: str, targets: List[str]) -> tuple[int, str]:
+        """Installs ``targets`` from the wheelhouse, populating it from the index on a miss.
+
+        The offline attempt fails for any requirement the wheelhouse lacks,
+        so its errors say nothing about the index; the populating ``pip
+        wheel`` does, and a resolution error there ends the install.
+        """
+        wheelhouse = self.wheelhouse
+        exit_code, log = self._run_command(
+            [pip_exe, "install", *wheelhouse.offline_install_args(), *targets]
+        )
+        if exit_code == 0:
+            wheelhouse.hits += 1
+            print(f"[runner] Wheelhouse hit ({wheelhouse.hits} hits, {wheelhouse.misses} misses).")
+            return exit_code, log
+
+        wheelhouse.misses += 1
+        print(f"[runner] Wheelhouse miss ({wheelhouse.hits} hits, {wheelhouse.misses} misses). Populating...")
+        with wheelhouse.staging() as staging_dir:
+            exit_code, log = self._run_command([pip_exe, "wheel", *wheelhouse.populate_args(staging_dir), *targets])
+            if exit_code == 0:
+                wheelhouse.publish(staging_dir)
+        if exit_code != 0 and is_resolution_failure(log):
+            # ``pip wheel`` resolved against the index and the requirements
+            # cannot be met; an online install would only fail the same way.
+            return exit_code, log
+        if exit_code == 0:
+            exit_code, log = self._run_command(
+                [pip_exe, "install", *wheelhouse.offline_install_args(), *targets]
+            )
+            if exit_code == 0:
+                return exit_code, log
+        # Some projects cannot be built as wheels (or the wheelhouse is
+        # unusable); let pip talk to the index directly so the error log the
+        # EnvironmentAgent sees comes from a real install.
+        return self._run_command([pip_exe, "install", *wheelhouse.online_install_args(), *targets])
 
     def find_entry_point(self) -> Optional[str]:
         common_files = ['main.py', 'app.py', 'run.py']
@@ -64,9 +369,50 @@ class Runner:
                 return filename
         return None
 
+    def _run_python(self, args: List[str]) -> tuple[int, str]:
+        """Runs ``python *args`` in the sandbox, through the warm worker when it is enabled."""
+        command = [self.sandbox.get_python_executable(), *args]
+        worker = self._ensure_warm_worker() if self.use_warm_worker and warm_worker.can_run(args) else None
+        if worker is None:
+            return self._run_command(command)
+        return self._run_command(command, worker)
+
+    def _ensure_warm_worker(self) -> Optional[WarmWorker]:
+        """Returns a running warm worker for the current dependencies, (re)starting it if needed."""
+        if not warm_worker.is_supported():
+            return None
+        fingerprint = warm_worker.environment_fingerprint(self.sandbox.venv_path, self.find_requirements())
+        worker = self._warm_worker
+        if worker is not None and worker.alive and worker.fingerprint == fingerprint:
+            return worker
+        if worker is not None:
+            print("[warm-worker] Dependencies changed; restarting.")
+            self.stop_warm_worker()
+
+        files = FileHandler(ignore_patterns=[f"/{self.sandbox.venv_name}/"]).list_all_python_files(self.repo_path)
+        preload = warm_worker.preload_modules(files, self.sandbox.venv_path)
+        worker = WarmWorker(self.sandbox.get_python_executable(), self.repo_path, preload, fingerprint)
+        started = time.monotonic()
+        if not worker.start():
+            return None
+        print(
+            f"[warm-worker] Started in {time.monotonic() - started:.2f}s"
+            f" with {len(preload)} preloaded module(s){': ' + ', '.join(preload) if preload else ''}."
+        )
+        self._warm_worker = worker
+        return worker
+
+    def stop_warm_worker(self) -> None:
+        if self._warm_worker is not None:
+            self._warm_worker.stop()
+            self._warm_worker = None
+
     def run_entry_point(self, entry_point_filename: str) -> tuple[int, str]:
-        python_exe = self.sandbox.get_python_executable()
-        return self._run_command([python_exe, entry_point_filename])
+        self._current_limits = self.entry_point_limits
+        try:
+            return self._run_python([entry_point_filename])
+        finally:
+            self._current_limits = None
 
     def discover_importable_packages(self) -> list[str]:
         """Return a sorted list of top-level packages inside the repository."""
@@ -82,16 +428,78 @@ class Runner:
 
     def import_package(self, package_name: str) -> tuple[int, str]:
         """Attempt to import the given package inside the sandbox."""
-        python_exe = self.sandbox.get_python_executable()
-        return self._run_command([python_exe, "-c", f"import {package_name}"])
+        return self._run_python(["-c", f"import {package_name}"])
+
+    def probe_packages(self, packages: Optional[List[str]] = None) -> List[ImportProbeResult]:
+        """Imports every package (default: all discovered ones) in one sandbox process.
+
+        Each import's output and traceback are captured separately.  Packages
+        the probe did not report on, because an import crashed the
+        interpreter, are imported one at a time instead.
+        """
+        if packages is None:
+            packages = self.discover_importable_packages()
+        if not packages:
+            return []
+        _, output = self._run_python(["-c", PROBE_SCRIPT, *packages])
+        found = parse_probe_output(output)
+        results = []
+        for package in packages:
+            result = found.get(package)
+            if result is None:
+                exit_code, log = self.import_package(package)
+                result = ImportProbeResult(package, exit_code == 0, log=log)
+            results.append(result)
+        return results
 
     def is_pytest_installed(self) -> bool:
         """Check if pytest is installed in the sandbox."""
-        python_exe = self.sandbox.get_python_executable()
-        exit_code, _ = self._run_command([python_exe, "-c", "import pytest"])
+        exit_code, _ = self._run_python(["-c", "import pytest"])
         return exit_code == 0
 
-    def run_tests(self) -> tuple[int, str]:
-        """Run the pytest test suite."""
-        python_exe = self.sandbox.get_python_executable()
-        return self._run_command([python_exe, "-m", "pytest"])
+    def run_tests(self, changed_paths: Optional[Iterable[str]] = None) -> tuple[int, str]:
+        """Run the pytest test suite.
+
+        With ``changed_paths`` (e.g. ``FileHandler.take_written_paths()``),
+        only the tests affected by those files run; the full suite runs when
+        the effect of a change cannot be bounded.  Callers should finish with
+        a full run (no ``changed_paths``) to confirm the result.
+        """
+        args = ["-m", "pytest"]
+        if changed_paths is not None:
+            selection = self.select_tests(changed_paths)
+            if selection == []:
+                print("[runner] No tests are affected by the changed files.")
+                return 0, "No tests are affected by the changed files."
+            if selection is not None:
+                print(f"[runner] Running {len(selection)} affected test file(s).")
+                args += selection
+        if self.test_workers and self.test_workers > 1 and self._has_xdist():
+            args += ["-n", str(self.test_workers)]
+        exit_code, log = self._run_python(args)
+        if exit_code == 5 and changed_paths is not None:
+            # pytest: no tests collected from the selection.
+            return 0, log
+        return exit_code, log
+
+    def select_tests(self, changed_paths: Iterable[str]) -> Optional[List[str]]:
+        """Returns the test files affected by ``changed_paths``, or ``None`` for the full suite."""
+        root = os.path.realpath(self.repo_path)
+        changed = []
+        for path in changed_paths:
+            path = os.path.realpath(os.path.join(root, path))
+            if os.path.commonpath([root, path]) != root:
+                continue
+            changed.append(os.path.relpath(path, root))
+        if not changed:
+            return []
+        files = FileHandler(ignore_patterns=[f"/{self.sandbox.venv_name}/"]).list_all_python_files(self.repo_path)
+        coverage_map = load_coverage_map(self.test_coverage_file, root) if self.test_coverage_file else None
+        return TestSelector(files, coverage_map).select(changed)
+
+    def _has_xdist(self) -> bool:
+        if self._xdist_available is None:
+            self._xdist_available = self._run_python(["-c", "import xdist"])[0] == 0
+            if not self._xdist_available:
+                print("[runner] pytest-xdist is not installed; running tests in one process.")
+        return self._xdist_available
@@ -1,19 +1,49 @@
 import os
 import sys
+import json
 import venv
 import shutil
+from typing import Optional, Sequence
+
+from codehealer.utils import tracing
+from codehealer.utils.venv_cache import VenvTemplateCache, clone_tree, copy_file
+
+DEFAULT_VENV_NAME = ".codehealer_venv"
 
 class SandboxManager:
     """Manages the creation, use, and cleanup of a dedicated virtual environment."""
 
-    def __init__(self, repo_path: str, venv_name: str = ".codehealer_venv"):
+    def __init__(
+        self,
+        repo_path: str,
+        venv_name: str = DEFAULT_VENV_NAME,
+        template_cache: Optional[VenvTemplateCache] = None,
+        seed_packages: Sequence[str] = (),
+    ):
         self.repo_path = repo_path
+        self.venv_name = venv_name
         self.venv_path = os.path.join(self.repo_path, venv_name)
+        self.template_cache = template_cache
+        self.seed_packages = list(seed_packages)
+        self.snapshot_root = f"{self.venv_path}.snapshots"
+        self.candidates_root = f"{self.venv_path}.candidates"
+        # Kept by ``cleanup`` so an interrupted run can be resumed.
+        self.checkpoint_path = f"{self.venv_path}.checkpoints.sqlite3"
 
+    @tracing.traced("sandbox", "create_venv")
     def create(self):
-        """Creates a new virtual environment."""
+        """Creates a new virtual environment, cloning a cached template when available."""
         if os.path.exists(self.venv_path):
             self.cleanup()
+        if self.template_cache is not None:
+            print(f"Cloning virtual environment template into: {self.venv_path}")
+            try:
+                self.template_cache.clone_into(self.venv_path, self.seed_packages)
+                return
+            except Exception as e:
+                print(f"Warning: Could not clone venv template, falling back to a fresh venv: {e}")
+                if os.path.exists(self.venv_path):
+                    shutil.rmtree(self.venv_path, ignore_errors=True)
         print(f"Creating virtual environment at: {self.venv_path}")
         try:
             venv.create(self.venv_path, with_pip=True)
@@ -34,11 +64,150 @@ class SandboxManager:
         else:
             return os.path.join(self.venv_path, "bin", "pip")
 
+    def _scan(self, root: str) -> dict:
+        """Returns a manifest of every directory, file and symlink under ``root``."""
+        manifest = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, root)
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                st = os.lstat(path)
+                if os.path.islink(path):
+                    manifest[rel] = {"type": "link", "target": os.readlink(path)}
+                elif os.path.isdir(path):
+                    manifest[rel] = {"type": "dir"}
+                else:
+                    manifest[rel] = {"type": "file", "ino": st.st_ino, "size": st.st_size, "mtime": st.st_mtime_ns}
+        return manifest
+
+    @tracing.traced("sandbox", "snapshot_venv")
+    def snapshot(self, name: str = "last-good") -> str:
+        """Records the current venv state as a hardlinked snapshot named ``name``.
+
+        Only inodes are shared, so taking a snapshot costs one ``link`` call per
+        file.  pip never rewrites installed files in place (it writes new files
+        and unlinks old ones), which keeps the snapshot's contents stable.
+        """
+        snapshot_path = os.path.join(self.snapshot_root, name)
+        if os.path.exists(snapshot_path):
+            shutil.rmtree(snapshot_path)
+        manifest = self._scan(self.venv_path)
+        files_dir = os.path.join(snapshot_path, "files")
+        os.makedirs(files_dir)
+        for rel, entry in manifest.items():
+            if entry["type"] == "dir":
+                os.makedirs(os.path.join(files_dir, rel), exist_ok=True)
+            elif entry["type"] == "file":
+                dest = os.path.join(files_dir, rel)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                try:
+                    os.link(os.path.join(self.venv_path, rel), dest)
+                except OSError:
+                    shutil.copy2(os.path.join(self.venv_path, rel), dest)
+        with open(os.path.join(snapshot_path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        print(f"Snapshot '{name}' recorded ({len(manifest)} entries).")
+        return snapshot_path
+
+    def has_snapshot(self, name: str = "last-good") -> bool:
+        return os.path.exists(os.path.join(self.snapshot_root, name, "manifest.json"))
+
+    @tracing.traced("sandbox", "restore_venv")
+    def restore(self, name: str = "last-good") -> bool:
+        """Rolls the venv back to snapshot ``name``, touching only entries that changed.
+
+        Returns ``False`` when no such snapshot exists.
+        """
+        snapshot_path = os.path.join(self.snapshot_root, name)
+        manifest_path = os.path.join(snapshot_path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        files_dir = os.path.join(snapshot_path, "files")
+        current = self._scan(self.venv_path) if os.path.exists(self.venv_path) else {}
+
+        removed = 0
+        # Deepest paths first so directories are emptied before they are removed.
+        for rel in sorted(current, key=len, reverse=True):
+            entry = current[rel]
+            expected = manifest.get(rel)
+            if expected is not None and expected["type"] == entry["type"]:
+                if entry["type"] == "dir":
+                    continue
+                if entry["type"] == "link" and entry["target"] == expected["target"]:
+                    continue
+                if entry["type"] == "file" and all(entry[k] == expected[k] for k in ("ino", "size", "mtime")):
+                    continue
+            path = os.path.join(self.venv_path, rel)
+            if entry["type"] == "dir":
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.unlink(path)
+            removed += 1
+
+        restored = 0
+        os.makedirs(self.venv_path, exist_ok=True)
+        for rel in sorted(manifest, key=len):
+            entry = manifest[rel]
+            path = os.path.join(self.venv_path, rel)
+            if os.path.lexists(path):
+                continue
+            if entry["type"] == "dir":
+                os.makedirs(path, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if entry["type"] == "link":
+                os.symlink(entry["target"], path)
+            else:
+                try:
+                    os.link(os.path.join(files_dir, rel), path)
+                except OSError:
+                    shutil.copy2(os.path.join(files_dir, rel), path)
+            restored += 1
+        print(f"Restored snapshot '{name}' ({removed} removed, {restored} restored).")
+        return True
+
+    @tracing.traced("sandbox", "clone_sandbox")
+    def clone(self, dest_repo_path: str) -> "SandboxManager":
+        """Creates an isolated copy of the repository and its venv at ``dest_repo_path``.
+
+        Repository files are copied, as copy-on-write clones where the
+        filesystem supports them: fixes and the program under test rewrite
+        them in place, which would write through a hardlink.  The venv is
+        hardlinked (it is only read at runtime) with its scripts and
+        ``pyvenv.cfg`` rewritten to point at the clone.
+        """
+        skip = {
+            self.venv_name,
+            os.path.basename(self.snapshot_root),
+            os.path.basename(self.candidates_root),
+            ".git",
+        }
+        repo_root = os.path.abspath(self.repo_path)
+
+        def ignore(directory: str, names: list) -> list:
+            if os.path.abspath(directory) != repo_root:
+                return []
+            # SQLite keeps ``-wal``/``-journal`` files next to the checkpoint database.
+            checkpoints = os.path.basename(self.checkpoint_path)
+            return [n for n in names if n in skip or n.startswith(checkpoints)]
+
+        shutil.copytree(self.repo_path, dest_repo_path, symlinks=True, ignore=ignore, copy_function=copy_file)
+        clone = SandboxManager(dest_repo_path, self.venv_name)
+        if os.path.exists(self.venv_path):
+            clone_tree(self.venv_path, clone.venv_path, os.path.abspath(self.venv_path))
+        return clone
+
     def cleanup(self):
-        """Removes the virtual environment directory."""
+        """Removes the virtual environment directory and any snapshots of it."""
         if os.path.exists(self.venv_path):
             print(f"Removing virtual environment: {self.venv_path}")
             try:
                 shutil.rmtree(self.venv_path)
             except OSError as e:
                 print(f"Warning: Could not remove sandbox directory {self.venv_path}: {e}")
+        for root in (self.snapshot_root, self.candidates_root):
+            if os.path.exists(root):
+                shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,187 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Numeric span fields that the summary table adds up.
+SUMMED_FIELDS = ("child_cpu_seconds", "tokens_in", "tokens_out", "bytes_read", "bytes_written")
+
+
+@dataclass
+class Span:
+    """One timed operation.
+
+    ``cpu_seconds`` is the CPU time of the thread that ran it; CPU used by
+    child processes is reported separately as ``child_cpu_seconds``.
+    ``fields`` holds whatever else the operation knows (tokens, bytes,
+    ``cache_hit``, exit codes).
+    """
+
+    name: str
+    category: str
+    start: float
+    thread_id: int
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+
+class Tracer:
+    """Collects spans from every thread for one heal."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str, **fields: Any) -> Iterator[Span]:
+        span = Span(name, category, time.perf_counter(), threading.get_ident(), fields=fields)
+        cpu_started = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.wall_seconds = time.perf_counter() - span.start
+            span.cpu_seconds = time.thread_time() - cpu_started
+            with self._lock:
+                self.spans.append(span)
+
+    def chrome_trace(self) -> dict:
+        """Returns the spans in the Chrome trace event format (``chrome://tracing``, Perfetto).
+
+        The per-operation summary is included under ``summary``.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.started) * 1e6),
+                "dur": round(span.wall_seconds * 1e6),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {"cpu_seconds": round(span.cpu_seconds, 6), **span.fields},
+            }
+            for span in spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary_rows()}
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def summary_rows(self) -> List[dict]:
+        """Aggregates spans by category and name, largest total wall time first."""
+        rows: Dict[tuple, dict] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = rows.setdefault(
+                (span.category, span.name),
+                {"category": span.category, "name": span.name, "count": 0, "wall_seconds": 0.0,
+                 "cpu_seconds": 0.0, "cache_hits": 0, **{key: 0 for key in SUMMED_FIELDS}},
+            )
+            row["count"] += 1
+            row["wall_seconds"] += span.wall_seconds
+            row["cpu_seconds"] += span.cpu_seconds
+            # An LLM span is one cached call; a file scan reports how many files hit its index.
+            row["cache_hits"] += span.fields.get("cache_hits") or (1 if span.fields.get("cache_hit") else 0)
+            for key in SUMMED_FIELDS:
+                row[key] += span.fields.get(key) or 0
+        return sorted(rows.values(), key=lambda row: (row["category"] != "node", -row["wall_seconds"]))
+
+    def summary_table(self) -> str:
+        """Formats :meth:`summary_rows` as a fixed-width table.
+
+        Node rows include the time of everything that ran inside them.
+        """
+        header = ("operation", "count", "wall s", "cpu s", "child cpu s", "tokens in", "tokens out",
+                  "read", "written", "cache hits")
+        lines = [header]
+        for row in self.summary_rows():
+            lines.append((
+                f"{row['category']}: {row['name']}"[:48],
+                str(row["count"]),
+                f"{row['wall_seconds']:.2f}",
+                f"{row['cpu_seconds']:.2f}",
+                f"{row['child_cpu_seconds']:.2f}",
+                str(row["tokens_in"]),
+                str(row["tokens_out"]),
+                _format_bytes(row["bytes_read"]),
+                _format_bytes(row["bytes_written"]),
+                str(row["cache_hits"]),
+            ))
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        return "\n".join(
+            "  ".join(cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i]) for i, cell in enumerate(line))
+            for line in lines
+        )
+
+
+def _format_bytes(count: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if count < 1024:
+            return f"{count:.0f}{unit}" if unit == "B" else f"{count:.1f}{unit}"
+        count /= 1024
+    return f"{count:.1f}GiB"
+
+
+# The tracer of the heal in progress.  A context variable rather than a
+# global so that heals running side by side on different threads each
+# trace into their own tracer; see :func:`bind` for worker threads.
+_active: ContextVar[Optional[Tracer]] = ContextVar("codehealer_tracer", default=None)
+
+
+def activate(tracer: Optional[Tracer]) -> None:
+    """Makes ``tracer`` receive the spans of instrumented calls in this context; ``None`` stops tracing."""
+    _active.set(tracer)
+
+
+def bind(func: Callable) -> Callable:
+    """Returns ``func`` bound to the current tracer, for running it on a worker thread."""
+    tracer = _active.get()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        token = _active.set(tracer)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return run
+
+
+@contextmanager
+def span(name: str, category: str, **fields: Any) -> Iterator[Span]:
+    """Times the enclosed block on the active tracer; a no-op when none is active."""
+    tracer = _active.get()
+    if tracer is None:
+        yield Span(name, category, 0.0, 0, fields=fields)
+        return
+    with tracer.span(name, category, **fields) as active:
+        yield active
+
+
+def traced(category: str, name: Optional[str] = None) -> Callable:
+    """Decorates a function so every call is a span (named after the function by default)."""
+    def decorate(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+import venv
+from typing import Iterable, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codehealer", "venv-templates")
+DEFAULT_MAX_SIZE_BYTES = 2 * 1024 ** 3
+METADATA_FILE = ".codehealer_template.json"
+# Files that tools edit in place rather than replace (``.pth`` files that
+# setuptools and editable installs append to, installer metadata), so
+# hardlinking them would let a sandbox write through to the template.
+MUTABLE_SUFFIXES = (".pth",)
+MUTABLE_NAMES = frozenset({"RECORD", "INSTALLER", "REQUESTED", "direct_url.json"})
+
+
+class VenvTemplateCache:
+    """A content-addressed store of pristine virtual environments.
+
+    Each template is keyed by the interpreter that built it and the seed
+    packages installed into it.  Sandboxes are created by cloning a template
+    (hardlinking regular files, copying anything that embeds the template's
+    own path) instead of running ``ensurepip`` from scratch.  The store is
+    capped at ``max_size_bytes`` and evicts the least recently used
+    templates first.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES):
+        self.cache_dir = os.path.abspath(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_size_bytes = max_size_bytes
+
+    def key_for(self, seed_packages: Iterable[str] = ()) -> str:
+        """Returns the cache key for the running interpreter and ``seed_packages``."""
+        identity = {
+            "version": sys.version,
+            "executable": os.path.realpath(sys.executable),
+            "platform": sys.platform,
+            "seed_packages": sorted(set(seed_packages)),
+        }
+        payload = json.dumps(identity, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:32]
+
+    def template_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def clone_into(self, dest: str, seed_packages: Iterable[str] = ()) -> None:
+        """Materializes a venv at ``dest`` from the matching template, building it if needed."""
+        seed_packages = sorted(set(seed_packages))
+        key = self.key_for(seed_packages)
+        template = self.template_path(key)
+        metadata = self._read_metadata(template)
+        if metadata is None:
+            print(f"[venv-cache] Miss for {key}; building template...")
+            self._build(key, seed_packages)
+            metadata = self._read_metadata(template)
+            if metadata is None:
+                raise RuntimeError(f"Template {key} was not written to {template}")
+        else:
+            print(f"[venv-cache] Hit for {key}.")
+
+        clone_tree(template, dest, metadata["source_path"])
+        self._touch(template)
+        self.evict(keep=key)
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """Returns ``(key, last_used, size_bytes)`` for every complete template."""
+        results = []
+        if not os.path.isdir(self.cache_dir):
+            return results
+        for key in os.listdir(self.cache_dir):
+            # Staging directories of in-progress builds already hold metadata.
+            if key.startswith(".") or key.endswith(".tmp"):
+                continue
+            template = self.template_path(key)
+            metadata = self._read_metadata(template)
+            if metadata is None:
+                continue
+            last_used = os.path.getmtime(os.path.join(template, METADATA_FILE))
+            results.append((key, last_used, metadata.get("size_bytes", 0)))
+        return results
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Removes least recently used templates until the store fits the size cap."""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for key, _, size in entries:
+            if total <= self.max_size_bytes:
+                break
+            if key == keep:
+                continue
+            print(f"[venv-cache] Evicting template {key} ({size} bytes).")
+            shutil.rmtree(self.template_path(key), ignore_errors=True)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def _build(self, key: str, seed_packages: List[str]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Build under a unique name and rename into place so that concurrent
+        # builders never observe (or clone) a half-written template.
+        staging = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            venv.create(staging, with_pip=True)
+            if seed_packages:
+                pip_exe = os.path.join(staging, *_pip_relpath())
+                subprocess.run([pip_exe, "install", *seed_packages], check=True)
+            metadata = {
+                "source_path": staging,
+                "seed_packages": seed_packages,
+                "python": sys.version,
+                "size_bytes": _tree_size(staging),
+            }
+            with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump(metadata, f)
+            try:
+                os.rename(staging, self.template_path(key))
+            except OSError:
+                # Another process published the same template first.
+                if self._read_metadata(self.template_path(key)) is None:
+                    raise
+        except Exception as e:
+            raise RuntimeError(f"Failed to build venv template {key}: {e}")
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _read_metadata(self, template: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(template, METADATA_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, template: str) -> None:
+        now = time.time()
+        try:
+            os.utime(os.path.join(template, METADATA_FILE), (now, now))
+        except OSError:
+            pass
+
+
+def _pip_relpath() -> Tuple[str, str]:
+    if sys.platform == "win32":
+        return "Scripts", "pip.exe"
+    return "bin", "pip"
+
+
+def _tree_size(root: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                total += os.path.getsize(path)
+    return total
+
+
+# ``ioctl`` request asking the filesystem to share ``src``'s extents with
+# ``dest`` (a copy-on-write clone on btrfs, XFS and similar).
+_FICLONE = 0x40049409
+
+
+def copy_file(src: str, dest: str, *, follow_symlinks: bool = True) -> str:
+    """Copies ``src`` to ``dest``, as a copy-on-write clone where the filesystem supports it.
+
+    Falls back to ``shutil.copy2``; usable as ``shutil.copytree``'s
+    ``copy_function``.
+    """
+    if sys.platform.startswith("linux") and not os.path.islink(src):
+        try:
+            import fcntl
+
+            with open(src, "rb") as source, open(dest, "wb") as target:
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            shutil.copystat(src, dest)
+            return dest
+        except OSError:
+            pass
+    return shutil.copy2(src, dest, follow_symlinks=follow_symlinks)
+
+
+def clone_tree(src: str, dest: str, source_path: str) -> None:
+    """Clones ``src`` into ``dest``, rewriting references to ``source_path``.
+
+    Files that mention the path the template was built at (console-script
+    shebangs, activate scripts, ``pyvenv.cfg``) are copied with the path
+    replaced.  Files that are edited in place (see ``MUTABLE_NAMES``) are
+    copied.  Everything else is hardlinked, falling back to a copy when the
+    cache and the destination live on different filesystems; pip replaces
+    installed files rather than writing into them, so links stay intact.
+    """
+    old = os.fsencode(source_path)
+    new = os.fsencode(os.path.abspath(dest))
+    rewrite_dirs = {os.path.join(src, "bin"), os.path.join(src, "Scripts")}
+
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = os.path.relpath(dirpath, src)
+        target_dir = os.path.normpath(os.path.join(dest, rel))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in list(dirnames):
+            if os.path.islink(os.path.join(dirpath, name)):
+                dirnames.remove(name)
+                filenames.append(name)
+        for name in filenames:
+            if dirpath == src and name == METADATA_FILE:
+                continue
+            src_file = os.path.join(dirpath, name)
+            dest_file = os.path.join(target_dir, name)
+            if os.path.islink(src_file):
+                link = os.readlink(src_file)
+                if link.startswith(source_path):
+                    link = os.path.join(dest, os.path.relpath(link, source_path))
+                os.symlink(link, dest_file)
+                continue
+            if dirpath in rewrite_dirs or (dirpath == src and name == "pyvenv.cfg"):
+                with open(src_file, "rb") as f:
+                    data = f.read()
+                if old in data:
+                    with open(dest_file, "wb") as f:
+                        f.write(data.replace(old, new))
+                    shutil.copymode(src_file, dest_file)
+                    continue
+            if name in MUTABLE_NAMES or name.endswith(MUTABLE_SUFFIXES):
+                copy_file(src_file, dest_file)
+                continue
+            try:
+                os.link(src_file, dest_file)
+            except OSError:
+                copy_file(src_file, dest_file)
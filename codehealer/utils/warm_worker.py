@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from codehealer.utils.import_scanner import first_party_modules, is_stdlib_module, scan_imports
+from codehealer.utils.limits import RunLimits, RunUsage
+from codehealer.utils.preflight import installed_modules, site_packages_dirs
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_worker_server.py")
+# Must match ``warm_worker_server``, which cannot import this module.
+PID_MARKER = "\0codehealer-pid "
+EXIT_MARKER = "\0codehealer-exit "
+# Pre-importing heavy dependencies (numpy, torch) can take a while.
+DEFAULT_START_TIMEOUT_SECONDS = 120.0
+
+
+def is_supported() -> bool:
+    """The warm worker needs ``fork`` and Unix domain sockets."""
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX") and sys.platform != "win32"
+
+
+def can_run(args: List[str]) -> bool:
+    """Returns whether ``python *args`` can be served by the warm worker.
+
+    Only ``script.py ...``, ``-c code ...`` and ``-m module ...`` are;
+    interpreter options need a real interpreter start.
+    """
+    if not args:
+        return False
+    if args[0] in ("-c", "-m"):
+        return len(args) >= 2
+    return not args[0].startswith("-")
+
+
+def preload_modules(files: Dict[str, str], venv_path: str) -> List[str]:
+    """Returns the installed third-party top-level modules the repository imports.
+
+    First-party modules are never preloaded: they change between iterations
+    and every run has to import the current version.
+    """
+    installed = installed_modules(site_packages_dirs(venv_path))
+    first_party = first_party_modules(files)
+    return sorted(
+        module
+        for module in scan_imports(files)
+        if module in installed and module not in first_party and not is_stdlib_module(module)
+    )
+
+
+def environment_fingerprint(venv_path: str, requirements_path: Optional[str]) -> tuple:
+    """Identifies the installed dependencies; the worker is restarted when this changes.
+
+    Installs, uninstalls and snapshot restores all change the
+    ``site-packages`` directory; requirements.txt edits are included so a
+    pending change is never served by the old worker.
+    """
+    parts = []
+    for directory in site_packages_dirs(venv_path):
+        try:
+            parts.append((directory, os.stat(directory).st_mtime_ns))
+        except OSError:
+            parts.append((directory, None))
+    if requirements_path and os.path.exists(requirements_path):
+        stat = os.stat(requirements_path)
+        parts.append((requirements_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(parts)
+
+
+class WarmProcess:
+    """One run forked by the warm worker.
+
+    It offers the parts of :class:`subprocess.Popen` the Runner uses:
+    ``pid`` (the leader of the run's own process group), ``stdout``,
+    ``returncode``, and ``wait_with_usage`` in place of reaping, since the
+    run is the worker's child rather than ours.
+    """
+
+    def __init__(self, conn: socket.socket):
+        self._conn = conn
+        self._reader = conn.makefile("r", encoding="utf-8", errors="replace")
+        header = self._reader.readline()
+        if not header.startswith(PID_MARKER):
+            conn.close()
+            raise OSError("The warm worker did not start the run.")
+        self.pid = int(header[len(PID_MARKER):])
+        self.returncode: Optional[int] = None
+        self._usage: Optional[RunUsage] = None
+        self._done = threading.Event()
+        self.stdout = self._lines()
+
+    def _lines(self):
+        try:
+            for line in self._reader:
+                marker = line.find(EXIT_MARKER)
+                if marker == -1:
+                    yield line
+                    continue
+                if marker:
+                    yield line[:marker]
+                trailer = json.loads(line[marker + len(EXIT_MARKER):])
+                self._usage = RunUsage(0.0, trailer["cpu_seconds"], trailer["max_rss_bytes"])
+                self.returncode = trailer["exit_code"]
+                break
+        finally:
+            if self.returncode is None:
+                # The worker died mid-run.
+                self.returncode = -1
+            self._reader.close()
+            self._conn.close()
+            self._done.set()
+
+    def wait_with_usage(self, timeout: Optional[float]) -> Optional[RunUsage]:
+        """Waits for the trailer, which the thread reading ``stdout`` parses."""
+        started = time.monotonic()
+        if not self._done.wait(timeout):
+            return None
+        usage = self._usage or RunUsage(0.0)
+        usage.wall_seconds = time.monotonic() - started
+        return usage
+
+
+class WarmWorker:
+    """A long-lived sandbox interpreter that forks a fresh child for every run.
+
+    Third-party modules in ``preload`` are imported once when the worker
+    starts, so runs skip interpreter startup and those imports.  The worker
+    only stays valid while ``fingerprint`` (see
+    :func:`environment_fingerprint`) does.
+    """
+
+    def __init__(
+        self,
+        python_exe: str,
+        repo_path: str,
+        preload: List[str],
+        fingerprint: tuple = (),
+        start_timeout: float = DEFAULT_START_TIMEOUT_SECONDS,
+    ):
+        self.python_exe = python_exe
+        self.repo_path = repo_path
+        self.preload = preload
+        self.fingerprint = fingerprint
+        self.start_timeout = start_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self._socket_dir: Optional[str] = None
+        self.socket_path: Optional[str] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> bool:
+        """Starts the worker and waits until its preloads are done; returns ``False`` on failure."""
+        # Socket paths are limited to ~100 bytes, so use a short temp dir.
+        self._socket_dir = tempfile.mkdtemp(prefix="chw-")
+        self.socket_path = os.path.join(self._socket_dir, "s")
+        try:
+            self.process = subprocess.Popen(
+                [self.python_exe, SERVER_SCRIPT, self.socket_path, *self.preload],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            print(f"[warm-worker] Could not start: {e}")
+            self.stop()
+            return False
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                print(f"[warm-worker] Exited during startup with code {self.process.returncode}.")
+                self.stop()
+                return False
+            # The server renames the socket into place only once it listens.
+            if os.path.exists(self.socket_path):
+                return True
+            time.sleep(0.02)
+        print(f"[warm-worker] Not ready after {self.start_timeout:g}s.")
+        self.stop()
+        return False
+
+    def spawn(self, args: List[str], cwd: str, limits: RunLimits) -> WarmProcess:
+        """Asks the worker to fork a run of ``python *args`` in ``cwd``; raises ``OSError`` if it cannot."""
+        if not self.alive:
+            raise OSError("The warm worker is not running.")
+        request = {
+            "argv": list(args),
+            "cwd": cwd,
+            "cpu_seconds": limits.cpu_seconds,
+            "memory_bytes": limits.memory_bytes,
+        }
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.settimeout(10)
+            conn.connect(self.socket_path)
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            process = WarmProcess(conn)
+        except OSError:
+            conn.close()
+            raise
+        conn.settimeout(None)
+        return process
+
+    def stop(self) -> None:
+        """Stops the worker; runs it already forked are left to their callers."""
+        if self.process is not None:
+            try:
+                # Closing stdin lets the worker exit on its own.
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
@@ -0,0 +1,185 @@
+"""A fork server that runs inside the sandbox interpreter.
+
+It is started as a script by :class:`codehealer.utils.warm_worker.WarmWorker`
+and must only use the standard library: the sandbox cannot import
+``codehealer``.  Usage::
+
+    python warm_worker_server.py SOCKET_PATH MODULE [MODULE ...]
+
+The listed (third-party) modules are imported once; the server then binds
+``SOCKET_PATH`` and serves one run per connection until its stdin is
+closed (i.e. when the process that started it exits).  A request is a
+JSON line ``{"argv": [...], "cwd": ..., "cpu_seconds": ..., "memory_bytes": ...}``
+where ``argv`` is ``[script, *args]``, ``["-c", code, *args]`` or
+``["-m", module, *args]``.  The server forks; the child becomes a session
+leader, applies the limits, writes its stdout and stderr to the connection
+and runs the code as ``__main__``.  The connection carries a
+``PID_MARKER`` line before the child's output and an ``EXIT_MARKER``
+record (exit code and resource usage) after the child and its group are
+gone; the record may follow a final output line that has no newline.
+"""
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import traceback
+
+PID_MARKER = "\0codehealer-pid "
+EXIT_MARKER = "\0codehealer-exit "
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _user_traceback(exc: BaseException):
+    # Hide this server's and runpy's frames so tracebacks look like a normal run.
+    tb = exc.__traceback__
+    hidden = (_THIS_FILE, getattr(sys.modules.get("runpy"), "__file__", None), "<frozen runpy>")
+    while tb is not None and tb.tb_frame.f_code.co_filename in hidden:
+        tb = tb.tb_next
+    return tb
+
+
+def _run_child(request: dict) -> int:
+    import runpy
+
+    argv = request["argv"]
+    os.chdir(request["cwd"])
+    try:
+        if argv[0] == "-c":
+            sys.argv = ["-c", *argv[2:]]
+            sys.path[0] = ""
+            code = compile(argv[1], "<string>", "exec")
+            exec(code, {"__name__": "__main__", "__builtins__": __builtins__})
+        elif argv[0] == "-m":
+            sys.argv = [argv[1], *argv[2:]]
+            sys.path[0] = os.getcwd()
+            runpy.run_module(argv[1], run_name="__main__", alter_sys=True)
+        else:
+            script = os.path.abspath(argv[0])
+            sys.argv = list(argv)
+            sys.path[0] = os.path.dirname(script)
+            runpy.run_path(script, run_name="__main__")
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        traceback.print_exception(type(e), e, _user_traceback(e))
+        return 1
+
+
+def _child(server: socket.socket, conn: socket.socket, go_read: int, request: dict) -> None:
+    code = 1
+    try:
+        server.close()
+        os.setsid()
+        try:
+            import resource
+
+            if request.get("cpu_seconds") is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, (request["cpu_seconds"], request["cpu_seconds"]))
+            if request.get("memory_bytes") is not None:
+                resource.setrlimit(resource.RLIMIT_AS, (request["memory_bytes"], request["memory_bytes"]))
+        except (ImportError, OSError, ValueError):
+            pass
+        # Wait until the parent has announced our pid on the connection.
+        os.read(go_read, 1)
+        os.close(go_read)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        conn.close()
+        code = _run_child(request)
+        try:
+            import atexit
+
+            atexit._run_exitfuncs()
+        except Exception:
+            pass
+        try:
+            import threading
+
+            threading._shutdown()
+        except Exception:
+            pass
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code & 0xFF if code >= 0 else 1)
+
+
+def _serve_one(server: socket.socket, conn: socket.socket) -> None:
+    with conn, conn.makefile("r", encoding="utf-8") as reader:
+        line = reader.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        go_read, go_write = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(go_write)
+            _child(server, conn, go_read, request)
+        os.close(go_read)
+        conn.sendall(f"{PID_MARKER}{pid}\n".encode("utf-8"))
+        os.write(go_write, b"x")
+        os.close(go_write)
+        _, status, usage = os.wait4(pid, 0)
+        try:
+            # Nothing the run started may keep writing to the connection.
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        scale = 1 if sys.platform == "darwin" else 1024
+        trailer = {
+            "exit_code": os.waitstatus_to_exitcode(status),
+            "cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "max_rss_bytes": usage.ru_maxrss * scale,
+        }
+        conn.sendall(f"{EXIT_MARKER}{json.dumps(trailer)}\n".encode("utf-8"))
+
+
+def main() -> None:
+    socket_path, modules = sys.argv[1], sys.argv[2:]
+    # Run like ``python script.py``: the server's own directory must not shadow anything.
+    if sys.path and os.path.abspath(sys.path[0] or ".") == os.path.dirname(_THIS_FILE):
+        sys.path.pop(0)
+    sys.path.insert(0, "")
+    for module in modules:
+        try:
+            __import__(module)
+        except BaseException:
+            pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # The client treats ``socket_path`` existing as "ready", and ``bind``
+    # creates the file before ``listen`` accepts connections: bind under a
+    # temporary name and move it into place once it is listening.
+    staging_path = socket_path + ".tmp"
+    server.bind(staging_path)
+    server.listen(1)
+    os.rename(staging_path, socket_path)
+    while True:
+        readable, _, _ = select.select([server, sys.stdin], [], [])
+        if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1):
+            break
+        if server in readable:
+            conn, _ = server.accept()
+            try:
+                _serve_one(server, conn)
+            except Exception:
+                traceback.print_exc()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
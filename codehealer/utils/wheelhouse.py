@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+DEFAULT_WHEELHOUSE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codehealer", "wheelhouse")
+
+
+class Wheelhouse:
+    """A persistent directory of built wheels shared across attempts and repositories.
+
+    The wheelhouse only builds the pip arguments; :class:`codehealer.utils.runner.Runner`
+    decides when to install offline from it and when to populate it.  ``hits``
+    counts installs satisfied entirely from local wheels, ``misses`` counts
+    installs that had to reach the package index.
+
+    Several processes may share one wheelhouse: wheels are built in a
+    private staging directory and moved in with an atomic rename, so an
+    offline install never sees a partly written wheel.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.abspath(path or DEFAULT_WHEELHOUSE_DIR)
+        os.makedirs(self.path, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def wheel_count(self) -> int:
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".whl"))
+
+    def offline_install_args(self) -> List[str]:
+        """Arguments that restrict ``pip install`` to the wheelhouse."""
+        return ["--no-index", "--find-links", self.path]
+
+    def populate_args(self, wheel_dir: str) -> List[str]:
+        """Arguments that make ``pip wheel`` store wheels in ``wheel_dir``, reusing the wheelhouse's."""
+        return ["--wheel-dir", wheel_dir, "--find-links", self.path]
+
+    @contextmanager
+    def staging(self) -> Iterator[str]:
+        """A private directory inside the wheelhouse for one ``pip wheel`` run; removed afterwards.
+
+        pip copies finished wheels into ``--wheel-dir`` without renaming
+        them into place, so it must not write to the shared directory.
+        """
+        path = tempfile.mkdtemp(prefix=".staging-", dir=self.path)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def publish(self, staging_dir: str) -> int:
+        """Moves the wheels built in ``staging_dir`` into the wheelhouse; returns how many."""
+        count = 0
+        for name in os.listdir(staging_dir):
+            if name.endswith(".whl"):
+                os.replace(os.path.join(staging_dir, name), os.path.join(self.path, name))
+                count += 1
+        return count
+
+    def online_install_args(self) -> List[str]:
+        """Arguments that prefer the wheelhouse but may still fall back to the index."""
+        return ["--find-links", self.path]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "wheels": self.wheel_count()}
@@ -0,0 +1,58 @@
+# run_batch.py
+import argparse
+import functools
+import os
+import sys
+from codehealer.cli import add_healer_arguments, build_healer
+from codehealer.core.batch import discover_repos, run_batch
+
+def main():
+    """
+    Heals many repositories concurrently, one Healer per worker process.
+    Each repository's output, command logs and trace are written under
+    --output-dir, together with a per-repository results summary.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        print("[batch] ❌ Error: OPENAI_API_KEY environment variable is not set.")
+        return 1
+
+    parser = argparse.ArgumentParser(
+        description="Run the CodeHealer agent over a directory or manifest of Python repositories."
+    )
+    parser.add_argument(
+        "--repos",
+        required=True,
+        help="A directory whose subdirectories are the repositories, or a manifest (.json list or one path per line).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Number of repositories healed at the same time (default: up to 4).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="batch-results",
+        help="Directory for results.jsonl, summary.json and per-repository logs (default: batch-results).",
+    )
+    add_healer_arguments(parser)
+    args = parser.parse_args()
+
+    repos = discover_repos(args.repos)
+    if not repos:
+        print(f"[batch] No repositories found in {args.repos}.")
+        return 1
+    # The rate limits apply to the batch as a whole; run_batch shares one limiter between the workers.
+    results = run_batch(
+        repos,
+        functools.partial(build_healer, args),
+        args.output_dir,
+        max_workers=max(1, args.workers),
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        resume=args.resume,
+    )
+    return 0 if all(result.status == "healed" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,7 @@
 import argparse
 import sys
 import os
-from codehealer.core.healer import Healer
+from codehealer.cli import add_healer_arguments, build_healer, configure_rate_limiter
 
 def main():
     """
@@ -24,6 +24,7 @@ def main():
         required=True, 
         help="The path to the repository to be healed (mounted inside the container)."
     )
+    add_healer_arguments(parser)
     args = parser.parse_args()
 
     print("=============================================")
@@ -40,8 +41,9 @@ def main():
         #    like NameError, ImportError, etc., if they occur.
         # This approach is agentic as it follows a stateful, tool-using loop
         # similar to what would be designed with a framework like LangGraph.
-        healer = Healer(repo_path=args.workdir)
-        healer.heal()
+        configure_rate_limiter(args)
+        healer = build_healer(args, args.workdir)
+        healer.heal(resume=args.resume)
         
         print("\n[container] ✅ Healing process completed successfully.")
         return 0
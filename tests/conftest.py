@@ -34,7 +34,7 @@ class DummyChat:
 
 
 class DummyOpenAI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, **kwargs):
         self.api_key = api_key
         self.response_content = ""
         self.raise_error: Optional[Exception] = None
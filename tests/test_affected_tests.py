@@ -0,0 +1,60 @@
+import sqlite3
+
+from codehealer.utils.affected_tests import TestSelector, is_test_file, load_coverage_map
+
+FILES = {
+    "app/__init__.py": "x = 1\n",
+    "app/core.py": "def run():\n    return 1\n",
+    "app/api.py": "from app.core import run\n",
+    "app/cli.py": "import sys\n",
+    "tests/conftest.py": "import pytest\n",
+    "tests/test_core.py": "from app.core import run\n",
+    "tests/test_api.py": "from app import api\n",
+    "tests/test_cli.py": "from app import cli\n",
+}
+
+
+def test_is_test_file_uses_pytest_patterns():
+    assert is_test_file("tests/test_core.py")
+    assert is_test_file("core_test.py")
+    assert not is_test_file("tests/conftest.py")
+    assert not is_test_file("app/testing.py")
+
+
+def test_select_follows_importers_transitively():
+    selector = TestSelector(FILES)
+    assert selector.select(["app/core.py"]) == ["tests/test_api.py", "tests/test_core.py"]
+    assert selector.select(["app/cli.py"]) == ["tests/test_cli.py"]
+    assert selector.select(["tests/test_cli.py"]) == ["tests/test_cli.py"]
+
+
+def test_select_falls_back_to_full_suite_when_unbounded():
+    selector = TestSelector(FILES)
+    assert selector.select(["setup.cfg"]) is None
+    assert selector.select(["app/deleted.py"]) is None
+    assert selector.select(["tests/conftest.py"]) == ["tests"]
+
+
+def test_select_adds_tests_from_coverage_map():
+    selector = TestSelector(FILES, {"tests/test_cli.py": {"app/core.py"}, "tests/test_gone.py": {"app/core.py"}})
+    assert selector.select(["app/core.py"]) == ["tests/test_api.py", "tests/test_cli.py", "tests/test_core.py"]
+
+
+def test_load_coverage_map_reads_per_test_contexts(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    data = tmp_path / ".coverage"
+    conn = sqlite3.connect(data)
+    conn.executescript(
+        "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+        "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+        "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);"
+    )
+    conn.executemany("INSERT INTO file VALUES (?, ?)", [(1, str(repo / "app" / "core.py")), (2, "/usr/lib/os.py")])
+    conn.executemany("INSERT INTO context VALUES (?, ?)", [(1, ""), (2, "tests/test_cli.py::test_main|run")])
+    conn.executemany("INSERT INTO line_bits VALUES (?, ?, x'01')", [(1, 1), (1, 2), (2, 2)])
+    conn.commit()
+    conn.close()
+
+    assert load_coverage_map(str(data), str(repo)) == {"tests/test_cli.py": {"app/core.py"}}
+    assert load_coverage_map(str(tmp_path / "missing"), str(repo)) == {}
@@ -1,3 +1,5 @@
+import types
+
 import pytest
 
 from codehealer.agents.base_agent import BaseAgent
@@ -20,3 +22,182 @@ def test_query_llm_handles_errors():
     agent = BaseAgent(repo_path="/tmp", system_prompt="system")
     agent.client.raise_error = RuntimeError("boom")
     assert agent._query_llm("user prompt") == ""
+
+
+def test_query_llm_uses_response_cache(tmp_path):
+    from codehealer.utils.llm_cache import LLMResponseCache
+
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.response_cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    agent.client.response_content = "from api"
+    assert agent._query_llm("user prompt") == "from api"
+
+    agent.client.raise_error = RuntimeError("should not be called")
+    assert agent._query_llm("user prompt") == "from api"
+
+
+
+def test_query_llm_records_trace_span(tmp_path):
+    from codehealer.utils import tracing
+    from codehealer.utils.llm_cache import LLMResponseCache
+
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.response_cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    agent.client.response_content = "from api"
+    tracer = tracing.Tracer()
+    tracing.activate(tracer)
+    try:
+        agent._query_llm("user prompt")
+        agent._query_llm("user prompt")
+    finally:
+        tracing.activate(None)
+
+    assert [(span.category, span.name) for span in tracer.spans] == [("llm", "BaseAgent")] * 2
+    assert [span.fields["cache_hit"] for span in tracer.spans] == [False, True]
+    assert tracer.spans[0].fields["bytes_written"] == len("user prompt")
+    assert tracer.spans[0].fields["bytes_read"] == len("from api")
+
+def test_query_llm_replay_miss_skips_api(tmp_path):
+    from codehealer.utils.llm_cache import LLMResponseCache
+
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.response_cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), mode="replay")
+    agent.client.response_content = "from api"
+    assert agent._query_llm("user prompt") == ""
+    assert agent.client.chat.completions.last_kwargs is None
+
+
+class _FakeStream:
+    def __init__(self, deltas):
+        self.chunks = [
+            types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=d))], usage=None)
+            for d in deltas
+        ]
+        self.chunks.append(
+            types.SimpleNamespace(choices=[], usage=types.SimpleNamespace(prompt_tokens=7, completion_tokens=3))
+        )
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class _FakeAsyncCompletions:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.last_kwargs = None
+
+    async def create(self, **kwargs):
+        self.last_kwargs = kwargs
+        return _FakeStream(self.deltas)
+
+
+def _fake_async_client(deltas):
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=_FakeAsyncCompletions(deltas)))
+
+
+def test_streaming_query_passes_deltas_and_records_metrics():
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.stream = True
+    agent.async_client = _fake_async_client(["hel", "", "lo"])
+    seen = []
+
+    assert agent._query_llm("user prompt", on_text=seen.append) == "hello"
+    assert seen == ["hel", "lo"]
+    assert agent.async_client.chat.completions.last_kwargs["stream"] is True
+    assert agent.last_usage.completion_tokens == 3
+    assert agent.last_metrics.streamed
+    assert agent.last_metrics.ttft_seconds is not None
+    assert agent.last_metrics.ttft_seconds <= agent.last_metrics.total_seconds
+
+
+def test_streaming_inside_running_event_loop_uses_sync_client():
+    import asyncio
+
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.stream = True
+    agent.async_client = _fake_async_client(["not", "used"])
+    agent.client.response_content = "from sync"
+    seen = []
+
+    async def in_notebook():
+        return agent._query_llm("user prompt", on_text=seen.append)
+
+    assert asyncio.run(in_notebook()) == "from sync"
+    assert seen == ["from sync"]
+    assert not agent.last_metrics.streamed
+
+
+def test_non_streaming_query_reports_whole_response_once():
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    agent.client.response_content = "hello"
+    seen = []
+    assert agent._query_llm("user prompt", on_text=seen.append) == "hello"
+    assert seen == ["hello"]
+    assert agent.last_metrics.ttft_seconds is None
+
+
+def test_query_llm_retries_transient_errors(monkeypatch):
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    monkeypatch.setattr("codehealer.agents.base_agent.time.sleep", lambda seconds: None)
+    error = type("RateLimitError", (Exception,), {"status_code": 429})("slow down")
+    completions = agent.client.chat.completions
+    original_create = completions.create
+    calls = []
+
+    def flaky_create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) < 3:
+            raise error
+        return original_create(**kwargs)
+
+    completions.create = flaky_create
+    agent.client.response_content = "eventually"
+    assert agent._query_llm("user prompt") == "eventually"
+    assert len(calls) == 3
+
+
+def test_query_llm_acquires_shared_rate_limiter(monkeypatch):
+    from codehealer.utils.rate_limiter import RateLimiter
+
+    limiter = RateLimiter(requests_per_minute=60)
+    reserved = []
+    monkeypatch.setattr(limiter, "acquire", reserved.append)
+    monkeypatch.setattr(BaseAgent, "rate_limiter", limiter)
+    first = BaseAgent(repo_path="/tmp", system_prompt="system")
+    second = BaseAgent(repo_path="/tmp", system_prompt="system")
+    first._query_llm("a")
+    second._query_llm("b")
+    assert len(reserved) == 2
+
+
+def test_concurrent_calls_trace_their_own_usage():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from codehealer.utils import tracing
+
+    agent = BaseAgent(repo_path="/tmp", system_prompt="system")
+    both_started = threading.Barrier(2)
+
+    def create(**kwargs):
+        tokens = len(kwargs["messages"][1]["content"])
+        both_started.wait(timeout=5)
+        message = types.SimpleNamespace(content="x" * tokens)
+        usage = types.SimpleNamespace(prompt_tokens=tokens, completion_tokens=tokens)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+    agent.client.chat.completions.create = create
+    tracer = tracing.Tracer()
+    tracing.activate(tracer)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(tracing.bind(agent._query_llm), ["a", "bbbbbbbb"]))
+    finally:
+        tracing.activate(None)
+
+    assert sorted(span.fields["tokens_in"] for span in tracer.spans) == [1, 8]
+    assert all(span.fields["tokens_out"] == span.fields["tokens_in"] for span in tracer.spans)
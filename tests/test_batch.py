@@ -0,0 +1,79 @@
+import json
+import os
+
+from codehealer.agents.base_agent import BaseAgent
+from codehealer.core.batch import discover_repos, format_results, run_batch
+from codehealer.utils.tracing import Tracer
+
+
+class FakeHealer:
+    """Heals repositories whose ``main.py`` says ``ok``; records one LLM call."""
+
+    def __init__(self, repo_path, **overrides):
+        self.repo_path = repo_path
+        self.trace_path = overrides["trace_path"]
+        self.tracer = None
+        self.final_state = None
+
+    def heal(self, resume=False):
+        with open(os.path.join(self.repo_path, "main.py"), encoding="utf-8") as f:
+            source = f.read()
+        if "crash" in source:
+            raise RuntimeError("sandbox exploded")
+        print(f"healing {self.repo_path}")
+        # Goes through the shared limiter when the batch has one.
+        if BaseAgent.rate_limiter is not None:
+            assert BaseAgent.rate_limiter.reserve(100) == 0
+        self.tracer = Tracer()
+        with self.tracer.span("gpt", "llm", tokens_in=100, tokens_out=20):
+            pass
+        healed = "'ok'" in source
+        self.final_state = {"iteration": 1 if healed else 3, "is_success": healed}
+        return healed
+
+
+def make_repo(root, name, source):
+    repo = root / name
+    repo.mkdir()
+    (repo / "main.py").write_text(source, encoding="utf-8")
+    return str(repo)
+
+
+def test_discover_repos_from_directory(tmp_path):
+    make_repo(tmp_path, "b", "")
+    make_repo(tmp_path, "a", "")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / "notes.txt").write_text("", encoding="utf-8")
+    assert discover_repos(str(tmp_path)) == [str(tmp_path / "a"), str(tmp_path / "b")]
+
+
+def test_discover_repos_from_manifests(tmp_path):
+    (tmp_path / "repos.txt").write_text("# fleet\nsvc/one\n\n/abs/two  # pinned\n", encoding="utf-8")
+    assert discover_repos(str(tmp_path / "repos.txt")) == [str(tmp_path / "svc" / "one"), "/abs/two"]
+    (tmp_path / "repos.json").write_text(json.dumps(["one", {"path": "two"}]), encoding="utf-8")
+    assert discover_repos(str(tmp_path / "repos.json")) == [str(tmp_path / "one"), str(tmp_path / "two")]
+
+
+def test_run_batch_writes_per_repo_results(tmp_path):
+    repos = [
+        make_repo(tmp_path, "good", "print('ok')\n"),
+        make_repo(tmp_path, "bad", "print('broken')\n"),
+        make_repo(tmp_path, "worse", "crash\n"),
+    ]
+    output = tmp_path / "out"
+    results = run_batch(repos, FakeHealer, str(output), max_workers=2, requests_per_minute=600)
+
+    assert [result.status for result in results] == ["healed", "failed", "error"]
+    good, bad, worse = results
+    assert (good.iterations, good.tokens_in, good.tokens_out, good.llm_calls) == (1, 100, 20, 1)
+    assert bad.iterations == 3
+    assert "RuntimeError: sandbox exploded" in worse.error
+    assert "healing" in (output / "good" / "heal.log").read_text(encoding="utf-8")
+    assert "sandbox exploded" in (output / "worse" / "heal.log").read_text(encoding="utf-8")
+
+    lines = (output / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    assert sorted(json.loads(line)["repo"] for line in lines) == sorted(repos)
+    summary = json.loads((output / "summary.json").read_text(encoding="utf-8"))
+    assert (summary["healed"], summary["failed"], summary["error"]) == (1, 1, 1)
+    assert summary["tokens_in"] == 200
+    assert "good" in format_results(results)
@@ -0,0 +1,49 @@
+import sys
+import time
+
+import pytest
+
+from codehealer.core.candidates import CandidateEvaluator
+from codehealer.utils.sandbox import SandboxManager
+
+
+@pytest.fixture
+def sandbox(temp_repo, monkeypatch):
+    (temp_repo / "main.py").write_text("raise SystemExit(1)\n", encoding="utf-8")
+    monkeypatch.setattr(SandboxManager, "get_python_executable", lambda self: sys.executable)
+    return SandboxManager(str(temp_repo))
+
+
+def _fix(repo, content):
+    return [(str(repo / "main.py"), content)]
+
+
+def test_first_passing_candidate_wins_and_stops_the_rest(sandbox, temp_repo):
+    evaluator = CandidateEvaluator(sandbox, count=3)
+    candidates = [
+        _fix(temp_repo, "import time\ntime.sleep(30)\n"),
+        _fix(temp_repo, "print('fixed')\n"),
+        _fix(temp_repo, "raise SystemExit(2)\n"),
+    ]
+    started = time.monotonic()
+    winner, results = evaluator.evaluate("main.py", candidates)
+
+    assert time.monotonic() - started < 20
+    assert winner is not None and winner.index == 1
+    assert "fixed" in winner.log
+    assert (temp_repo / "main.py").read_text(encoding="utf-8") == "raise SystemExit(1)\n"
+    assert [r.index for r in results] == sorted(r.index for r in results)
+
+
+def test_no_winner_returns_every_result(sandbox, temp_repo):
+    evaluator = CandidateEvaluator(sandbox, count=2)
+    candidates = [_fix(temp_repo, "raise SystemExit(3)\n"), _fix(temp_repo, "raise SystemExit(4)\n")]
+    winner, results = evaluator.evaluate("main.py", candidates)
+
+    assert winner is None
+    assert [(r.index, r.exit_code) for r in results] == [(0, 3), (1, 4)]
+
+
+def test_rejects_invalid_count(sandbox):
+    with pytest.raises(ValueError):
+        CandidateEvaluator(sandbox, count=0)
@@ -0,0 +1,82 @@
+import os
+from types import SimpleNamespace
+
+from codehealer.core.checkpoint import CheckpointStore
+from codehealer.core.graph import build_graph
+from codehealer.core.healer import Healer
+
+
+def test_store_returns_latest_checkpoint_per_run(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    store = CheckpointStore(path, "repo-a")
+    other = CheckpointStore(path, "repo-b")
+    assert store.latest() is None
+
+    store.save("heal_environment", {"iteration": 1})
+    store.save("heal_runtime", {"iteration": 2, "attempt_history": ["fix"]})
+    other.save("setup_sandbox", {"iteration": 0})
+
+    latest = store.latest()
+    assert latest.node == "heal_runtime"
+    assert latest.state == {"iteration": 2, "attempt_history": ["fix"]}
+    assert CheckpointStore(path, "repo-a").latest().node == "heal_runtime"
+
+    store.clear()
+    assert store.latest() is None
+    assert other.latest().node == "setup_sandbox"
+
+
+def test_graph_starts_at_resume_node_and_checkpoints_nodes(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"), "repo")
+    state = {
+        "runner": SimpleNamespace(installed_requirements={"requests": "requests"}),
+        "iteration": 7,
+        "max_iterations": 10,
+        "log": "",
+        "is_success": True,
+        "phase": "runtime",
+        "attempt_history": [],
+        "preflight_pending": False,
+        "checkpoints": store,
+        "resume_node": "finish",
+    }
+
+    build_graph().invoke(state)
+
+    latest = store.latest()
+    assert latest.node == "finish"
+    assert latest.state["iteration"] == 7
+    assert latest.state["installed_requirements"] == {"requests": "requests"}
+
+
+def test_resume_recreates_missing_venv_and_reinstalls(tmp_path, monkeypatch):
+    healer = Healer(str(tmp_path), checkpoints=True)
+    calls = []
+    monkeypatch.setattr(healer.sandbox, "create", lambda: calls.append("create"))
+    monkeypatch.setattr(healer.sandbox, "snapshot", lambda name="last-good": calls.append("snapshot"))
+    healer.checkpoints.save(
+        "heal_runtime",
+        {"iteration": 12, "phase": "runtime", "attempt_history": ["fix"], "installed_requirements": {"a": "a"}},
+    )
+    state = {"iteration": 0, "phase": "setup", "attempt_history": [], "resume_node": None}
+
+    healer._resume(state)
+
+    assert calls == ["create", "snapshot"]
+    assert state["resume_node"] == "heal_environment"
+    assert state["iteration"] == 12 and state["phase"] == "environment"
+    assert healer.runner.installed_requirements == {}
+
+
+def test_resume_reattaches_existing_venv(tmp_path):
+    healer = Healer(str(tmp_path), checkpoints=True)
+    python_exe = healer.sandbox.get_python_executable()
+    os.makedirs(os.path.dirname(python_exe))
+    open(python_exe, "w").close()
+    healer.checkpoints.save("heal_runtime", {"iteration": 3, "phase": "runtime", "installed_requirements": {"a": "a"}})
+    state = {"iteration": 0, "phase": "setup", "resume_node": None}
+
+    healer._resume(state)
+
+    assert state["resume_node"] == "heal_runtime" and state["iteration"] == 3
+    assert healer.runner.installed_requirements == {"a": "a"}
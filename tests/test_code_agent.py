@@ -2,7 +2,7 @@ import os
 
 import pytest
 
-from codehealer.agents.code_agent import CodeAgent
+from codehealer.agents.code_agent import CodeAgent, _ResponseParser
 
 
 def test_code_agent_parses_valid_response(tmp_path):
@@ -29,3 +29,102 @@ def test_parse_response_rejects_outside_repo(tmp_path, capsys):
     assert agent._parse_response(response) is None
     captured = capsys.readouterr()
     assert "outside the repository" in captured.out
+
+
+def test_code_agent_prompt_respects_token_budget(tmp_path):
+    (tmp_path / "main.py").write_text("import helper\nhelper.run()\n", encoding="utf-8")
+    (tmp_path / "helper.py").write_text("def run():\n    return 1\n", encoding="utf-8")
+    (tmp_path / "big.py").write_text("x = 1\n" * 5000, encoding="utf-8")
+    agent = CodeAgent(str(tmp_path), prompt_token_budget=2000)
+    agent.client.response_content = "unexpected"
+    traceback_log = f'File "{tmp_path}/main.py", line 2, in <module>\nNameError'
+
+    agent.get_suggestion(traceback_log, ["print('old attempt')"] * 3)
+
+    user_prompt = agent.client.chat.completions.last_kwargs["messages"][1]["content"]
+    assert "--- FILE: main.py ---" in user_prompt
+    assert "--- FILE: big.py ---" not in user_prompt
+    assert agent.last_packed_prompt.total_tokens <= 2000
+
+
+def test_parse_response_applies_edit_blocks(tmp_path):
+    (tmp_path / "mod.py").write_text("a = 1\nb = 2\n", encoding="utf-8")
+    agent = CodeAgent(str(tmp_path), patch_mode=True)
+    response = (
+        "EDIT: mod.py\n```python\n<<<<<<< SEARCH\nb = 2\n=======\nb = 3\n>>>>>>> REPLACE\n```\n---\n"
+        "EDIT: mod.py\n```python\n<<<<<<< SEARCH\nmissing = 0\n=======\nx = 1\n>>>>>>> REPLACE\n```\n---\n"
+        "FILEPATH: new.py\n```python\nprint('new')\n```"
+    )
+    fixes = agent._parse_response(response)
+    assert fixes == [
+        (os.path.join(str(tmp_path), "mod.py"), "a = 1\nb = 3\n"),
+        (os.path.join(str(tmp_path), "new.py"), "print('new')"),
+    ]
+    assert len(agent.last_rejections) == 1
+    assert (tmp_path / "mod.py").read_text(encoding="utf-8") == "a = 1\nb = 2\n"
+
+
+def test_parse_response_combines_edits_to_the_same_file(tmp_path):
+    (tmp_path / "mod.py").write_text("a = 1\nb = 2\nc = 3\n", encoding="utf-8")
+    agent = CodeAgent(str(tmp_path), patch_mode=True)
+    response = (
+        "EDIT: mod.py\n```python\n<<<<<<< SEARCH\na = 1\n=======\na = 10\n>>>>>>> REPLACE\n```\n---\n"
+        "FILEPATH: new.py\n```python\nprint('new')\n```\n---\n"
+        "EDIT: mod.py\n```python\n<<<<<<< SEARCH\nc = 3\n=======\nc = 30\n>>>>>>> REPLACE\n```"
+    )
+    fixes = agent._parse_response(response)
+    assert fixes == [
+        (os.path.join(str(tmp_path), "mod.py"), "a = 10\nb = 2\nc = 30\n"),
+        (os.path.join(str(tmp_path), "new.py"), "print('new')"),
+    ]
+    assert agent.last_rejections == []
+
+
+def test_streamed_blocks_match_whole_response(tmp_path):
+    (tmp_path / "mod.py").write_text("a = 1\nb = 2\n", encoding="utf-8")
+    agent = CodeAgent(str(tmp_path), patch_mode=True)
+    response = (
+        "FILEPATH: one.py\n```python\nprint(1)\n```\n---\n"
+        "EDIT: mod.py\n```python\n<<<<<<< SEARCH\nb = 2\n=======\nb = 3\n>>>>>>> REPLACE\n```\n---\n"
+        "FILEPATH: two.py\n```python\nprint(2)\n```"
+    )
+    expected = agent._parse_response(response)
+
+    streamed = []
+    parser = _ResponseParser(lambda kind, path, block: streamed.append(agent._parse_block(kind, path, block)))
+    for i in range(0, len(response), 3):
+        parser.feed(response[i:i + 3])
+        if i < response.index("EDIT:"):
+            assert len(streamed) <= 1
+    assert len(streamed) == 3  # the last fence closed, so no close() needed
+    parser.close()
+    assert streamed == expected
+
+
+def test_streaming_get_suggestion_discards_failed_stream(tmp_path):
+    agent = CodeAgent(str(tmp_path))
+    agent.stream = True
+
+    async def failing_stream(user_prompt, on_text=None, call=None):
+        on_text("FILEPATH: a.py\n```python\nprint(1)\n```\n")
+        return ""
+
+    agent._aquery_llm = failing_stream
+    assert agent.get_suggestion("Traceback") is None
+
+
+def test_get_suggestions_requests_diverse_candidates(tmp_path):
+    agent = CodeAgent(str(tmp_path))
+    prompts = []
+
+    def fake_query(user_prompt, on_text=None):
+        prompts.append(user_prompt)
+        response = f"FILEPATH: main.py\n```python\nprint({len(prompts)})\n```"
+        on_text(response)
+        return response
+
+    agent._query_llm = fake_query
+    candidates = agent.get_suggestions("Traceback", count=3)
+
+    assert len(candidates) == 3
+    assert len(set(prompts)) == 3
@@ -0,0 +1,42 @@
+from codehealer.utils.context_selector import select_context
+from codehealer.utils.import_graph import ImportGraph
+
+
+FILES = {
+    "main.py": "from app.service import run\nrun()\n",
+    "app/__init__.py": "",
+    "app/service.py": "from .models import Model\nimport helpers\n\ndef run():\n    Model().go()\n",
+    "app/models.py": "import numpy\n\nclass Model:\n    pass\n",
+    "helpers.py": "",
+    "unrelated.py": "x = 1\n" * 50,
+}
+
+
+def test_import_graph_resolves_relative_and_sibling_imports():
+    graph = ImportGraph(FILES)
+    assert graph.imports["app/service.py"] == {"app/models.py", "helpers.py"}
+    assert graph.importers["app/service.py"] == {"main.py"}
+    assert graph.external_imports["app/models.py"] == {"numpy"}
+
+
+def test_select_context_follows_traceback(tmp_path):
+    traceback_log = (
+        "Traceback (most recent call last):\n"
+        f'  File "{tmp_path}/main.py", line 2, in <module>\n'
+        f'  File "{tmp_path}/app/service.py", line 5, in run\n'
+        "AttributeError: 'Model' object has no attribute 'go'\n"
+    )
+    selected = select_context(FILES, traceback_log, str(tmp_path))
+    assert list(selected)[:2] == ["app/service.py", "main.py"]
+    assert "unrelated.py" not in selected
+    assert set(selected) == {"app/service.py", "main.py", "app/models.py", "helpers.py"}
+
+
+def test_select_context_missing_module_and_budget(tmp_path):
+    selected = select_context(FILES, "ModuleNotFoundError: No module named 'numpy'", str(tmp_path), token_budget=30)
+    assert list(selected)[0] == "app/models.py"
+    assert "unrelated.py" not in selected
+
+
+def test_select_context_without_frames_uses_all_files(tmp_path):
+    assert set(select_context(FILES, "No entry point found", str(tmp_path))) == set(FILES)
@@ -6,3 +6,12 @@ def test_environment_agent_returns_str(temp_repo):
     agent.client.response_content = "flask==2.3.2"
     suggestion = agent.get_suggestion("error log", "flask==0.1")
     assert suggestion == "flask==2.3.2"
+
+
+def test_environment_agent_includes_resolver_conflict(temp_repo):
+    agent = EnvironmentAgent(str(temp_repo))
+    prompts = []
+    agent._query_llm = lambda prompt: prompts.append(prompt) or "flask"
+    agent.get_suggestion("error log", "flask==2.0\nwerkzeug==3.0", conflict="Blamed requirement: werkzeug==3.0")
+    assert "RESOLVER CONFLICT" in prompts[0]
+    assert "Blamed requirement: werkzeug==3.0" in prompts[0]
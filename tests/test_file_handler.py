@@ -1,4 +1,6 @@
-from codehealer.utils.file_handler import FileHandler
+import os
+
+from codehealer.utils.file_handler import FileHandler, FileIndex
 
 
 def test_write_and_read_file(tmp_path):
@@ -14,3 +16,84 @@ def test_read_file_handles_missing(tmp_path, capsys):
     assert handler.read_file(missing) is None
     captured = capsys.readouterr()
     assert "Error reading file" in captured.out
+
+
+def test_list_all_python_files_only_rereads_changed_files(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("a = 1", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1", encoding="utf-8")
+    handler = FileHandler(tmp_path)
+    handler.list_all_python_files()
+
+    reads = []
+    original_read = FileHandler.read_file
+
+    def counting_read(self, path):
+        reads.append(str(path))
+        return original_read(self, path)
+
+    monkeypatch.setattr(FileHandler, "read_file", counting_read)
+    other = FileHandler(tmp_path)
+    other.write_file(tmp_path / "a.py", "a = 2")
+    reads.clear()
+
+    # Written through another handler: only the changed file is re-read.
+    assert handler.list_all_python_files() == {"a.py": "a = 2", "b.py": "b = 1"}
+    assert reads == [str(tmp_path.resolve() / "a.py")]
+    reads.clear()
+
+    (tmp_path / "b.py").write_text("b = 22", encoding="utf-8")
+    assert handler.list_all_python_files()["b.py"] == "b = 22"
+    assert reads == [str(tmp_path.resolve() / "b.py")]
+
+
+def test_list_all_python_files_prunes_ignored_trees(tmp_path):
+    (tmp_path / "main.py").write_text("import app", encoding="utf-8")
+    (tmp_path / "generated.py").write_text("x = 1", encoding="utf-8")
+    (tmp_path / ".gitignore").write_text("generated.py\nvendor/\n!keep.py\n", encoding="utf-8")
+    for ignored in [".codehealer_venv/lib", ".git", "node_modules/pkg", "vendor", "sdk/env/bin"]:
+        (tmp_path / ignored).mkdir(parents=True)
+        (tmp_path / ignored / "mod.py").write_text("x = 1", encoding="utf-8")
+    (tmp_path / "sdk" / "env" / "pyvenv.cfg").write_text("home = /usr/bin", encoding="utf-8")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "keep.py").write_text("y = 2", encoding="utf-8")
+    (tmp_path / "pkg" / "skip.py").write_text("z = 3", encoding="utf-8")
+
+    handler = FileHandler(tmp_path, ignore_patterns=["pkg/skip.py"])
+    assert set(handler.list_all_python_files()) == {"main.py", os.path.join("pkg", "keep.py")}
+
+
+def test_list_all_python_files_parallel_matches_serial(tmp_path):
+    for i in range(40):
+        package = tmp_path / f"pkg{i % 4}"
+        package.mkdir(exist_ok=True)
+        (package / f"mod{i}.py").write_text(f"value = {i}", encoding="utf-8")
+
+    handler = FileHandler(tmp_path)
+    serial = handler.list_all_python_files(max_workers=1)
+    handler.index = FileIndex()
+    parallel = handler.list_all_python_files(max_workers=8)
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+    assert len(parallel) == 40
+
+
+def test_take_written_paths_returns_and_resets(tmp_path):
+    handler = FileHandler()
+    target = tmp_path / "a.py"
+    handler.write_file(target, "x = 1\n")
+    assert handler.take_written_paths() == {str(target.resolve())}
+    assert handler.take_written_paths() == set()
+
+
+def test_file_index_is_per_handler_and_bounded(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.py").write_text(name * 100, encoding="utf-8")
+    first, second = FileHandler(tmp_path), FileHandler(tmp_path)
+    assert first.index is not second.index
+
+    first.index.max_bytes = 250
+    first.list_all_python_files()
+    assert first.index._size <= 250
+    assert len(first.index._entries) == 2
+    assert first.list_all_python_files() == {"a.py": "a" * 100, "b.py": "b" * 100, "c.py": "c" * 100}
+    assert first.index._size <= 250
@@ -0,0 +1,259 @@
+from codehealer.core.graph import build_graph
+from codehealer.utils.file_handler import FileHandler
+from codehealer.utils.import_probe import ImportProbeResult
+from codehealer.utils.runner import Runner
+
+
+class ProbeRunner:
+    """A repository without an entry point whose package imports report ``probes`` in turn."""
+
+    def __init__(self, repo_path, probes):
+        self.repo_path = repo_path
+        self.installed_requirements = {}
+        self.probes = list(probes)
+
+    def find_entry_point(self):
+        return None
+
+    def probe_packages(self, packages=None):
+        return self.probes.pop(0)
+
+
+class ScriptedCodeAgent:
+    """Never creates an entry point; answers every other failure with ``fixes`` in turn."""
+
+    def __init__(self, fixes):
+        self.fixes = list(fixes)
+        self.reports = []
+
+    def get_suggestion(self, log, attempt_history=None):
+        if log.startswith("No entry point found"):
+            return None
+        self.reports.append(log)
+        return self.fixes.pop(0) if self.fixes else None
+
+
+class RecordingFileHandler:
+    def __init__(self):
+        self.writes = []
+
+    def write_file(self, path, content):
+        self.writes.append((path, content))
+
+
+def run_runtime_phase(tmp_path, probes, fixes):
+    runner = ProbeRunner(str(tmp_path), probes)
+    code_agent = ScriptedCodeAgent(fixes)
+    file_handler = RecordingFileHandler()
+    state = build_graph().invoke({
+        "runner": runner,
+        "code_agent": code_agent,
+        "file_handler": file_handler,
+        "iteration": 0,
+        "max_iterations": 5,
+        "log": "",
+        "is_success": False,
+        "phase": "runtime",
+        "attempt_history": [],
+        "candidate_evaluator": None,
+        "preflight_pending": False,
+        "checkpoints": None,
+        "resume_node": "heal_runtime",
+    })
+    return state, code_agent, file_handler
+
+
+def test_no_entry_point_succeeds_when_all_packages_import(tmp_path):
+    probes = [[ImportProbeResult("pkg", True), ImportProbeResult("tools", True)]]
+    state, code_agent, file_handler = run_runtime_phase(tmp_path, probes, fixes=[])
+
+    assert state["is_success"] and state["phase"] == "runtime"
+    assert state["iteration"] == 1
+    assert code_agent.reports == [] and file_handler.writes == []
+
+
+def test_no_entry_point_fixes_failing_import_then_succeeds(tmp_path):
+    fix = [(str(tmp_path / "pkg" / "__init__.py"), "import os\n")]
+    probes = [
+        [ImportProbeResult("pkg", False, "ModuleNotFoundError", "No module named 'missing'")],
+        [ImportProbeResult("pkg", True)],
+    ]
+    state, code_agent, file_handler = run_runtime_phase(tmp_path, probes, fixes=[fix])
+
+    assert state["is_success"] and state["iteration"] == 2
+    assert "import pkg (ModuleNotFoundError)" in code_agent.reports[0]
+    assert file_handler.writes == fix
+
+
+def test_no_entry_point_fails_when_failing_import_has_no_fix(tmp_path):
+    probes = [[ImportProbeResult("pkg", True), ImportProbeResult("broken", False, "SyntaxError", "bad")]]
+    state, code_agent, file_handler = run_runtime_phase(tmp_path, probes, fixes=[])
+
+    assert not state["is_success"] and state["phase"] == "fail"
+    assert "1 of 2 package(s) failed to import" in state["log"]
+    assert file_handler.writes == []
+
+
+class EntryPointRunner:
+    """Runs its entry point cleanly; the tests exit with ``test_exits`` in turn."""
+
+    def __init__(self, repo_path, test_exits, pytest_installed=True):
+        self.repo_path = repo_path
+        self.installed_requirements = {}
+        self.test_exits = list(test_exits)
+        self.pytest_installed = pytest_installed
+        self.test_runs = []
+
+    def find_entry_point(self):
+        return "main.py"
+
+    def run_entry_point(self, entry_point):
+        return 0, "ok"
+
+    def is_pytest_installed(self):
+        return self.pytest_installed
+
+    def run_tests(self, changed_paths=None):
+        self.test_runs.append(None if changed_paths is None else sorted(changed_paths))
+        exit_code = self.test_exits.pop(0)
+        return exit_code, "FAILED test_app.py::test_total" if exit_code else "passed"
+
+
+class WritingFileHandler(RecordingFileHandler):
+    def __init__(self):
+        super().__init__()
+        self.written_paths = set()
+
+    def write_file(self, path, content):
+        super().write_file(path, content)
+        self.written_paths.add(path)
+
+    def take_written_paths(self):
+        written, self.written_paths = self.written_paths, set()
+        return written
+
+
+def run_with_tests(tmp_path, runner, fixes, written=()):
+    code_agent = ScriptedCodeAgent(fixes)
+    file_handler = WritingFileHandler()
+    file_handler.written_paths.update(written)
+    state = build_graph().invoke({
+        "runner": runner,
+        "code_agent": code_agent,
+        "file_handler": file_handler,
+        "iteration": 0,
+        "max_iterations": 5,
+        "log": "",
+        "is_success": False,
+        "phase": "runtime",
+        "attempt_history": [],
+        "candidate_evaluator": None,
+        "preflight_pending": False,
+        "checkpoints": None,
+        "resume_node": "heal_runtime",
+        "run_tests": True,
+    })
+    return state, code_agent
+
+
+def test_run_tests_checks_affected_tests_then_the_full_suite(tmp_path):
+    app = str(tmp_path / "app.py")
+    runner = EntryPointRunner(str(tmp_path), test_exits=[0, 5])
+    state, _ = run_with_tests(tmp_path, runner, fixes=[], written=[app, str(tmp_path / "requirements.txt")])
+
+    assert state["is_success"] and state["iteration"] == 1
+    assert runner.test_runs == [[app], None]
+
+
+def test_run_tests_feeds_failures_to_the_code_agent(tmp_path):
+    app = str(tmp_path / "app.py")
+    runner = EntryPointRunner(str(tmp_path), test_exits=[0, 1, 0, 0])
+    state, code_agent = run_with_tests(tmp_path, runner, fixes=[[(app, "TOTAL = 2\n")]])
+
+    assert state["is_success"] and state["iteration"] == 2
+    assert "FAILED test_app.py::test_total" in code_agent.reports[0]
+    # The fix is checked against the tests it affects before the confirming full run.
+    assert runner.test_runs == [[], None, [app], None]
+
+
+def test_run_tests_fails_without_a_fix_and_skips_without_pytest(tmp_path):
+    runner = EntryPointRunner(str(tmp_path), test_exits=[1])
+    state, _ = run_with_tests(tmp_path, runner, fixes=[])
+    assert state["phase"] == "fail" and not state["is_success"]
+
+    runner = EntryPointRunner(str(tmp_path), test_exits=[], pytest_installed=False)
+    state, _ = run_with_tests(tmp_path, runner, fixes=[])
+    assert state["is_success"] and runner.test_runs == []
+
+
+class SnapshotSandbox:
+    venv_name = "venv"
+
+    def __init__(self):
+        self.restores = 0
+
+    def get_pip_executable(self):
+        return "pip"
+
+    def snapshot(self, name="last-good"):
+        return name
+
+    def restore(self, name="last-good"):
+        self.restores += 1
+        return True
+
+
+class RewritingEnvAgent:
+    def __init__(self, suggestion):
+        self.suggestion = suggestion
+        self.logs = []
+
+    def get_suggestion(self, error_log, requirements_content=None, attempt_history=None, conflict=None):
+        self.logs.append(error_log)
+        return self.suggestion
+
+
+def test_requirements_rewrite_after_a_failed_install_is_a_delta(monkeypatch, tmp_path):
+    req = tmp_path / "requirements.txt"
+    req.write_text("flask==0.1\nnumpy\n", encoding="utf-8")
+    sandbox = SnapshotSandbox()
+    runner = Runner(str(tmp_path), sandbox)
+    runner.installed_requirements = {"numpy": "numpy"}
+    installs = []
+
+    def fake_run_command(command):
+        if "--dry-run" in command:
+            return 0, ""
+        installs.append(command)
+        return (1, "ERROR: No matching distribution found for flask==0.1") if len(installs) == 1 else (0, "ok")
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    monkeypatch.setattr(runner, "find_entry_point", lambda: "main.py")
+    monkeypatch.setattr(runner, "run_entry_point", lambda entry_point: (0, "ok"))
+    env_agent = RewritingEnvAgent("flask==2.3.2\nnumpy\n")
+
+    state = build_graph().invoke({
+        "sandbox": sandbox,
+        "runner": runner,
+        "file_handler": FileHandler(),
+        "env_agent": env_agent,
+        "code_agent": ScriptedCodeAgent([]),
+        "iteration": 0,
+        "max_iterations": 5,
+        "log": "",
+        "is_success": False,
+        "phase": "environment",
+        "attempt_history": [],
+        "candidate_evaluator": None,
+        "preflight_pending": False,
+        "checkpoints": None,
+        "resume_node": "heal_environment",
+    })
+
+    assert state["is_success"] and sandbox.restores == 1
+    # Both installs are deltas against the last-good requirements, not ``-r`` runs.
+    assert installs == [
+        ["pip", "install", "-c", str(req), "flask==0.1"],
+        ["pip", "install", "-c", str(req), "flask==2.3.2"],
+    ]
+    assert runner.installed_requirements == {"flask": "flask==2.3.2", "numpy": "numpy"}
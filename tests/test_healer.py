@@ -14,6 +14,12 @@ class StubSandbox:
     def cleanup(self):
         self.cleaned = True
 
+    def snapshot(self, name="last-good"):
+        return name
+
+    def restore(self, name="last-good"):
+        return True
+
 
 class StubRunner:
     def __init__(self):
@@ -30,6 +36,9 @@ class StubRunner:
     def find_requirements(self):
         return self.requirements
 
+    def resolve_dependencies(self):
+        return 0, ""
+
     def install_dependencies(self):
         result = self.install_attempts[self.install_index]
         self.install_index += 1
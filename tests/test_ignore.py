@@ -0,0 +1,20 @@
+from codehealer.utils.ignore import IgnoreRules
+
+
+def test_gitignore_semantics():
+    rules = IgnoreRules(["*.py[cod]", "/build_output/", "docs/**/*.py", "logs/", "!logs/keep.py", "data/[!a]*.py"])
+    assert rules.is_ignored("pkg/mod.pyc", False)
+    assert rules.is_ignored("build_output", True)
+    assert not rules.is_ignored("pkg/build_output", True)
+    assert rules.is_ignored("docs/a/b/conf.py", False)
+    assert rules.is_ignored("logs", True)
+    assert not rules.is_ignored("logs", False)
+    assert rules.is_ignored("data/b.py", False)
+    assert not rules.is_ignored("data/a.py", False)
+
+
+def test_builtin_deny_list():
+    rules = IgnoreRules()
+    assert rules.is_ignored("sub/__pycache__", True)
+    assert rules.is_ignored("mypkg.egg-info", True)
+    assert not rules.is_ignored("src", True)
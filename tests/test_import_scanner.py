@@ -0,0 +1,33 @@
+from codehealer.utils.import_scanner import generate_requirements, scan_imports
+from codehealer.utils.requirements import merge_requirements
+
+
+def test_scan_imports_skips_relative_and_optional_imports():
+    files = {
+        "app.py": (
+            "import os, numpy as np\n"
+            "from cv2 import imread\n"
+            "from . import sibling\n"
+            "try:\n    import ujson as json\nexcept ImportError:\n    import json\n"
+            "def f():\n    import requests.adapters\n"
+        ),
+        "broken.py": "def (",
+    }
+    assert set(scan_imports(files)) == {"os", "numpy", "cv2", "json", "requests"}
+
+
+def test_generate_requirements_maps_and_filters():
+    files = {
+        "main.py": "import sys\nimport cv2\nimport yaml\nimport flask\nfrom mypkg import util\nimport helpers\n",
+        "mypkg/__init__.py": "",
+        "mypkg/util.py": "from google.cloud import storage\n",
+        "helpers.py": "",
+    }
+    content, unresolved = generate_requirements(files)
+    assert content.splitlines() == ["flask", "opencv-python", "PyYAML"]
+    assert unresolved == {"google": {"mypkg/util.py"}}
+
+
+def test_merge_requirements_keeps_local_entries():
+    merged = merge_requirements("flask\nPyYAML\n", "Flask==2.0\ngoogle-cloud-storage\n")
+    assert merged.splitlines() == ["flask", "PyYAML", "google-cloud-storage"]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from codehealer.utils.llm_cache import LLMResponseCache
+
+
+def _key(prompt="user"):
+    return LLMResponseCache.make_key("gpt-5", "system", prompt, {"max_tokens": 10})
+
+
+def test_make_key_depends_on_every_input():
+    base = _key()
+    assert base == _key()
+    assert base != _key("other")
+    assert base != LLMResponseCache.make_key("gpt-4o", "system", "user", {"max_tokens": 10})
+    assert base != LLMResponseCache.make_key("gpt-5", "system", "user", {"max_tokens": 20})
+
+
+def test_get_and_put_round_trip(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get(_key()) is None
+    cache.put(_key(), "answer")
+    assert cache.get(_key()) == "answer"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResponseCache(path).put(_key(), "answer")
+    assert LLMResponseCache(path).get(_key()) == "answer"
+
+
+def test_expired_entries_are_misses_except_in_replay(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMResponseCache(path, ttl_seconds=10)
+    cache.put(_key(), "answer")
+    now = time.time()
+    monkeypatch.setattr("codehealer.utils.llm_cache.time.time", lambda: now + 60)
+    assert cache.get(_key()) is None
+    assert LLMResponseCache(path, mode="replay", ttl_seconds=10).get(_key()) == "answer"
+
+
+def test_evicts_least_recently_used_beyond_size_cap(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.put(_key("a"), "12345")
+    cache.put(_key("b"), "12345")
+    assert cache.get(_key("a")) == "12345"
+    cache.put(_key("c"), "12345")
+    assert cache.get(_key("b")) is None
+    assert cache.get(_key("a")) == "12345"
+    assert cache.get(_key("c")) == "12345"
+
+
+def test_record_mode_ignores_hits_and_replay_mode_never_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResponseCache(path).put(_key(), "old")
+    recorder = LLMResponseCache(path, mode="record")
+    assert recorder.get(_key()) is None
+    recorder.put(_key(), "new")
+    replay = LLMResponseCache(path, mode="replay")
+    replay.put(_key("other"), "ignored")
+    assert replay.get(_key()) == "new"
+    assert replay.get(_key("other")) is None
+
+
+def test_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        LLMResponseCache(str(tmp_path / "cache.sqlite3"), mode="bogus")
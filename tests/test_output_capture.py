@@ -0,0 +1,66 @@
+import io
+
+from codehealer.utils.output_capture import OutputCapture
+
+
+def _feed(capture, lines):
+    for line in lines:
+        capture.add(line)
+
+
+def test_small_output_renders_unchanged():
+    capture = OutputCapture(head_lines=3, tail_lines=3)
+    lines = [f"line {i}\n" for i in range(5)]
+    _feed(capture, lines)
+    assert not capture.truncated
+    assert capture.render() == "".join(lines)
+
+
+def test_large_output_keeps_head_tail_and_writes_full_log():
+    log = io.StringIO()
+    capture = OutputCapture(head_lines=2, tail_lines=3, log_file=log, log_path="/tmp/full.log")
+    lines = [f"line {i}\n" for i in range(10000)]
+    _feed(capture, lines)
+
+    rendered = capture.render()
+    assert capture.truncated
+    assert rendered.startswith("line 0\nline 1\n[... 9995 lines omitted; full log: /tmp/full.log ...]\n")
+    assert rendered.endswith("line 9997\nline 9998\nline 9999\n")
+    assert log.getvalue() == "".join(lines)
+    assert len(capture.tail) == 3
+
+
+def test_traceback_in_omitted_middle_is_kept_with_its_chain():
+    capture = OutputCapture(head_lines=1, tail_lines=2)
+    _feed(capture, ["start\n"] + ["noise\n"] * 50)
+    _feed(capture, [
+        "Traceback (most recent call last):\n",
+        '  File "app.py", line 3, in <module>\n',
+        "    load()\n",
+        "KeyError: 'a'\n",
+        "\n",
+        "During handling of the above exception, another exception occurred:\n",
+        "\n",
+        "Traceback (most recent call last):\n",
+        '  File "app.py", line 5, in <module>\n',
+        "ValueError: bad config\n",
+    ])
+    _feed(capture, ["shutdown noise\n"] * 50)
+
+    rendered = capture.render()
+    assert len(capture.tracebacks) == 1
+    assert "KeyError: 'a'" in rendered
+    assert "During handling of the above exception" in rendered
+    assert "ValueError: bad config" in rendered
+    assert rendered.index("ValueError") < rendered.index("shutdown noise")
+
+
+def test_only_the_last_tracebacks_are_kept_and_long_lines_are_cut():
+    capture = OutputCapture(head_lines=0, tail_lines=1, max_tracebacks=1, max_line_chars=50)
+    for error in ("FirstError", "SecondError"):
+        _feed(capture, ["Traceback (most recent call last):\n", '  File "a.py", line 1\n', f"{error}: x\n", "other\n"])
+    capture.add("x" * 100 + "\n")
+
+    rendered = capture.render()
+    assert "SecondError" in rendered and "FirstError" not in rendered
+    assert "51 characters cut" in rendered
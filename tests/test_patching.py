@@ -0,0 +1,45 @@
+from codehealer.utils.patching import apply_patch_text
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+def test_unified_diff_applies_with_offset():
+    patch = (
+        "--- a/mod.py\n+++ b/mod.py\n"
+        "@@ -4,3 +4,3 @@\n line 9\n-line 10\n+line ten\n line 11\n"
+    )
+    result = apply_patch_text(ORIGINAL, patch)
+    assert result.ok and result.applied == 1
+    assert "line ten\nline 11\n" in result.content
+    assert "line 10\n" not in result.content
+
+
+def test_unified_diff_fuzz_and_rejection():
+    patch = (
+        "@@ -2,5 +2,5 @@\n stale context\n line 3\n-line 4\n+line four\n line 5\n"
+        "@@ -15,3 +15,3 @@\n nothing\n-like this\n+exists\n nowhere\n"
+    )
+    result = apply_patch_text(ORIGINAL, patch)
+    assert result.applied == 1
+    assert "line four" in result.content
+    assert len(result.rejected) == 1 and "like this" in result.rejected[0]
+
+
+def test_search_replace_tolerates_whitespace():
+    original = "def f():\n    return 1   \n"
+    patch = "<<<<<<< SEARCH\ndef f():\n    return 1\n=======\ndef f():\n    return 2\n>>>>>>> REPLACE\n"
+    result = apply_patch_text(original, patch)
+    assert result.ok
+    assert result.content == "def f():\n    return 2\n"
+
+
+def test_search_replace_rejects_ambiguous_blocks():
+    original = "def f():\n    return 1\n\ndef g():\n    return 1\n"
+    patch = (
+        "<<<<<<< SEARCH\n    return 1\n=======\n    return 2\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\ndef g():\n    return 1\n=======\ndef g():\n    return 3\n>>>>>>> REPLACE\n"
+    )
+    result = apply_patch_text(original, patch)
+    assert result.applied == 1
+    assert len(result.rejected) == 1 and result.rejected[0].startswith("(ambiguous: matches 2 places")
+    assert result.content == "def f():\n    return 1\n\ndef g():\n    return 3\n"
@@ -0,0 +1,88 @@
+from codehealer.utils.preflight import (
+    check_syntax,
+    format_report,
+    installed_modules,
+    reachable_files,
+    run_preflight,
+    undefined_names,
+)
+
+
+def test_check_syntax_reports_location():
+    issue = check_syntax("bad.py", "x = 1\ndef f(:\n")
+    assert (issue.path, issue.line, issue.kind) == ("bad.py", 2, "SyntaxError")
+    assert check_syntax("ok.py", "x = 1\n") is None
+
+
+def test_undefined_names_finds_unbound_globals_only():
+    source = (
+        "import os\n"
+        "def helper(a):\n"
+        "    global counter\n"
+        "    counter = 1\n"
+        "    return a + os.sep + counter + len([x for x in a]) + missing_value\n"
+        "class C:\n"
+        "    y = 1\n"
+        "    def m(self):\n"
+        "        return y\n"
+        "print(__file__, undefined_call())\n"
+    )
+    issues = undefined_names("mod.py", source)
+    assert [(i.line, i.message) for i in issues] == [
+        (5, "name 'missing_value' is not defined"),
+        (9, "name 'y' is not defined"),
+        (10, "name 'undefined_call' is not defined"),
+    ]
+
+
+def test_undefined_names_skips_dynamic_modules():
+    assert undefined_names("a.py", "from os.path import *\nprint(join)\n") == []
+    assert undefined_names("b.py", "globals()['x'] = 1\nprint(x)\n") == []
+    assert undefined_names("c.py", "from __future__ import annotations\ndef f(a: Later) -> None:\n    pass\n") == []
+
+
+def test_installed_modules_reads_site_packages_and_pth(tmp_path):
+    site = tmp_path / "site-packages"
+    (site / "requests").mkdir(parents=True)
+    (site / "requests-2.0.dist-info").mkdir()
+    (site / "six.py").write_text("", encoding="utf-8")
+    (site / "_speedups.cpython-311-x86_64-linux-gnu.so").write_text("", encoding="utf-8")
+    src = tmp_path / "src"
+    (src / "localpkg").mkdir(parents=True)
+    (site / "local.pth").write_text(f"{src}\nimport something\n", encoding="utf-8")
+    (site / "__editable___demo_finder.py").write_text("MAPPING = {'demo': '/elsewhere/demo'}\n", encoding="utf-8")
+
+    assert installed_modules([str(site)]) >= {"requests", "six", "_speedups", "localpkg", "demo"}
+    assert "requests-2" not in installed_modules([str(site)])
+
+
+def test_reachable_files_follows_imports_from_entry_point():
+    files = {"main.py": "import app.core\n", "app/__init__.py": "", "app/core.py": "", "tests/test_x.py": "import pytest\n"}
+    assert reachable_files(files, "main.py") == ["main.py", "app/core.py", "app/__init__.py"]
+
+
+def test_run_preflight_batches_all_problems(tmp_path):
+    venv = tmp_path / "venv"
+    site = venv / "lib" / "python3.11" / "site-packages"
+    (site / "requests").mkdir(parents=True)
+    files = {
+        "main.py": "import requests\nimport yaml\nimport helper\nhelper.run(undefined)\n",
+        "helper.py": "def run(x):\n    return x +\n",
+        "tests/test_x.py": "import pytest\n",
+    }
+
+    issues = run_preflight(files, "main.py", str(venv))
+
+    assert sorted((i.path, i.kind) for i in issues) == [
+        ("helper.py", "SyntaxError"),
+        ("main.py", "ModuleNotFoundError"),
+        ("main.py", "NameError"),
+    ]
+    report = format_report(issues)
+    assert "No module named 'yaml'" in report
+    assert 'File "helper.py", line 2' in report
+
+
+def test_run_preflight_skips_import_check_without_venv(tmp_path):
+    issues = run_preflight({"main.py": "import yaml\n"}, "main.py", str(tmp_path / "missing"))
+    assert issues == []
@@ -0,0 +1,34 @@
+from codehealer.utils.prompt_packer import PromptPacker, PromptSection, count_tokens
+
+
+def test_pack_leaves_prompt_untouched_within_budget():
+    packer = PromptPacker(token_budget=1000)
+    packed = packer.pack([PromptSection("traceback", priority=2, text="Traceback: boom")], reserved="system")
+    assert packed.sections["traceback"] == "Traceback: boom"
+    assert packed.truncated == []
+    assert packed.total_tokens == count_tokens("system") + count_tokens("Traceback: boom")
+
+
+def test_pack_shrinks_lowest_priority_first():
+    packer = PromptPacker(token_budget=120)
+    history = [f"attempt {i} " + "x" * 100 for i in range(5)]
+    packed = packer.pack([
+        PromptSection("traceback", priority=3, text="Traceback: boom"),
+        PromptSection("history", priority=1, items=history, drop_from="start"),
+    ])
+    assert packed.sections["traceback"] == "Traceback: boom"
+    assert packed.truncated == ["history"]
+    assert "attempt 4" in packed.sections["history"]
+    assert "attempt 0" not in packed.sections["history"]
+    assert "item(s) omitted" in packed.sections["history"]
+    assert packed.total_tokens <= 120
+
+
+def test_pack_keeps_head_and_tail_of_text():
+    packer = PromptPacker(token_budget=60)
+    log = "HEAD\n" + "noise\n" * 500 + "ValueError: the real error"
+    packed = packer.pack([PromptSection("log", priority=1, text=log)])
+    assert packed.sections["log"].startswith("HEAD")
+    assert packed.sections["log"].endswith("ValueError: the real error")
+    assert "tokens truncated" in packed.sections["log"]
+    assert packed.total_tokens <= 60
@@ -0,0 +1,83 @@
+import types
+
+import pytest
+
+from codehealer.utils import rate_limiter as rl
+from codehealer.utils.rate_limiter import RateLimiter, RetryPolicy, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(rl.time, "monotonic", fake)
+    return fake
+
+
+def test_token_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(60)  # one per second
+    assert all(bucket.reserve(1) == 0 for _ in range(60))
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_rate_limiter_waits_for_slowest_bucket_and_corrects_usage(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    assert limiter.reserve(6000) == 0
+    assert limiter.reserve(100) == pytest.approx(1.0)
+    limiter.record_usage(estimated_tokens=6100, actual_tokens=100)
+    clock.now += 0.01
+    assert limiter.reserve(100) == 0
+
+
+def test_rate_limiter_without_limits_never_waits():
+    limiter = RateLimiter()
+    assert limiter.reserve(10 ** 9) == 0
+
+
+def _error(status=None, name="APIStatusError", headers=None):
+    cls = type(name, (Exception,), {})
+    error = cls("failed")
+    if status is not None:
+        error.status_code = status
+    error.response = types.SimpleNamespace(headers=headers or {})
+    return error
+
+
+def test_retry_policy_retries_only_transient_errors():
+    policy = RetryPolicy(base_delay=1, max_delay=10)
+    assert policy.next_delay(_error(429), 0, 0) is not None
+    assert policy.next_delay(_error(503), 0, 0) is not None
+    assert policy.next_delay(_error(name="APIConnectionError"), 0, 0) is not None
+    assert policy.next_delay(_error(400), 0, 0) is None
+    assert policy.next_delay(ValueError("bad"), 0, 0) is None
+
+
+def test_retry_policy_bounds_attempts_budget_and_honours_retry_after():
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=10, retry_budget_seconds=20)
+    assert 0 <= policy.next_delay(_error(429), 1, 0) <= 2
+    assert policy.next_delay(_error(429), 2, 0) is None
+    assert policy.next_delay(_error(429, headers={"retry-after": "7"}), 0, 0) == 7
+    assert policy.next_delay(_error(429, headers={"retry-after": "7"}), 0, 15) is None
+
+
+def test_shared_rate_limiter_delegates_bookkeeping(clock, monkeypatch):
+    remote = RateLimiter(tokens_per_minute=600)
+    shared = rl.SharedRateLimiter(remote, limits_tokens=True)
+    assert shared.limits_tokens and not RateLimiter().limits_tokens
+    waits = []
+    monkeypatch.setattr(rl.time, "sleep", waits.append)
+    shared.acquire(600)
+    shared.acquire(300)
+    assert waits == [pytest.approx(30)]
+    shared.record_usage(300, 0)
+    assert remote.tokens.available == pytest.approx(0)
@@ -0,0 +1,59 @@
+from codehealer.utils.requirements import (
+    diff_requirements,
+    failing_requirements,
+    find_conflict,
+    parse_requirements,
+)
+
+
+def test_parse_requirements_normalizes_names_and_specifiers():
+    parsed = parse_requirements(
+        "# comment\nFlask >= 2.0, <3\nscikit_learn==1.3.0  # pinned\nrequests[socks]; python_version >= '3.8'\n"
+    )
+    assert parsed == {
+        "flask": "Flask>=2.0,<3",
+        "scikit-learn": "scikit_learn==1.3.0",
+        "requests": "requests[socks]; python_version >= '3.8'",
+    }
+
+
+def test_parse_requirements_rejects_pip_options():
+    assert parse_requirements("-r base.txt\nflask") is None
+    assert parse_requirements("git+https://example.com/repo.git") is None
+
+
+def test_diff_requirements_reports_delta():
+    old = parse_requirements("flask==0.1\nnumpy\nscipy==1.8.0")
+    new = parse_requirements("flask==2.3.2\nnumpy\npandas")
+    delta = diff_requirements(old, new)
+    assert delta.added == ["pandas"]
+    assert delta.changed == ["flask==2.3.2"]
+    assert delta.removed == ["scipy"]
+    assert diff_requirements(new, new).is_empty()
+
+
+def test_failing_requirements_extracts_blamed_names():
+    requirements = parse_requirements("numpy\nscipy==1.8.0\nfoo-bar")
+    log = (
+        "ERROR: Could not find a version that satisfies the requirement scipy==1.8.0 (from versions: 1.9.0)\n"
+        "ERROR: No matching distribution found for scipy==1.8.0\n"
+        "Failed to build foo_bar\n"
+    )
+    assert failing_requirements(log, requirements) == {"scipy", "foo-bar"}
+
+
+def test_find_conflict_reads_resolution_impossible_log():
+    requirements = parse_requirements("flask==2.0\nwerkzeug==3.0\nnumpy")
+    log = (
+        "ERROR: Cannot install flask==2.0 and werkzeug==3.0 because these package versions have conflicting dependencies.\n"
+        "\n"
+        "The conflict is caused by:\n"
+        "    The user requested werkzeug==3.0\n"
+        "    flask 2.0 depends on Werkzeug>=2.0,<2.1\n"
+        "\n"
+        "To fix this you could try to:\n"
+    )
+    conflict = find_conflict(log, requirements)
+    assert conflict.requirements == ["flask==2.0", "werkzeug==3.0"]
+    assert conflict.causes == ["The user requested werkzeug==3.0", "flask 2.0 depends on Werkzeug>=2.0,<2.1"]
+    assert find_conflict("all good", requirements).is_empty()
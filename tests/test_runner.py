@@ -1,3 +1,5 @@
+import json
+import os
 import subprocess
 from types import SimpleNamespace
 
@@ -5,6 +7,7 @@ import pytest
 
 from codehealer.utils.runner import Runner
 from codehealer.utils.sandbox import SandboxManager
+from codehealer.utils.wheelhouse import Wheelhouse
 
 
 class DummySandbox(SandboxManager):
@@ -61,6 +64,8 @@ def test_install_dependencies_invokes_pip(monkeypatch, temp_repo):
     sandbox = DummySandbox(str(temp_repo))
     sandbox.pip_path = "pip3"
     runner = Runner(str(temp_repo), sandbox)
+    # An unknown sandbox state gets a full install.
+    runner.installed_requirements = None
 
     req = temp_repo / "requirements.txt"
     req.write_text("flask", encoding="utf-8")
@@ -142,3 +147,328 @@ def test_import_package_invokes_python(monkeypatch, temp_repo):
     assert code == 0
     assert output == "ok"
     assert called["command"] == ["python3", "-c", "import pkg"]
+
+
+def test_install_dependencies_wheelhouse_hit(monkeypatch, temp_repo, tmp_path):
+    sandbox = DummySandbox(str(temp_repo))
+    wheelhouse = Wheelhouse(str(tmp_path / "wheels"))
+    runner = Runner(str(temp_repo), sandbox, wheelhouse=wheelhouse)
+    runner.installed_requirements = None
+    req = temp_repo / "requirements.txt"
+    req.write_text("flask", encoding="utf-8")
+
+    commands = []
+
+    def fake_run_command(command):
+        commands.append(command)
+        return 0, "ok"
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    assert runner.install_dependencies() == (0, "ok")
+    assert commands == [["pip", "install", "--no-index", "--find-links", wheelhouse.path, "-r", str(req)]]
+    assert (wheelhouse.hits, wheelhouse.misses) == (1, 0)
+
+
+def test_install_dependencies_wheelhouse_miss_populates(monkeypatch, temp_repo, tmp_path):
+    sandbox = DummySandbox(str(temp_repo))
+    wheelhouse = Wheelhouse(str(tmp_path / "wheels"))
+    runner = Runner(str(temp_repo), sandbox, wheelhouse=wheelhouse)
+    req = temp_repo / "requirements.txt"
+    req.write_text("flask", encoding="utf-8")
+
+    results = [(1, "no matching distribution"), (0, "built"), (0, "installed")]
+    commands = []
+
+    def fake_run_command(command):
+        commands.append(command)
+        if command[1] == "wheel":
+            wheel_dir = command[command.index("--wheel-dir") + 1]
+            # Other workers read the wheelhouse, so pip must build elsewhere.
+            assert wheel_dir != wheelhouse.path
+            (tmp_path / "wheels" / os.path.basename(wheel_dir) / "flask-3.0-py3-none-any.whl").write_bytes(b"whl")
+        return results.pop(0)
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    assert runner.install_dependencies() == (0, "installed")
+    assert commands[1][:2] == ["pip", "wheel"]
+    assert "--no-index" in commands[2]
+    assert (wheelhouse.hits, wheelhouse.misses) == (0, 1)
+    assert os.listdir(wheelhouse.path) == ["flask-3.0-py3-none-any.whl"]
+
+
+def test_install_dependencies_wheelhouse_stops_on_unresolvable(monkeypatch, temp_repo, tmp_path):
+    sandbox = DummySandbox(str(temp_repo))
+    wheelhouse = Wheelhouse(str(tmp_path / "wheels"))
+    runner = Runner(str(temp_repo), sandbox, wheelhouse=wheelhouse)
+    (temp_repo / "requirements.txt").write_text("scipy==0.0.1", encoding="utf-8")
+
+    miss = "ERROR: No matching distribution found for scipy==0.0.1"
+    commands = []
+
+    def fake_run_command(command):
+        commands.append(command)
+        return 1, miss
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    assert runner.install_dependencies() == (1, miss)
+    assert [command[1] for command in commands] == ["install", "wheel"]
+
+
+def test_install_dependencies_applies_only_delta(monkeypatch, temp_repo):
+    sandbox = DummySandbox(str(temp_repo))
+    runner = Runner(str(temp_repo), sandbox)
+    req = temp_repo / "requirements.txt"
+    req.write_text("flask==0.1\nnumpy\nscipy", encoding="utf-8")
+
+    commands = []
+
+    def fake_run_command(command):
+        commands.append(command)
+        return 0, "ok"
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    runner.install_dependencies()
+    # The fresh venv is the baseline, so even the first install is a delta.
+    assert commands == [["pip", "install", "-c", str(req), "flask==0.1", "numpy", "scipy"]]
+
+    req.write_text("flask==2.3.2\nnumpy", encoding="utf-8")
+    commands.clear()
+    runner.install_dependencies()
+    assert commands == [["pip", "install", "-c", str(req), "flask==2.3.2"]]
+
+    commands.clear()
+    code, output = runner.install_dependencies()
+    assert code == 0 and commands == []
+    assert "unchanged" in output
+
+
+def test_resolve_dependencies_reads_report(monkeypatch, temp_repo):
+    sandbox = DummySandbox(str(temp_repo))
+    runner = Runner(str(temp_repo), sandbox)
+    req = temp_repo / "requirements.txt"
+    req.write_text("flask", encoding="utf-8")
+
+    def fake_run_command(command):
+        assert command[:3] == ["pip", "install", "--dry-run"]
+        report_path = command[command.index("--report") + 1]
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"install": [{"metadata": {"name": "flask", "version": "3.0.0"}}]}, f)
+        return 0, ""
+
+    monkeypatch.setattr(runner, "_run_command", fake_run_command)
+    code, output = runner.resolve_dependencies()
+    assert code == 0
+    assert "flask==3.0.0" in output
+    assert runner.last_conflict is None
+
+
+def test_resolve_dependencies_reports_failure(monkeypatch, temp_repo):
+    sandbox = DummySandbox(str(temp_repo))
+    runner = Runner(str(temp_repo), sandbox)
+    (temp_repo / "requirements.txt").write_text("scipy==0.0.1", encoding="utf-8")
+
+    log = "ERROR: No matching distribution found for scipy==0.0.1\nResolutionImpossible"
+    monkeypatch.setattr(runner, "_run_command", lambda command: (1, log))
+    code, output = runner.resolve_dependencies()
+    assert code == 1
+    assert "resolution" in output and "ResolutionImpossible" in output
+    assert runner.last_conflict.requirements == ["scipy==0.0.1"]
+
+
+def _python_runner(temp_repo, monkeypatch, **limits):
+    import sys
+
+    from codehealer.utils.limits import RunLimits
+
+    sandbox = DummySandbox(str(temp_repo))
+    sandbox.python_path = sys.executable
+    runner = Runner(str(temp_repo), sandbox)
+    runner.entry_point_limits = RunLimits(**limits)
+    return runner
+
+
+def test_entry_point_timeout_stops_process(monkeypatch, temp_repo):
+    (temp_repo / "main.py").write_text("import time\nprint('start', flush=True)\ntime.sleep(30)\n", encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch, timeout_seconds=0.5)
+    code, output = runner.run_entry_point("main.py")
+    assert code == 124
+    assert "start" in output and "timed out" in output
+    assert runner.last_usage.timed_out
+    assert runner.last_usage.wall_seconds < 10
+
+
+def test_entry_point_alive_after_health_window_is_success(monkeypatch, temp_repo):
+    (temp_repo / "main.py").write_text("import time\ntime.sleep(30)\n", encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch, timeout_seconds=20, healthy_after_seconds=0.5)
+    code, output = runner.run_entry_point("main.py")
+    assert code == 0
+    assert "treating it as healthy" in output
+    assert runner.last_usage.healthy_alive
+
+
+def test_early_crash_fails_despite_health_window(monkeypatch, temp_repo):
+    (temp_repo / "main.py").write_text("raise SystemExit(3)\n", encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch, healthy_after_seconds=5)
+    code, _ = runner.run_entry_point("main.py")
+    assert code == 3
+
+
+def test_run_stops_leftover_children_and_reports_usage(monkeypatch, temp_repo, tmp_path):
+    import os
+    import time
+
+    pid_file = tmp_path / "child.pid"
+    (temp_repo / "main.py").write_text(
+        "import subprocess, sys\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'],\n"
+        "                         stdout=subprocess.DEVNULL)\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n",
+        encoding="utf-8",
+    )
+    runner = _python_runner(temp_repo, monkeypatch)
+    code, _ = runner.run_entry_point("main.py")
+    assert code == 0
+    child_pid = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("child process outlived the run")
+    assert runner.last_usage.cpu_seconds is not None
+    assert runner.last_usage.max_rss_bytes > 0
+
+
+def test_memory_limit_is_enforced(monkeypatch, temp_repo):
+    (temp_repo / "main.py").write_text("data = bytearray(512 * 1024 * 1024)\n", encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch, memory_bytes=256 * 1024 * 1024)
+    code, output = runner.run_entry_point("main.py")
+    assert code != 0
+    assert "MemoryError" in output
+
+
+def test_cpu_limit_applies_before_the_command_starts(monkeypatch, temp_repo):
+    (temp_repo / "main.py").write_text(
+        "import resource\nprint('cpu limit', resource.getrlimit(resource.RLIMIT_CPU)[0])\n", encoding="utf-8"
+    )
+    runner = _python_runner(temp_repo, monkeypatch, cpu_seconds=7)
+    code, output = runner.run_entry_point("main.py")
+    assert code == 0
+    assert "cpu limit 7" in output
+
+
+def test_limits_are_set_by_an_exec_wrapper_not_a_preexec_fn(temp_repo):
+    from codehealer.utils.limits import RunLimits, limited_command, popen_kwargs
+
+    limits = RunLimits(cpu_seconds=5)
+    assert "preexec_fn" not in popen_kwargs(limits)
+    assert limited_command(["python", "main.py"]) == ["python", "main.py"]
+    result = subprocess.run(limited_command(["codehealer-no-such-command"], limits), capture_output=True, text=True)
+    assert result.returncode == 127
+    assert "codehealer-no-such-command" in result.stderr
+
+
+def test_kill_falls_back_to_process_kill_without_process_groups(monkeypatch):
+    from codehealer.utils import limits
+
+    killed = []
+    proc = SimpleNamespace(pid=12345, kill=lambda: killed.append(True))
+    monkeypatch.setattr(limits.os, "name", "nt")
+    limits.kill_process_group(proc)
+    assert killed == [True]
+
+
+def test_run_command_bounds_captured_output_and_logs_everything(monkeypatch, temp_repo, tmp_path):
+    (temp_repo / "main.py").write_text(
+        "for i in range(5000):\n    print('noise', i)\nraise RuntimeError('boom')\n", encoding="utf-8"
+    )
+    runner = _python_runner(temp_repo, monkeypatch)
+    runner.output_head_lines, runner.output_tail_lines = 10, 20
+    runner.log_dir = str(tmp_path / "logs")
+
+    code, output = runner.run_entry_point("main.py")
+
+    assert code == 1
+    assert "RuntimeError: boom" in output
+    assert "noise 2500\n" not in output
+    assert runner.last_log_path in output
+    with open(runner.last_log_path, encoding="utf-8") as f:
+        assert "noise 2500\n" in f.read()
+
+
+def test_probe_packages_reports_each_package_from_one_process(monkeypatch, temp_repo):
+    for name, body in {
+        "good": "print('loading good')\n",
+        "bad": "print('loading bad')\nraise ImportError('missing thing')\n",
+        "other": "import good\n",
+    }.items():
+        (temp_repo / name).mkdir()
+        (temp_repo / name / "__init__.py").write_text(body, encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch)
+    commands = []
+    run_command = runner._run_command
+    monkeypatch.setattr(runner, "_run_command", lambda command: commands.append(command) or run_command(command))
+
+    results = runner.probe_packages()
+
+    assert len(commands) == 1
+    assert [(r.package, r.ok, r.error_type) for r in results] == [
+        ("bad", False, "ImportError"),
+        ("good", True, None),
+        ("other", True, None),
+    ]
+    assert "loading bad" in results[0].log and "missing thing" in results[0].log
+    assert results[1].log == "loading good\n"
+
+
+def test_probe_packages_falls_back_after_a_crash(monkeypatch, temp_repo):
+    (temp_repo / "crash").mkdir()
+    (temp_repo / "crash" / "__init__.py").write_text("import os\nos._exit(3)\n", encoding="utf-8")
+    (temp_repo / "fine").mkdir()
+    (temp_repo / "fine" / "__init__.py").write_text("", encoding="utf-8")
+    runner = _python_runner(temp_repo, monkeypatch)
+
+    results = runner.probe_packages()
+
+    assert [(r.package, r.ok) for r in results] == [("crash", False), ("fine", True)]
+
+
+def test_run_tests_runs_only_affected_tests(monkeypatch, temp_repo):
+    (temp_repo / "lib.py").write_text("VALUE = 1\n", encoding="utf-8")
+    (temp_repo / "other.py").write_text("OTHER = 1\n", encoding="utf-8")
+    (temp_repo / "test_lib.py").write_text("import lib\n", encoding="utf-8")
+    (temp_repo / "test_other.py").write_text("import other\n", encoding="utf-8")
+    sandbox = DummySandbox(str(temp_repo))
+    runner = Runner(str(temp_repo), sandbox)
+    commands = []
+    monkeypatch.setattr(runner, "_run_command", lambda command: commands.append(command) or (0, "ok"))
+
+    assert runner.run_tests([str(temp_repo / "lib.py")]) == (0, "ok")
+    assert runner.run_tests(["README.md"]) == (0, "ok")
+    assert runner.run_tests([]) == (0, "No tests are affected by the changed files.")
+    assert runner.run_tests() == (0, "ok")
+    assert commands == [
+        ["python", "-m", "pytest", "test_lib.py"],
+        ["python", "-m", "pytest"],
+        ["python", "-m", "pytest"],
+    ]
+
+
+def test_run_tests_uses_xdist_workers_when_installed(monkeypatch, temp_repo):
+    sandbox = DummySandbox(str(temp_repo))
+    runner = Runner(str(temp_repo), sandbox)
+    runner.test_workers = 4
+    commands = []
+    monkeypatch.setattr(runner, "_run_command", lambda command: commands.append(command) or (0, "ok"))
+
+    runner.run_tests()
+    runner.run_tests()
+
+    assert commands == [
+        ["python", "-c", "import xdist"],
+        ["python", "-m", "pytest", "-n", "4"],
+        ["python", "-m", "pytest", "-n", "4"],
+    ]
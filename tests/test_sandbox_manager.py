@@ -1,3 +1,4 @@
+import os
 import venv
 
 from codehealer.utils.sandbox import SandboxManager
@@ -49,3 +50,66 @@ def test_cleanup_removes_directory(tmp_path):
 
     manager.cleanup()
     assert not target.exists()
+
+
+def test_create_clones_from_template_cache(tmp_path):
+    class StubCache:
+        def __init__(self):
+            self.calls = []
+
+        def clone_into(self, dest, seed_packages):
+            self.calls.append((dest, seed_packages))
+
+    cache = StubCache()
+    manager = SandboxManager(str(tmp_path), template_cache=cache, seed_packages=["wheel"])
+    manager.create()
+
+    assert cache.calls == [(manager.venv_path, ["wheel"])]
+
+
+def test_snapshot_and_restore_roll_back_changes(tmp_path):
+    manager = SandboxManager(str(tmp_path))
+    site = tmp_path / ".codehealer_venv" / "lib" / "site-packages"
+    site.mkdir(parents=True)
+    (site / "keep.py").write_text("keep = True", encoding="utf-8")
+    (site / "pinned.py").write_text("version = 1", encoding="utf-8")
+
+    manager.snapshot()
+
+    (site / "pinned.py").unlink()
+    (site / "pinned.py").write_text("version = 2", encoding="utf-8")
+    (site / "half_installed").mkdir()
+    (site / "half_installed" / "__init__.py").write_text("", encoding="utf-8")
+    (site / "keep.py").unlink()
+
+    assert manager.restore() is True
+    assert (site / "keep.py").read_text(encoding="utf-8") == "keep = True"
+    assert (site / "pinned.py").read_text(encoding="utf-8") == "version = 1"
+    assert not (site / "half_installed").exists()
+
+
+def test_restore_without_snapshot_returns_false(tmp_path):
+    manager = SandboxManager(str(tmp_path))
+    assert manager.restore() is False
+
+
+def test_clone_copies_repo_and_links_venv(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "pkg" / "mod.py").write_text("x = 1\n", encoding="utf-8")
+    sandbox = SandboxManager(str(repo))
+    venv_bin = repo / sandbox.venv_name / "bin"
+    venv_bin.mkdir(parents=True)
+    (venv_bin / "tool").write_text(f"#!{sandbox.venv_path}/bin/python\n", encoding="utf-8")
+    (repo / sandbox.venv_name / "lib.txt").write_text("shared", encoding="utf-8")
+    (repo / f"{sandbox.venv_name}.snapshots").mkdir()
+
+    clone = sandbox.clone(str(tmp_path / "clone"))
+
+    assert (tmp_path / "clone" / "pkg" / "mod.py").read_text(encoding="utf-8") == "x = 1\n"
+    assert not (tmp_path / "clone" / f"{sandbox.venv_name}.snapshots").exists()
+    assert (venv_bin / "tool").read_text(encoding="utf-8") != (
+        tmp_path / "clone" / sandbox.venv_name / "bin" / "tool"
+    ).read_text(encoding="utf-8")
+    assert clone.venv_path in (tmp_path / "clone" / sandbox.venv_name / "bin" / "tool").read_text(encoding="utf-8")
+    assert os.path.samefile(repo / sandbox.venv_name / "lib.txt", os.path.join(clone.venv_path, "lib.txt"))
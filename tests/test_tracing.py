@@ -0,0 +1,108 @@
+import json
+import sys
+import threading
+
+import pytest
+
+from codehealer.utils import tracing
+from codehealer.utils.file_handler import FileHandler
+from codehealer.utils.runner import Runner
+from codehealer.utils.sandbox import SandboxManager
+from codehealer.utils.tracing import Tracer
+
+
+@pytest.fixture
+def tracer():
+    active = Tracer()
+    tracing.activate(active)
+    yield active
+    tracing.activate(None)
+
+
+def test_span_is_a_no_op_without_a_tracer():
+    with tracing.span("work", "node") as span:
+        span.set(tokens_in=3)
+    assert span.fields == {"tokens_in": 3}
+
+
+def test_spans_are_recorded_and_summarised(tracer):
+    with tracing.span("heal_runtime", "node"):
+        with tracing.span("CodeAgent", "llm") as span:
+            span.set(tokens_in=100, tokens_out=20, cache_hit=True)
+        with tracing.span("CodeAgent", "llm") as span:
+            span.set(tokens_in=50, tokens_out=5, cache_hit=False)
+
+    rows = {(row["category"], row["name"]): row for row in tracer.summary_rows()}
+    assert rows[("node", "heal_runtime")]["count"] == 1
+    llm = rows[("llm", "CodeAgent")]
+    assert (llm["count"], llm["tokens_in"], llm["tokens_out"], llm["cache_hits"]) == (2, 150, 25, 1)
+    assert tracer.summary_rows()[0]["category"] == "node"
+
+    table = tracer.summary_table()
+    assert "llm: CodeAgent" in table and "tokens in" in table
+
+
+def test_chrome_trace_has_complete_events(tracer, tmp_path):
+    with tracing.span("write_file", "file", bytes_written=12):
+        pass
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    (event,) = data["traceEvents"]
+    assert event["ph"] == "X" and event["name"] == "write_file" and event["cat"] == "file"
+    assert event["args"]["bytes_written"] == 12
+    assert data["summary"][0]["bytes_written"] == 12
+
+
+def test_bind_carries_the_tracer_to_worker_threads(tracer):
+    def work():
+        with tracing.span("candidate", "command"):
+            pass
+
+    unbound = threading.Thread(target=work)
+    bound = threading.Thread(target=tracing.bind(work))
+    for thread in (unbound, bound):
+        thread.start()
+        thread.join()
+    assert [span.name for span in tracer.spans] == ["candidate"]
+
+
+def test_traced_decorator_names_the_span(tracer):
+    @tracing.traced("sandbox", "create_venv")
+    def create():
+        return 42
+
+    assert create() == 42
+    assert [(span.category, span.name) for span in tracer.spans] == [("sandbox", "create_venv")]
+
+
+def test_runner_commands_record_exit_code_output_and_child_usage(tracer, temp_repo):
+    class Sandbox(SandboxManager):
+        def get_python_executable(self):
+            return sys.executable
+
+    (temp_repo / "main.py").write_text("print('hello')\n", encoding="utf-8")
+    runner = Runner(str(temp_repo), Sandbox(str(temp_repo)))
+    runner.run_entry_point("main.py")
+
+    (span,) = [span for span in tracer.spans if span.category == "command"]
+    assert span.name == f"{sys.executable.rsplit('/', 1)[-1]} main.py"
+    assert span.fields["exit_code"] == 0
+    assert span.fields["bytes_read"] == len("hello\n")
+    assert span.fields["child_cpu_seconds"] is not None
+
+
+def test_file_scans_report_only_bytes_read_from_disk(tracer, tmp_path):
+    (tmp_path / "a.py").write_text("A = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("B = 22\n", encoding="utf-8")
+    handler = FileHandler()
+    handler.list_all_python_files(tmp_path)
+    (tmp_path / "b.py").write_text("B = 333\n", encoding="utf-8")
+    handler.list_all_python_files(tmp_path)
+
+    first, second = [span for span in tracer.spans if span.name == "list_python_files"]
+    assert (first.fields["bytes_read"], first.fields["cache_hits"]) == (len("A = 1\nB = 22\n"), 0)
+    assert (second.fields["bytes_read"], second.fields["cache_hits"]) == (len("B = 333\n"), 1)
+    (row,) = [row for row in tracer.summary_rows() if row["name"] == "list_python_files"]
+    assert row["cache_hits"] == 1
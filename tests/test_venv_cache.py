@@ -0,0 +1,93 @@
+import os
+import subprocess
+import venv
+
+from codehealer.utils.venv_cache import VenvTemplateCache, copy_file
+
+
+def fake_venv_create(path, with_pip):
+    bin_dir = os.path.join(path, "bin")
+    os.makedirs(bin_dir)
+    with open(os.path.join(bin_dir, "pip"), "w", encoding="utf-8") as f:
+        f.write(f"#!{path}/bin/python\nimport pip\n")
+    with open(os.path.join(path, "pyvenv.cfg"), "w", encoding="utf-8") as f:
+        f.write("home = /usr/bin\n")
+    site = os.path.join(path, "lib", "site-packages")
+    os.makedirs(site)
+    with open(os.path.join(site, "module.py"), "w", encoding="utf-8") as f:
+        f.write("x = 1\n" * 100)
+    with open(os.path.join(site, "distutils-precedence.pth"), "w", encoding="utf-8") as f:
+        f.write("import os\n")
+
+
+def test_clone_builds_once_and_rewrites_paths(monkeypatch, tmp_path):
+    calls = []
+
+    def counting_create(path, with_pip):
+        calls.append(path)
+        fake_venv_create(path, with_pip)
+
+    monkeypatch.setattr(venv, "create", counting_create)
+    cache = VenvTemplateCache(str(tmp_path / "cache"))
+
+    first = tmp_path / "a" / "venv"
+    second = tmp_path / "b" / "venv"
+    cache.clone_into(str(first))
+    cache.clone_into(str(second))
+
+    assert len(calls) == 1
+    assert (second / "bin" / "pip").read_text(encoding="utf-8").startswith(f"#!{second}/bin/python")
+    template_module = tmp_path / "cache" / cache.key_for() / "lib" / "site-packages" / "module.py"
+    assert os.path.samefile(second / "lib" / "site-packages" / "module.py", template_module)
+    assert not (second / ".codehealer_template.json").exists()
+    # Files that are appended to in place must not write through to the template.
+    pth = second / "lib" / "site-packages" / "distutils-precedence.pth"
+    assert not os.path.samefile(pth, template_module.parent / "distutils-precedence.pth")
+    with open(pth, "a", encoding="utf-8") as f:
+        f.write("/editable/src\n")
+    assert "editable" not in (template_module.parent / "distutils-precedence.pth").read_text(encoding="utf-8")
+
+
+def test_key_depends_on_seed_packages(tmp_path):
+    cache = VenvTemplateCache(str(tmp_path))
+    assert cache.key_for(["wheel"]) != cache.key_for()
+    assert cache.key_for(["wheel", "setuptools"]) == cache.key_for(["setuptools", "wheel"])
+
+
+def test_evict_removes_least_recently_used(monkeypatch, tmp_path):
+    monkeypatch.setattr(venv, "create", fake_venv_create)
+    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: None)
+    cache = VenvTemplateCache(str(tmp_path / "cache"))
+    cache.clone_into(str(tmp_path / "one"), ["old"])
+    old_key = cache.key_for(["old"])
+    metadata = tmp_path / "cache" / old_key / ".codehealer_template.json"
+    os.utime(metadata, (0, 0))
+
+    cache.max_size_bytes = 1
+    cache.clone_into(str(tmp_path / "two"), ["new"])
+
+    remaining = [key for key, _, _ in cache.entries()]
+    assert remaining == [cache.key_for(["new"])]
+
+
+def test_entries_skip_in_progress_builds(monkeypatch, tmp_path):
+    monkeypatch.setattr(venv, "create", fake_venv_create)
+    cache = VenvTemplateCache(str(tmp_path / "cache"), max_size_bytes=1)
+    staging = tmp_path / "cache" / ".abc.123.tmp"
+    staging.mkdir(parents=True)
+    (staging / ".codehealer_template.json").write_text('{"size_bytes": 10}', encoding="utf-8")
+
+    cache.clone_into(str(tmp_path / "one"))
+
+    assert [key for key, _, _ in cache.entries()] == [cache.key_for()]
+    assert staging.exists()
+
+
+def test_copy_file_makes_an_independent_copy(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text("x = 1\n", encoding="utf-8")
+    dest = tmp_path / "b.py"
+    assert copy_file(str(src), str(dest)) == str(dest)
+    with open(dest, "w", encoding="utf-8") as f:
+        f.write("x = 2\n")
+    assert src.read_text(encoding="utf-8") == "x = 1\n"
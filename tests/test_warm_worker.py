@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+
+from codehealer.utils import warm_worker
+from codehealer.utils.limits import RunLimits
+from codehealer.utils.runner import Runner
+from codehealer.utils.sandbox import SandboxManager
+
+pytestmark = pytest.mark.skipif(not warm_worker.is_supported(), reason="needs fork and Unix sockets")
+
+
+class DummySandbox(SandboxManager):
+    def get_python_executable(self):
+        return sys.executable
+
+
+@pytest.fixture
+def warm_runner(tmp_path):
+    runner = Runner(str(tmp_path), DummySandbox(str(tmp_path)))
+    runner.use_warm_worker = True
+    yield runner
+    runner.stop_warm_worker()
+
+
+def test_can_run_accepts_scripts_code_and_modules():
+    assert warm_worker.can_run(["main.py", "--flag"])
+    assert warm_worker.can_run(["-c", "import os"])
+    assert warm_worker.can_run(["-m", "pytest", "-q"])
+    assert not warm_worker.can_run(["-X", "dev", "main.py"])
+    assert not warm_worker.can_run(["-c"])
+    assert not warm_worker.can_run([])
+
+
+def test_preload_modules_only_lists_installed_third_party_imports(tmp_path):
+    site_packages = tmp_path / "venv" / "lib" / "python3.11" / "site-packages"
+    (site_packages / "heavylib").mkdir(parents=True)
+    (site_packages / "mypkg").mkdir()
+    files = {
+        "main.py": "import os\nimport heavylib\nimport missinglib\nfrom mypkg import util\n",
+        "mypkg/__init__.py": "",
+        "mypkg/util.py": "",
+    }
+    assert warm_worker.preload_modules(files, str(tmp_path / "venv")) == ["heavylib"]
+
+
+def test_entry_point_runs_as_main_with_exit_code(warm_runner, tmp_path):
+    (tmp_path / "helper.py").write_text("VALUE = 'from helper'\n", encoding="utf-8")
+    (tmp_path / "main.py").write_text(
+        "import sys\nimport helper\n"
+        "print(__name__, sys.argv[1:], helper.VALUE)\n"
+        "sys.exit(3)\n",
+        encoding="utf-8",
+    )
+    code, output = warm_runner.run_entry_point("main.py")
+    assert code == 3
+    assert "__main__ [] from helper" in output
+    assert warm_runner._warm_worker is not None and warm_runner._warm_worker.alive
+
+
+def test_runs_see_edited_repository_files(warm_runner, tmp_path):
+    (tmp_path / "helper.py").write_text("VALUE = 1\n", encoding="utf-8")
+    (tmp_path / "main.py").write_text("import helper\nprint('value', helper.VALUE)\n", encoding="utf-8")
+    assert "value 1" in warm_runner.run_entry_point("main.py")[1]
+    worker = warm_runner._warm_worker
+    (tmp_path / "helper.py").write_text("VALUE = 2\n", encoding="utf-8")
+    assert "value 2" in warm_runner.run_entry_point("main.py")[1]
+    assert warm_runner._warm_worker is worker
+
+
+def test_traceback_looks_like_a_normal_run(warm_runner, tmp_path):
+    (tmp_path / "main.py").write_text("def boom():\n    raise ValueError('bad')\n\nboom()\n", encoding="utf-8")
+    code, output = warm_runner.run_entry_point("main.py")
+    assert code == 1
+    assert "Traceback (most recent call last):" in output
+    assert "ValueError: bad" in output
+    assert "runpy" not in output and "warm_worker_server" not in output
+
+
+def test_import_checks_use_the_worker(warm_runner):
+    assert warm_runner.import_package("json")[0] == 0
+    assert warm_runner.import_package("no_such_module_here")[0] == 1
+    assert warm_runner._warm_worker is not None
+
+
+def test_timeout_stops_warm_run(warm_runner, tmp_path):
+    (tmp_path / "main.py").write_text("import time\nprint('start', flush=True)\ntime.sleep(30)\n", encoding="utf-8")
+    warm_runner.entry_point_limits = RunLimits(timeout_seconds=0.5)
+    code, output = warm_runner.run_entry_point("main.py")
+    assert code == 124
+    assert "start" in output and "timed out" in output
+    assert warm_runner.last_usage.wall_seconds < 10
+    # The worker itself survives and serves the next run.
+    (tmp_path / "main.py").write_text("print('again')\n", encoding="utf-8")
+    assert warm_runner.run_entry_point("main.py") == (0, "again\n")
+
+
+def test_requirements_change_restarts_worker(warm_runner, tmp_path):
+    (tmp_path / "main.py").write_text("print('ok')\n", encoding="utf-8")
+    warm_runner.run_entry_point("main.py")
+    first = warm_runner._warm_worker
+    (tmp_path / "requirements.txt").write_text("requests\n", encoding="utf-8")
+    assert warm_runner.run_entry_point("main.py")[0] == 0
+    assert warm_runner._warm_worker is not first
+    assert not first.alive
+
+
+def test_dead_worker_falls_back_to_fresh_interpreter(warm_runner, tmp_path):
+    (tmp_path / "main.py").write_text("print('ok')\n", encoding="utf-8")
+    warm_runner.run_entry_point("main.py")
+    worker = warm_runner._warm_worker
+    os.remove(worker.socket_path)
+    assert warm_runner._run_command([sys.executable, "main.py"], worker) == (0, "ok\n")
+    assert warm_runner._warm_worker is None